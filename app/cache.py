@@ -0,0 +1,150 @@
+"""Persistent per-commit extraction cache backed by SQLite."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from app.config import DEFAULT_CACHE_MAX_AGE_DAYS, DEFAULT_CACHE_MAX_ENTRIES
+from app.logger import print_debug
+
+CACHE_FILENAME = "extractions.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    sha TEXT NOT NULL,
+    pattern_key TEXT NOT NULL,
+    matches TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (sha, pattern_key)
+) WITHOUT ROWID
+"""
+
+
+def pattern_key(pattern: str, pretty: bool = True) -> str:
+    """Hash a pattern (and the text rendering it runs over) into a cache key."""
+    raw = f"{int(pretty)}\0{pattern}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class ExtractionCache:
+    """Per-commit regex results keyed by ``(commit sha, pattern key)``.
+
+    Commits are immutable, so a result stored for a SHA never goes stale;
+    eviction only bounds disk usage. The database lives in a single file under
+    ``directory`` so ``actions/cache`` can persist it between runs. Writes are
+    buffered and flushed by :meth:`close`, which also evicts entries older than
+    ``max_age_days`` and then the least recently used beyond ``max_entries``.
+    A database error after opening disables the cache for the rest of the run;
+    every later lookup is a miss and nothing is written.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_age_days: int = DEFAULT_CACHE_MAX_AGE_DAYS,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, CACHE_FILENAME)
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending: list[tuple[str, str, str, float, float]] = []
+        self._used: list[tuple[float, str, str]] = []
+        self.disabled = False
+        self._conn = sqlite3.connect(self.path)
+        try:
+            self._conn.execute(_SCHEMA)
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+
+    def get(self, sha: str, key: str) -> list[str] | None:
+        """Return cached matches for a commit, or None on a miss."""
+        row = None
+        if not self.disabled:
+            try:
+                row = self._conn.execute(
+                    "SELECT matches FROM extractions WHERE sha = ? AND pattern_key = ?",
+                    (sha, key),
+                ).fetchone()
+            except sqlite3.Error as e:
+                self._disable(e)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.append((time.time(), sha, key))
+        return json.loads(row[0])
+
+    def put(self, sha: str, key: str, matches: list[str]) -> None:
+        """Buffer the matches found in a commit for writing on close."""
+        if self.disabled:
+            return
+        now = time.time()
+        self._pending.append((sha, key, json.dumps(matches), now, now))
+
+    def _disable(self, error: sqlite3.Error) -> None:
+        """Stop using the database after an error; buffered writes are dropped."""
+        print_debug(f"Extraction cache disabled: {error}")
+        self.disabled = True
+        self._pending.clear()
+        self._used.clear()
+
+    def close(self) -> None:
+        """Flush buffered writes, evict old entries and close the database."""
+        try:
+            if not self.disabled:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?)",
+                        self._pending,
+                    )
+                    self._conn.executemany(
+                        "UPDATE extractions SET used_at = ? "
+                        "WHERE sha = ? AND pattern_key = ?",
+                        self._used,
+                    )
+                    self._evict()
+        except sqlite3.Error as e:
+            print_debug(f"Failed to update extraction cache: {e}")
+        finally:
+            self._conn.close()
+        print_debug(
+            f"Extraction cache: {self.hits} hits, {self.misses} misses, "
+            f"{len(self._pending)} stored ({self.path})"
+        )
+        self._pending.clear()
+        self._used.clear()
+
+    def _evict(self) -> None:
+        """Drop entries past the age limit, then the LRU ones past the size limit."""
+        cutoff = time.time() - self.max_age_days * 86400
+        self._conn.execute("DELETE FROM extractions WHERE created_at < ?", (cutoff,))
+        self._conn.execute(
+            "DELETE FROM extractions WHERE (sha, pattern_key) IN ("
+            " SELECT sha, pattern_key FROM extractions"
+            " ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+def open_cache(
+    directory: str, max_age_days: int, max_entries: int
+) -> ExtractionCache | None:
+    """Open the extraction cache, or return None if it cannot be used.
+
+    The cache is an optimization only, so any failure to open it is logged
+    and extraction proceeds uncached.
+    """
+    if not directory:
+        return None
+    try:
+        return ExtractionCache(directory, max_age_days, max_entries)
+    except (OSError, sqlite3.Error) as e:
+        print_debug(f"Extraction cache disabled: {e}")
+        return None
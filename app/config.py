@@ -2,13 +2,22 @@
 
 import os
 import re
-from dataclasses import dataclass
+from typing import NamedTuple
+
+from app.extractor import DEDUP_MODES
+from app.formatter import output_formats
 
 DEFAULT_TIMEOUT = 30
 DEFAULT_COMMIT_LIMIT = 10
-VALID_OUTPUT_FORMATS = ("text", "json", "csv")
+DEFAULT_CACHE_MAX_AGE_DAYS = 30
+DEFAULT_CACHE_MAX_ENTRIES = 100_000
+# Values larger than output_file_threshold bytes are written to a file, not
+# inlined into GITHUB_ENV/GITHUB_OUTPUT (GitHub allows 1 MiB of outputs per
+# job). Opt-in: 0 keeps every value inline.
+DEFAULT_OUTPUT_FILE_THRESHOLD = 0
 
-# Dangerous patterns blocked in extract_command
+# Dangerous patterns blocked in extract_command when it has to run through
+# bash. Commands handled by the in-process filter engine never reach a shell.
 DANGEROUS_PATTERNS = re.compile(
     r"[;&`]"          # shell chaining (;, &), backticks
     r"|\$[\({]"       # command substitution $() or variable expansion ${}
@@ -28,14 +37,88 @@ DANGEROUS_PATTERNS = re.compile(
 )
 
 
+# Output names usable in extract_patterns; also written as env var names.
+OUTPUT_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+RESERVED_OUTPUT_NAMES = (
+    "key_variable",
+    "value_variable",
+    "match_count",
+    "match_commits",
+    "timings",
+    "range_results",
+    "value_file",
+    "value_sha256",
+)
+
+
+def _parse_named_patterns(text: str) -> dict[str, str]:
+    """Parse ``NAME=regex`` lines into an ordered name -> pattern mapping.
+
+    Blank lines and lines starting with ``#`` are ignored, as is whitespace
+    around the name and pattern. Only the first ``=`` separates the name, so
+    patterns may contain ``=`` themselves.
+
+    Raises:
+        ValueError: If a line is malformed or a name is invalid or repeated.
+    """
+    patterns: dict[str, str] = {}
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        name, sep, pattern = stripped.partition("=")
+        name, pattern = name.strip(), pattern.strip()
+        if not sep or not pattern:
+            raise ValueError(
+                f"Invalid extract_patterns line: '{stripped}'. Expected NAME=regex"
+            )
+        if not OUTPUT_NAME.fullmatch(name):
+            raise ValueError(f"Invalid extract_patterns output name: '{name}'")
+        if name in RESERVED_OUTPUT_NAMES:
+            raise ValueError(f"extract_patterns output name '{name}' is reserved")
+        if name in patterns:
+            raise ValueError(f"Duplicate extract_patterns output name: '{name}'")
+        patterns[name] = pattern
+    return patterns
+
+
+def _parse_commit_ranges(text: str) -> tuple[str, ...]:
+    """Parse one commit range per line (``A..B`` or a single revision).
+
+    Blank lines and lines starting with ``#`` are ignored.
+
+    Raises:
+        ValueError: If a range is repeated or uses unsupported syntax.
+    """
+    ranges: list[str] = []
+    for line in text.splitlines():
+        commit_range = line.strip()
+        if not commit_range or commit_range.startswith("#"):
+            continue
+        if "..." in commit_range:
+            raise ValueError(
+                f"Symmetric difference ranges are not supported in commit_ranges: "
+                f"'{commit_range}'"
+            )
+        if any(end.startswith("-") or " " in end for end in commit_range.split("..")):
+            raise ValueError(f"Invalid commit_ranges entry: '{commit_range}'")
+        if commit_range in ranges:
+            raise ValueError(f"Duplicate commit_ranges entry: '{commit_range}'")
+        ranges.append(commit_range)
+    return tuple(ranges)
+
+
 def _bool_env(name: str, default: str = "false") -> bool:
     """Parse a GitHub Actions string-typed boolean input into a real bool."""
     return os.getenv(name, default).lower() == "true"
 
 
-@dataclass
-class AppConfig:
-    """Configuration loaded from environment variables."""
+class AppConfig(NamedTuple):
+    """Configuration loaded from environment variables.
+
+    A NamedTuple rather than a dataclass: importing ``dataclasses`` pulls in
+    ``inspect`` and roughly doubles the action's import time.
+    """
 
     commit_limit: int
     timeout: int
@@ -47,6 +130,22 @@ class AppConfig:
     output_format: str
     commit_range: str
     debug: bool
+    extract_patterns: dict[str, str] = {}
+    cache_dir: str = ""
+    cache_max_age_days: int = DEFAULT_CACHE_MAX_AGE_DAYS
+    cache_max_entries: int = DEFAULT_CACHE_MAX_ENTRIES
+    trace_memory: bool = False
+    state_file: str = ""
+    workers: int = 1
+    native_reader: bool = False
+    commit_graph: bool = False
+    commit_ranges: tuple[str, ...] = ()
+    output_file_threshold: int = DEFAULT_OUTPUT_FILE_THRESHOLD
+    output_file_compress: bool = False
+    deepen_shallow: bool = False
+    dedup: str = "sorted"
+    top_n: int = 0
+    max_matches: int = 0
 
     @classmethod
     def from_env(cls) -> "AppConfig":
@@ -54,9 +153,27 @@ class AppConfig:
         try:
             commit_limit = int(os.getenv("INPUT_COMMIT_LIMIT", str(DEFAULT_COMMIT_LIMIT)))
             timeout = int(os.getenv("INPUT_TIMEOUT", str(DEFAULT_TIMEOUT)))
+            cache_max_age_days = int(
+                os.getenv("INPUT_CACHE_MAX_AGE_DAYS", str(DEFAULT_CACHE_MAX_AGE_DAYS))
+            )
+            cache_max_entries = int(
+                os.getenv("INPUT_CACHE_MAX_ENTRIES", str(DEFAULT_CACHE_MAX_ENTRIES))
+            )
+            workers = int(os.getenv("INPUT_WORKERS", "1"))
+            top_n = int(os.getenv("INPUT_TOP_N", "0"))
+            max_matches = int(os.getenv("INPUT_MAX_MATCHES", "0"))
+            output_file_threshold = int(
+                os.getenv(
+                    "INPUT_OUTPUT_FILE_THRESHOLD", str(DEFAULT_OUTPUT_FILE_THRESHOLD)
+                )
+            )
         except ValueError as e:
             raise ValueError(f"Invalid numeric input: {e}") from e
 
+        extract_patterns = _parse_named_patterns(
+            os.getenv("INPUT_EXTRACT_PATTERNS", "")
+        )
+
         return cls(
             commit_limit=commit_limit,
             timeout=timeout,
@@ -68,6 +185,23 @@ class AppConfig:
             output_format=os.getenv("INPUT_OUTPUT_FORMAT", "text").lower(),
             commit_range=os.getenv("INPUT_COMMIT_RANGE", ""),
             debug=_bool_env("INPUT_DEBUG"),
+            extract_patterns=extract_patterns,
+            cache_dir=os.getenv("INPUT_CACHE_DIR", ""),
+            cache_max_age_days=cache_max_age_days,
+            cache_max_entries=cache_max_entries,
+            trace_memory=_bool_env("INPUT_TRACE_MEMORY"),
+            state_file=os.getenv("INPUT_STATE_FILE", ""),
+            # 0 means one worker per CPU.
+            workers=workers or os.cpu_count() or 1,
+            native_reader=_bool_env("INPUT_NATIVE_READER"),
+            commit_graph=_bool_env("INPUT_COMMIT_GRAPH"),
+            commit_ranges=_parse_commit_ranges(os.getenv("INPUT_COMMIT_RANGES", "")),
+            output_file_threshold=output_file_threshold,
+            output_file_compress=_bool_env("INPUT_OUTPUT_FILE_COMPRESS"),
+            deepen_shallow=_bool_env("INPUT_DEEPEN_SHALLOW"),
+            dedup=os.getenv("INPUT_DEDUP", "sorted").lower(),
+            top_n=top_n,
+            max_matches=max_matches,
         )
 
     def validate(self) -> None:
@@ -80,16 +214,83 @@ class AppConfig:
             raise ValueError("commit_limit must be greater than 0")
         if self.timeout <= 0:
             raise ValueError("timeout must be greater than 0")
-        if self.output_format not in VALID_OUTPUT_FORMATS:
+        if self.cache_max_age_days <= 0:
+            raise ValueError("cache_max_age_days must be greater than 0")
+        if self.cache_max_entries <= 0:
+            raise ValueError("cache_max_entries must be greater than 0")
+        if self.workers < 0:
+            raise ValueError("workers must be 0 (one per CPU) or greater")
+        if self.output_file_threshold < 0:
+            raise ValueError("output_file_threshold must be 0 (never) or greater")
+        if self.output_format not in output_formats():
             raise ValueError(
                 f"Invalid output_format: {self.output_format}. "
-                f"Must be {', '.join(VALID_OUTPUT_FORMATS)}"
+                f"Must be {', '.join(output_formats())}"
+            )
+        if self.dedup not in DEDUP_MODES:
+            raise ValueError(
+                f"Invalid dedup: {self.dedup}. Must be {', '.join(DEDUP_MODES)}"
+            )
+        if self.top_n < 0:
+            raise ValueError("top_n must be 0 (all values) or greater")
+        if self.top_n and self.dedup == "none":
+            raise ValueError("top_n requires a dedup mode other than none")
+        if self.state_file and (self.top_n or self.dedup in ("counts", "none")):
+            raise ValueError(
+                "Cannot combine state_file with top_n or dedup counts/none: "
+                "the state file keeps values, not how often they occurred."
+            )
+        if self.max_matches < 0:
+            raise ValueError("max_matches must be 0 (no limit) or greater")
+        if self.max_matches and not (self.extract_pattern or self.extract_patterns):
+            raise ValueError("max_matches requires extract_pattern or extract_patterns")
+        counted = self.top_n or self.dedup == "counts"
+        if self.max_matches and (
+            counted or self.state_file or self.commit_ranges
+        ):
+            raise ValueError(
+                "Cannot combine max_matches with top_n, dedup counts, state_file or "
+                "commit_ranges: they need every commit in the window."
             )
         if self.extract_command and self.extract_pattern:
             raise ValueError(
                 "Cannot use both extract_command and extract_pattern. Choose one."
             )
-        if self.extract_command and DANGEROUS_PATTERNS.search(self.extract_command):
+        if self.extract_patterns and (self.extract_command or self.extract_pattern):
+            raise ValueError(
+                "Cannot combine extract_patterns with extract_command or "
+                "extract_pattern. Choose one."
+            )
+        if self.state_file and not (
+            self.extract_command or self.extract_pattern or self.extract_patterns
+        ):
+            raise ValueError(
+                "state_file requires extract_command, extract_pattern or "
+                "extract_patterns"
+            )
+        if self.state_file and self.commit_range:
+            raise ValueError(
+                "Cannot combine state_file with commit_range: incremental runs "
+                "choose their own range."
+            )
+        if self.commit_ranges and not (self.extract_pattern or self.extract_patterns):
+            raise ValueError(
+                "commit_ranges requires extract_pattern or extract_patterns"
+            )
+        if self.commit_ranges and (self.commit_range or self.state_file):
+            raise ValueError(
+                "Cannot combine commit_ranges with commit_range or state_file."
+            )
+        if self.extract_command:
+            # Imported here so runs without extract_command skip loading the
+            # filter engine.
+            from app.filters import is_builtin_command
+
+        if (
+            self.extract_command
+            and not is_builtin_command(self.extract_command)
+            and DANGEROUS_PATTERNS.search(self.extract_command)
+        ):
             raise ValueError(
                 f"extract_command contains blocked shell operators or commands: "
                 f"'{self.extract_command}'. Use extract_pattern for safer extraction."
@@ -1,15 +1,186 @@
 """Extract information from commit messages using shell commands or regex patterns."""
 
+import heapq
 import re
 import subprocess
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from itertools import chain, islice
+from typing import TYPE_CHECKING, NamedTuple, TypeVar
 
+from app.formatter import Matches
+from app.git_client import CommitRecord, LogFilter
 from app.logger import print_debug, fail, print_section
 
+if TYPE_CHECKING:
+    from app.cache import ExtractionCache
+    from app.filters import Pipeline
 
-def _deduplicate_and_join(items: list[str]) -> str:
-    """Deduplicate, sort, and join items into a newline-separated string."""
-    unique = sorted(set(items))
-    return "\n".join(unique) if unique else ""
+# Extraction input: one blob of text, or per-commit messages/records.
+Commits = str | Iterable[str | CommitRecord]
+
+T = TypeVar("T")
+
+# \1..\9 style backreferences; their numbers shift when patterns are combined.
+_NUMBERED_BACKREF = re.compile(r"\\[1-9]")
+
+# Parallel extraction starts only once the stream has produced this many
+# commits; below it, process startup costs more than the pool saves.
+PARALLEL_MIN_COMMITS = 5000
+# Commits sent to a worker process per task.
+PARALLEL_BATCH_COMMITS = 1000
+
+# Shorter required literals rarely rule out commits, so they are not worth
+# a git-side filter.
+MIN_FILTER_LITERAL = 3
+
+# Compiled extraction patterns kept per process, least recently used first.
+PATTERN_CACHE_SIZE = 128
+
+# Values of the dedup input: how extracted values are deduplicated and ordered.
+DEDUP_MODES = ("sorted", "first-seen", "last-seen", "counts", "none")
+
+# ASCII letters that IGNORECASE also matches to non-ASCII characters (e.g.
+# "k" and KELVIN SIGN); git's ASCII case folding would miss those commits.
+_UNICODE_FOLDED = frozenset("iksIKS")
+
+
+class Dedup(NamedTuple):
+    """How extracted values are deduplicated and ordered (see DEDUP_MODES).
+
+    Values arrive in commit order, newest first. ``sorted`` sorts the unique
+    values, ``first-seen`` keeps the order in which each first appeared (most
+    recent first) and ``last-seen`` the order of their last appearance.
+    ``counts`` renders each unique value as ``<count> <value>``, most frequent
+    first, like ``uniq -c``; ``none`` keeps every occurrence. ``top_n`` keeps
+    only the N most frequent values, then orders them as the mode says.
+    ``max_matches`` stops collecting once that many values are kept, so the
+    result holds the newest N.
+    """
+
+    mode: str = "sorted"
+    top_n: int = 0
+    max_matches: int = 0
+
+    @property
+    def distinct_only(self) -> bool:
+        """Whether only distinct values matter, not how often they occur."""
+        return self.mode in ("sorted", "first-seen") and not self.top_n
+
+    def collector(self) -> "Collector":
+        return Collector(self)
+
+
+class Collector:
+    """Accumulates extracted values in a single pass, as ``dedup`` requires.
+
+    Only what the mode needs is kept: a set for ``sorted``, a dict for
+    ``first-seen``, a Counter (insertion ordered, so also first-seen) when
+    occurrences are counted, a dict moved-to-end on every sighting for
+    ``last-seen`` and a list for ``none``. With ``max_matches``, ``sorted``
+    also uses a dict, so that the values kept are the first ones found.
+    """
+
+    __slots__ = ("dedup", "_values")
+
+    def __init__(self, dedup: Dedup) -> None:
+        self.dedup = dedup
+        if dedup.mode == "none":
+            self._values: set | dict | list = []
+        elif dedup.mode == "last-seen":
+            self._values = {}
+        elif dedup.mode == "counts" or dedup.top_n:
+            self._values = Counter()
+        elif dedup.mode == "first-seen" or dedup.max_matches:
+            self._values = {}
+        else:
+            self._values = set()
+
+    def update(self, values: Iterable[str]) -> None:
+        """Add the values found in one commit (or one batch of output)."""
+        collected = self._values
+        if self.dedup.max_matches:
+            self._update_until_full(values)
+        elif isinstance(collected, list):
+            collected.extend(values)
+        elif isinstance(collected, (set, Counter)):
+            collected.update(values)
+        elif self.dedup.mode == "last-seen":
+            for value in values:
+                collected[value] = collected.pop(value, 0) + 1
+        else:
+            collected.update(dict.fromkeys(values))
+
+    def _update_until_full(self, values: Iterable[str]) -> None:
+        """Add values one at a time, ignoring the rest once max_matches are kept."""
+        collected = self._values
+        limit = self.dedup.max_matches
+        for value in values:
+            if isinstance(collected, list):
+                if len(collected) >= limit:
+                    return
+                collected.append(value)
+            elif value in collected:
+                if self.dedup.mode == "last-seen":
+                    collected[value] = collected.pop(value)
+            elif len(collected) >= limit:
+                return
+            else:
+                collected[value] = None
+
+    @property
+    def full(self) -> bool:
+        """Whether max_matches values have been collected."""
+        limit = self.dedup.max_matches
+        return bool(limit) and len(self._values) >= limit
+
+    def result(self) -> Matches:
+        """The collected values as an extraction result."""
+        collected = self._values
+        mode, top_n, _ = self.dedup
+        if isinstance(collected, list):
+            return Matches(collected)
+        values: Iterable[str] = collected
+        if top_n:
+            # nlargest is stable: equally frequent values keep their order.
+            frequent = heapq.nlargest(top_n, collected, key=collected.__getitem__)
+            if mode == "counts":
+                values = frequent
+            else:
+                keep = set(frequent)
+                values = [value for value in collected if value in keep]
+        elif mode == "counts":
+            values = sorted(collected, key=collected.__getitem__, reverse=True)
+        if mode == "sorted":
+            return Matches(sorted(values))
+        if mode == "counts":
+            return Matches([f"{collected[value]} {value}" for value in values])
+        return Matches(list(values))
+
+
+def _unique(items: Iterable[str], dedup: Dedup = Dedup()) -> Matches:
+    """Deduplicate and order items into an extraction result."""
+    collector = dedup.collector()
+    collector.update(items)
+    return collector.result()
+
+
+def merge_results(previous: str, current: Matches, dedup: Dedup = Dedup()) -> Matches:
+    """Merge a persisted result with a newer one.
+
+    The new values come first, as they would have in a single scan of both
+    windows, so ``first-seen`` and ``last-seen`` keep their meaning.
+    """
+    return _unique(
+        chain(
+            (line for line in current.lines() if line.strip()),
+            _non_empty_lines(previous),
+        ),
+        dedup,
+    )
 
 
 def _non_empty_lines(text: str) -> list[str]:
@@ -17,119 +188,1102 @@ def _non_empty_lines(text: str) -> list[str]:
     return [line for line in text.split("\n") if line.strip()]
 
 
+class RangeResults:
+    """Per-range matches collected while the union of several ranges is scanned.
+
+    Each commit is matched once and its matches are added to every range that
+    contains it, so commits shared by overlapping ranges cost nothing extra.
+    Matches are kept per output name: the extract_patterns names, or ``""``
+    for the single extract_pattern result.
+    """
+
+    def __init__(self, members: dict[str, set[str]], dedup: Dedup = Dedup()) -> None:
+        self._dedup = dedup
+        self._ranges_of: dict[str, list[str]] = {}
+        for commit_range, shas in members.items():
+            for sha in shas:
+                self._ranges_of.setdefault(sha, []).append(commit_range)
+        self._values: dict[str, dict[str, Collector]] = {
+            commit_range: {} for commit_range in members
+        }
+
+    def add(self, sha: str, matches: Iterable[str], name: str = "") -> None:
+        """Record the matches found in commit ``sha`` under output ``name``."""
+        for commit_range in self._ranges_of.get(sha, ()):
+            collectors = self._values[commit_range]
+            if name not in collectors:
+                collectors[name] = self._dedup.collector()
+            collectors[name].update(matches)
+
+    def results(self, names: Iterable[str] = ("",)) -> dict[str, dict[str, Matches]]:
+        """Each range mapped to its deduplicated result per output name."""
+        names = list(names)
+        empty = Matches([])
+        return {
+            commit_range: {
+                name: collectors[name].result() if name in collectors else empty
+                for name in names
+            }
+            for commit_range, collectors in self._values.items()
+        }
+
+
+def _iter_commits(commit_messages: Commits) -> Iterable[str | CommitRecord]:
+    """Normalize extraction input to an iterable of per-commit items."""
+    if isinstance(commit_messages, str):
+        return [commit_messages]
+    return commit_messages
+
+
+def _commit_texts(commits: Iterable[str | CommitRecord]) -> Iterator[str]:
+    """Yield the text to extract from for each commit item."""
+    for commit in commits:
+        yield commit.text if isinstance(commit, CommitRecord) else commit
+
+
 def extract_info(
-    commit_messages: str,
+    commit_messages: Commits,
     extract_command: str | None,
     extract_pattern: str | None,
     fail_on_empty: bool,
     timeout: int,
-) -> tuple[str, int]:
+    sources: dict[str, list[str]] | None = None,
+    cache: "ExtractionCache | None" = None,
+    workers: int = 1,
+    ranges: RangeResults | None = None,
+    dedup: Dedup = Dedup(),
+) -> Matches:
     """Extract information from commit messages.
 
     Args:
-        commit_messages: Input commit messages.
+        commit_messages: Input commit messages: one string, or an iterable of
+            per-commit messages or CommitRecords consumed lazily.
         extract_command: Shell command to extract info.
         extract_pattern: Regex pattern to extract info (safer alternative).
         fail_on_empty: Whether to fail on empty results.
-        timeout: Command timeout in seconds.
+        timeout: Command (or pattern matching) timeout in seconds.
+        sources: Optional dict filled with each matched value mapped to the
+            SHAs of the commits it was found in (pattern mode, CommitRecord
+            input only).
+        cache: Optional per-commit result cache consulted in pattern mode.
+        workers: Worker processes to extract long commit streams with.
+        ranges: Optional per-range results to fill (pattern mode,
+            CommitRecord input only).
+        dedup: How the extracted values are deduplicated and ordered.
 
     Returns:
-        Tuple of (extracted information, match count).
+        The extracted values and their count (the raw log, one value per
+        line, without an extract_command or extract_pattern).
     """
     print_section("Extracting Environment Information")
 
-    if not extract_command and not extract_pattern:
-        lines = _non_empty_lines(commit_messages)
-        return commit_messages, len(lines)
+    commits = _iter_commits(commit_messages)
 
-    print_debug(f"Input length: {len(commit_messages)} characters")
+    if not extract_command and not extract_pattern:
+        return Matches.from_text("\n".join(_commit_texts(commits)))
 
     if extract_pattern:
         print(f"  - Using extract pattern: {extract_pattern}")
-        environment = _run_extract_pattern(commit_messages, extract_pattern)
+        matches = _run_extract_pattern(
+            commits, extract_pattern, sources, cache, workers, ranges, timeout, dedup
+        )
     else:
         print(f"  - Using extract command: {extract_command}")
-        environment = _run_extract_command(commit_messages, extract_command, timeout)
-
-    match_count = len(_non_empty_lines(environment))
+        matches = _run_extract_command(
+            commits, extract_command, timeout, workers, dedup
+        )
 
-    if not environment.strip() and fail_on_empty:
+    if not matches.count and fail_on_empty:
         fail(
             "No environment information extracted and fail_on_empty is set to true"
         )
 
-    if environment.strip():
-        if match_count > 1:
-            print(f"  - Found {match_count} unique matches")
-        print(f"  - Extracted value: {environment}")
+    if matches.count:
+        if matches.count > 1:
+            print(f"  - Found {matches.count} unique matches")
+        print(f"  - Extracted value: {matches}")
+
+    return matches
+
+
+def _scan_commits(
+    commit_messages: Commits,
+    cache_spec: str,
+    match: Callable[[str], T],
+    cache: "ExtractionCache | None" = None,
+    workers: int = 1,
+    deadline: float | None = None,
+) -> Iterator[tuple[str, T]]:
+    """Apply ``match`` to each commit and yield ``(sha, matches)`` pairs.
+
+    Plain string input yields an empty sha. With a cache, results stored for
+    a commit under ``cache_spec`` are yielded without rendering or scanning it.
+    With several ``workers``, uncached commits are matched in a process pool
+    (see :func:`_parallel_map`); results are still yielded in commit order.
+    Past ``deadline``, waiting on the pool raises TimeoutError.
+    """
+    if cache is not None:
+        from app.cache import pattern_key
+
+    cache_keys: dict[bool, str] = {}
+
+    def lookups() -> Iterator[tuple[str, str | None, T | None, str | None]]:
+        for commit in _iter_commits(commit_messages):
+            sha = commit.sha if isinstance(commit, CommitRecord) else ""
+            key = hit = None
+            if cache is not None and sha:
+                if commit.pretty not in cache_keys:
+                    cache_keys[commit.pretty] = pattern_key(cache_spec, commit.pretty)
+                key = cache_keys[commit.pretty]
+                hit = cache.get(sha, key)
+            if hit is not None:
+                yield sha, key, hit, None
+            else:
+                yield sha, key, None, commit.text if isinstance(commit, CommitRecord) else commit
+
+    scanned = cached = 0
+    for sha, key, hit, matches in _match_commits(match, lookups(), workers, deadline):
+        if hit is not None:
+            cached += 1
+            yield sha, hit
+            continue
+        scanned += 1
+        if key is not None:
+            cache.put(sha, key, matches)
+        yield sha, matches
+    print_debug(f"Scanned {scanned} commits ({cached} served from cache)")
+
+
+def _match_commits(
+    match: Callable[[str], T],
+    entries: Iterator[tuple[str, str | None, T | None, str | None]],
+    workers: int,
+    deadline: float | None = None,
+) -> Iterator[tuple[str, str | None, T | None, T | None]]:
+    """Run ``match`` over the text of each cache miss, serially or in a pool.
+
+    Entries are ``(sha, key, hit, text)``; ``text`` is None for cache hits,
+    which pass through unmatched. Pool results not ready by ``deadline``
+    raise TimeoutError.
+    """
+    parallel, entries = _parallel_input(entries, workers)
+    if not parallel:
+        for sha, key, hit, text in entries:
+            yield sha, key, hit, None if text is None else match(text)
+        return
+
+    print_debug(f"Matching in parallel with {workers} workers")
+    batches = _batched(entries, PARALLEL_BATCH_COMMITS)
+    tasks = (
+        (batch, (match, [text for *_, text in batch if text is not None]))
+        for batch in batches
+    )
+    for batch, results in _parallel_map(_match_batch, tasks, workers, deadline):
+        found = iter(results)
+        for sha, key, hit, text in batch:
+            yield sha, key, hit, None if text is None else next(found)
+
+
+def _match_batch(match: Callable[[str], T], texts: list[str]) -> list[T]:
+    """Worker task: apply ``match`` to each text."""
+    return [match(text) for text in texts]
 
-    return environment, match_count
 
+def _parallel_input(items: Iterable[T], workers: int) -> tuple[bool, Iterator[T]]:
+    """Decide whether ``items`` is long enough to be worth a process pool.
 
-def _run_extract_pattern(commit_messages: str, pattern: str) -> str:
+    Buffers up to ``PARALLEL_MIN_COMMITS`` items; returns the decision and an
+    iterator over all of the items.
+    """
+    iterator = iter(items)
+    if workers <= 1:
+        return False, iterator
+    head = list(islice(iterator, PARALLEL_MIN_COMMITS))
+    return len(head) == PARALLEL_MIN_COMMITS, chain(head, iterator)
+
+
+def _batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Group ``items`` into lists of ``size`` (the last may be shorter)."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _parallel_map(
+    func: Callable,
+    tasks: Iterable[tuple[T, tuple]],
+    workers: int,
+    deadline: float | None = None,
+) -> Iterator[tuple[T, object]]:
+    """Run ``func(*args)`` for each ``(tag, args)`` in a process pool.
+
+    Yields ``(tag, result)`` in task order. At most two tasks per worker are
+    in flight, so the input stream is consumed no faster than the pool works
+    through it. Workers are started with forkserver (or spawn): forking this
+    process would copy the threads that stream git output.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+    pool = ProcessPoolExecutor(workers, mp_context=context)
+    in_flight: deque = deque()
+    try:
+        for tag, args in tasks:
+            in_flight.append((tag, pool.submit(func, *args)))
+            if len(in_flight) >= 2 * workers:
+                tag, future = in_flight.popleft()
+                yield tag, _result(future, deadline)
+        while in_flight:
+            tag, future = in_flight.popleft()
+            yield tag, _result(future, deadline)
+    except BaseException:
+        # A worker still busy (a runaway regex, say) would block shutdown.
+        _kill_workers(pool)
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _kill_workers(pool) -> None:
+    """Kill the worker processes of a ProcessPoolExecutor."""
+    if hasattr(pool, "kill_workers"):  # Python 3.14+
+        pool.kill_workers()
+        return
+    for process in list((pool._processes or {}).values()):
+        process.kill()
+
+
+def _result(future, deadline: float | None):
+    """Wait for ``future``, raising TimeoutError once ``deadline`` has passed."""
+    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+    return future.result(timeout)
+
+
+@contextmanager
+def _time_limit(
+    commit_messages: Commits, timeout: int | None
+) -> Iterator[tuple[Iterable[str | CommitRecord], float | None]]:
+    """Raise TimeoutError in the block after ``timeout`` seconds of matching.
+
+    Yields the commits to scan and the deadline for pool results. A regex
+    match cannot be cancelled from another thread, but the re engine checks
+    for signals while it backtracks, so a SIGALRM timer stops even a single
+    runaway ``findall`` (and interrupts waiting on the pool). The timer is
+    paused while the commit stream produces each commit, so a slow git log
+    is not reported as a slow pattern. Off the main thread, or without
+    SIGALRM, only pool results are time-limited, by a deadline that also
+    counts reading.
+    """
+    import signal
+
+    commits = _iter_commits(commit_messages)
+    if not timeout:
+        yield commits, None
+        return
+    if (
+        not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield commits, time.monotonic() + timeout
+        return
+
+    def expire(signum, frame) -> None:
+        raise TimeoutError
+
+    def untimed(items: Iterable[T]) -> Iterator[T]:
+        iterator = iter(items)
+        while True:
+            remaining, _ = signal.setitimer(signal.ITIMER_REAL, 0)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, remaining)
+            yield item
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield untimed(commits), None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _stop_reading(scan: Iterator, commit_messages: Commits, max_matches: int) -> None:
+    """Stop scanning once max_matches are found, and the git log behind it.
+
+    Closing the commit stream closes the generators it reads from, which
+    kills the git log (or pool workers) still producing older commits.
+    """
+    print(f"  - Found {max_matches} matches; not reading older commits")
+    scan.close()
+    _close(commit_messages)
+
+
+def _close(commit_messages: Commits) -> None:
+    """Close a lazily consumed commit stream, if it is one."""
+    close = getattr(commit_messages, "close", None)
+    if close is not None:
+        close()
+
+
+def _prune_sources(sources: dict[str, list[str]] | None, values: Iterable[str]) -> None:
+    """Drop sources of values that were found but not kept."""
+    if sources:
+        kept = set(values)
+        for value in [value for value in sources if value not in kept]:
+            del sources[value]
+
+
+def _record_sources(
+    sources: dict[str, list[str]] | None, sha: str, matches: Iterable[str]
+) -> None:
+    """Append ``sha`` to the source list of each distinct match."""
+    if sources is None or not sha:
+        return
+    for match in dict.fromkeys(matches):
+        sources.setdefault(match, []).append(sha)
+
+
+_patterns: "OrderedDict[str, re.Pattern]" = OrderedDict()
+_pattern_stats = {"hits": 0, "misses": 0}
+
+
+def compile_pattern(pattern: str, check: bool = True) -> re.Pattern:
+    """Compile ``pattern`` through the per-process LRU cache.
+
+    Repeated runs in one process (batch loops, the resident server, tests)
+    compile each pattern once. With ``check``, a newly compiled pattern is
+    analyzed by backtracking_risks() and each risk is printed as a warning.
+
+    Raises:
+        re.error: If the pattern is invalid.
+    """
+    compiled = _patterns.get(pattern)
+    if compiled is not None:
+        _pattern_stats["hits"] += 1
+        _patterns.move_to_end(pattern)
+        return compiled
+
+    compiled = re.compile(pattern)
+    _pattern_stats["misses"] += 1
+    if check:
+        for risk in backtracking_risks(pattern):
+            print(f"  - Warning: pattern '{pattern}' {risk}")
+    _patterns[pattern] = compiled
+    if len(_patterns) > PATTERN_CACHE_SIZE:
+        _patterns.popitem(last=False)
+    return compiled
+
+
+def pattern_cache_info() -> tuple[int, int, int]:
+    """Return (hits, misses, cached patterns) of the compiled-pattern cache."""
+    return _pattern_stats["hits"], _pattern_stats["misses"], len(_patterns)
+
+
+def precompile_patterns(patterns: Iterable[str]) -> None:
+    """Compile and check extraction patterns before any commit is read.
+
+    An invalid pattern then fails the action before git runs, and the
+    extraction itself finds every pattern already in the cache.
+    """
+    for pattern in patterns:
+        _compile(pattern)
+
+
+def _compile(pattern: str) -> re.Pattern:
+    """Compile a user regex, failing the action on syntax errors."""
+    try:
+        return compile_pattern(pattern)
+    except re.error as e:
+        fail(f"Invalid regex pattern '{pattern}': {e}")
+
+
+def _print_pattern_cache() -> None:
+    hits, misses, size = pattern_cache_info()
+    print_debug(f"Pattern cache: {hits} hits, {misses} misses, {size} cached")
+
+
+def _run_extract_pattern(
+    commit_messages: Commits,
+    pattern: str,
+    sources: dict[str, list[str]] | None = None,
+    cache: "ExtractionCache | None" = None,
+    workers: int = 1,
+    ranges: RangeResults | None = None,
+    timeout: int | None = None,
+    dedup: Dedup = Dedup(),
+) -> Matches:
     """Extract matches using Python regex pattern.
 
+    Each commit is scanned as it arrives, so only the unique matches are
+    retained rather than the whole log. With a cache, commits whose results
+    are already stored for this pattern are not scanned at all. Matching
+    that has not finished after ``timeout`` seconds fails the action.
+
     Args:
-        commit_messages: Input text.
+        commit_messages: Input text or iterable of per-commit messages/records.
         pattern: Regex pattern to match.
+        sources: Optional dict filled with value -> SHAs of matching commits.
+        cache: Optional per-commit result cache.
+        workers: Worker processes to match long commit streams with.
+        ranges: Optional per-range results to fill.
+        timeout: Optional time limit for matching, in seconds.
+        dedup: How the matches are deduplicated and ordered.
 
     Returns:
-        Deduplicated, sorted extraction result.
+        Deduplicated extraction result.
     """
+    compiled = _compile(pattern)
+    _print_pattern_cache()
+
+    unique = dedup.collector()
+    total = 0
     try:
-        compiled = re.compile(pattern)
-    except re.error as e:
-        fail(f"Invalid regex pattern '{pattern}': {e}")
-        return ""
+        with _time_limit(commit_messages, timeout) as (commits, deadline):
+            scan = _scan_commits(
+                commits, pattern, compiled.findall, cache, workers, deadline
+            )
+            for sha, matches in scan:
+                total += len(matches)
+                unique.update(matches)
+                _record_sources(sources, sha, matches)
+                if ranges is not None:
+                    ranges.add(sha, matches)
+                if unique.full:
+                    break
+    except TimeoutError:
+        fail(f"Pattern matching timed out after {timeout} seconds")
+
+    print_debug(f"Pattern matched {total} times")
 
-    matches = compiled.findall(commit_messages)
-    print_debug(f"Pattern matched {len(matches)} times")
+    result = unique.result()
+    if unique.full:
+        _stop_reading(scan, commit_messages, dedup.max_matches)
+        _prune_sources(sources, result.values)
+    return result
 
-    return _deduplicate_and_join(matches)
+
+class NamedPatterns:
+    """Several named regexes applied in a single scan of each commit.
+
+    The patterns are combined into one alternation, each wrapped in its own
+    outer group, and ``m.lastindex`` (the outermost group closes last) tells
+    which alternative matched. Like ``re.findall``, a pattern with one group
+    yields that group, and one without groups yields the whole match.
+
+    Alternatives are tried left to right at each position, so text consumed
+    by one pattern is not rescanned by the others. Patterns that cannot be
+    combined safely (numbered backreferences, duplicate group names, global
+    inline flags) are matched with one ``findall`` per pattern instead.
+    """
+
+    def __init__(self, patterns: dict[str, str]) -> None:
+        self.names = list(patterns)
+        self.spec = "\n".join(f"{name}={patterns[name]}" for name in self.names)
+        self._compiled = {name: _compile(patterns[name]) for name in self.names}
+        self._combined: re.Pattern | None = None
+        self._groups: dict[int, tuple[str, int]] = {}
+
+        if any(_NUMBERED_BACKREF.search(p) for p in patterns.values()):
+            print_debug("Named patterns use backreferences; matching separately")
+            return
+
+        parts = []
+        index = 1
+        for name in self.names:
+            self._groups[index] = (name, self._compiled[name].groups)
+            parts.append(f"({patterns[name]})")
+            index += self._compiled[name].groups + 1
+        try:
+            # The parts were checked on their own; do not warn twice.
+            self._combined = compile_pattern("|".join(parts), check=False)
+        except re.error as e:
+            print_debug(f"Cannot combine named patterns ({e}); matching separately")
+
+    def findall(self, text: str) -> dict[str, list]:
+        """Return the matches of every pattern in ``text``, keyed by name."""
+        if self._combined is None:
+            return {
+                name: compiled.findall(text)
+                for name, compiled in self._compiled.items()
+            }
+
+        found: dict[str, list] = {name: [] for name in self.names}
+        for m in self._combined.finditer(text):
+            outer = m.lastindex
+            name, inner = self._groups[outer]
+            if inner == 0:
+                value = m.group(outer)
+            elif inner == 1:
+                value = m.group(outer + 1) or ""
+            else:
+                value = tuple(g or "" for g in m.groups()[outer : outer + inner])
+            found[name].append(value)
+        return found
+
+
+def extract_named_info(
+    commit_messages: Commits,
+    patterns: dict[str, str],
+    fail_on_empty: bool,
+    sources: dict[str, dict[str, list[str]]] | None = None,
+    cache: "ExtractionCache | None" = None,
+    workers: int = 1,
+    ranges: RangeResults | None = None,
+    timeout: int | None = None,
+    dedup: Dedup = Dedup(),
+) -> dict[str, Matches]:
+    """Extract several named patterns from commit messages in one pass.
+
+    Args:
+        commit_messages: Input text or iterable of per-commit messages/records.
+        patterns: Output name mapped to its regex pattern.
+        fail_on_empty: Whether to fail when no pattern matched anything.
+        sources: Optional dict filled with output name -> value -> SHAs of
+            matching commits, so names matching the same text stay apart.
+        cache: Optional per-commit result cache.
+        workers: Worker processes to match long commit streams with.
+        ranges: Optional per-range results to fill, per output name.
+        timeout: Optional time limit for matching, in seconds.
+        dedup: How each name's matches are deduplicated and ordered.
+
+    Returns:
+        Output name mapped to its extracted values.
+    """
+    print_section("Extracting Environment Information")
+    print(f"  - Using extract patterns: {', '.join(patterns)}")
+
+    named = NamedPatterns(patterns)
+    _print_pattern_cache()
+    unique = {name: dedup.collector() for name in named.names}
+    full = False
+    try:
+        with _time_limit(commit_messages, timeout) as (commits, deadline):
+            scan = _scan_commits(
+                commits, named.spec, named.findall, cache, workers, deadline
+            )
+            for sha, found in scan:
+                for name, matches in found.items():
+                    unique[name].update(matches)
+                    if sources is not None and matches:
+                        _record_sources(sources.setdefault(name, {}), sha, matches)
+                    if ranges is not None:
+                        ranges.add(sha, matches, name)
+                if dedup.max_matches and all(c.full for c in unique.values()):
+                    full = True
+                    break
+    except TimeoutError:
+        fail(f"Pattern matching timed out after {timeout} seconds")
+
+    results = {}
+    for name, collector in unique.items():
+        results[name] = collector.result()
+        print(f"  - {name}: {results[name].count} unique matches")
+
+    if full:
+        _stop_reading(scan, commit_messages, dedup.max_matches)
+        for name, matches in results.items():
+            _prune_sources((sources or {}).get(name), matches.values)
+
+    if fail_on_empty and not any(matches.count for matches in results.values()):
+        fail(
+            "No environment information extracted and fail_on_empty is set to true"
+        )
+
+    return results
+
+
+def git_log_filter(patterns: Iterable[str]) -> LogFilter | None:
+    """Derive a git-side prefilter from one or more extraction patterns.
+
+    Each pattern is reduced to fixed strings of which every match must
+    contain at least one (``env:(\\w+)`` -> ``env:``; ``feat|fix`` -> both).
+    A commit containing none of them cannot match, so git may drop it before
+    it is ever sent to Python; the regex still runs on what git emits.
+    Returns None when any pattern has no usable required literal.
+
+    Literals are ASCII and contain no whitespace: ``%s`` joins a multi-line
+    subject with spaces, which git's grep over the raw message would not see.
+
+    The walk relies on CPython's private ``re._parser`` tree, whose layout
+    changes between releases; any failure there just skips the prefilter.
+    """
+    literals: list[str] = []
+    ignore_case = False
+    for pattern in patterns:
+        try:
+            from re import _constants as sre, _parser
+
+            parsed = _parser.parse(pattern)
+            flags = parsed.state.flags
+            folded = bool(flags & re.IGNORECASE)
+            required = _required_literals(
+                list(parsed), sre, folded and not flags & re.ASCII
+            )
+        except re.error:
+            return None
+        except Exception as e:
+            print_debug(f"Skipping git prefilter for {pattern!r}: {e!r}")
+            return None
+        if required is None or min(map(len, required)) < MIN_FILTER_LITERAL:
+            return None
+        ignore_case = ignore_case or folded
+        literals.extend(lit for lit in required if lit not in literals)
+    if not literals:
+        return None
+    return LogFilter(tuple(literals), ignore_case)
+
+
+def _required_literals(items: list, sre, unicode_folded: bool) -> list[str] | None:
+    """Return literals one of which every match of parsed ``items`` contains.
+
+    Walks the ``re._parser`` tree: runs of consecutive literal characters are
+    required, as is anything inside a group or a repeat with a minimum of one;
+    an alternation is required only if every branch is. Of the candidates
+    found, the one with the longest shortest literal wins.
+    """
+    best: list[str] | None = None
+    run: list[str] = []
+
+    def consider(candidate: list[str] | None) -> None:
+        nonlocal best
+        if not candidate:
+            return
+        score = (min(map(len, candidate)), -len(candidate))
+        if best is None or score > (min(map(len, best)), -len(best)):
+            best = candidate
+
+    for op, av in items:
+        if op is sre.LITERAL and _filterable(chr(av), unicode_folded):
+            run.append(chr(av))
+            continue
+        consider(["".join(run)] if run else None)
+        run = []
+        if op is sre.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if not (add_flags | del_flags) & re.IGNORECASE:
+                consider(_required_literals(sub, sre, unicode_folded))
+        elif op is sre.ATOMIC_GROUP:
+            consider(_required_literals(av, sre, unicode_folded))
+        elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT, sre.POSSESSIVE_REPEAT):
+            if av[0] >= 1:
+                consider(_required_literals(av[2], sre, unicode_folded))
+        elif op is sre.BRANCH:
+            alternatives: list[str] | None = []
+            for branch in av[1]:
+                required = _required_literals(branch, sre, unicode_folded)
+                if required is None:
+                    alternatives = None
+                    break
+                alternatives.extend(required)
+            consider(alternatives)
+    consider(["".join(run)] if run else None)
+    return best
+
+
+def _filterable(char: str, unicode_folded: bool) -> bool:
+    """Whether a literal character can be handed to git's fixed-string grep."""
+    if not (char.isascii() and char.isprintable()) or char.isspace():
+        return False
+    return not (unicode_folded and char in _UNICODE_FOLDED)
+
+
+def backtracking_risks(pattern: str) -> list[str]:
+    """Describe constructs in ``pattern`` that can backtrack catastrophically.
+
+    Flags an unbounded repeat inside another (``(a+)+``) and an unbounded
+    repeat over alternatives that can match at the same position
+    (``(a|aa)*``): on a long text that almost matches, the regex engine
+    tries exponentially many ways to split it before giving up. Atomic
+    groups and possessive repeats never backtrack into their contents and
+    are not flagged. This is a heuristic; an empty list is no guarantee.
+    """
+    from re import _constants as sre, _parser
+
+    try:
+        parsed = _parser.parse(pattern)
+    except re.error:
+        return []
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE)
+    risks: list[str] = []
+
+    def add(risk: str) -> None:
+        if risk not in risks:
+            risks.append(risk)
+
+    def walk(items, repeated: bool, starts: frozenset[int] | None) -> None:
+        # ``starts``: what an iteration of the enclosing unbounded repeat can
+        # start with. An inner repeat consuming those characters can end one
+        # iteration or run on into the next, which is what multiplies paths;
+        # (ab+c)* cannot, since no iteration starts with b.
+        for op, av in items:
+            if op in (sre.MAX_REPEAT, sre.MIN_REPEAT):
+                unbounded = av[1] == sre.MAXREPEAT
+                first = _first_chars(list(av[2]), sre, ignore_case)
+                if unbounded and repeated and (
+                    starts is None or first is None or starts & first
+                ):
+                    add("nests unbounded repeats, as in (a+)+")
+                if unbounded and not repeated:
+                    walk(av[2], True, first)
+                else:
+                    walk(av[2], repeated, starts)
+            elif op is sre.SUBPATTERN:
+                walk(av[3], repeated, starts)
+            elif op is sre.BRANCH:
+                if repeated and _overlapping_branches(av[1], sre, ignore_case):
+                    add("repeats alternatives that can match the same text, "
+                        "as in (a|aa)*")
+                for branch in av[1]:
+                    walk(branch, repeated, starts)
+            elif op in (sre.ASSERT, sre.ASSERT_NOT):
+                walk(av[1], repeated, starts)
+
+    walk(list(parsed), False, None)
+    return risks
+
+
+def _overlapping_branches(branches: list, sre, ignore_case: bool) -> bool:
+    """Whether two alternatives can start matching the same character.
+
+    Plain strings overlap only when one is a prefix of the other, so
+    ``(feat|fix)*`` is fine while ``(a|aa)*`` is not.
+    """
+    literals = [_literal_text(branch, sre) for branch in branches]
+    firsts = [_first_chars(list(branch), sre, ignore_case) for branch in branches]
+    for i in range(len(branches)):
+        for j in range(i + 1, len(branches)):
+            if literals[i] is not None and literals[j] is not None:
+                a, b = literals[i], literals[j]
+                if ignore_case:
+                    a, b = a.casefold(), b.casefold()
+                if a.startswith(b) or b.startswith(a):
+                    return True
+            elif firsts[i] is None or firsts[j] is None or firsts[i] & firsts[j]:
+                return True
+    return False
+
+
+def _literal_text(items, sre) -> str | None:
+    """The string a parsed branch matches, or None if it is not plain text."""
+    if all(op is sre.LITERAL for op, _ in items):
+        return "".join(chr(av) for _, av in items)
+    return None
+
+
+_ASCII = frozenset(range(128))
+
+
+def _first_chars(items: list, sre, ignore_case: bool) -> frozenset[int] | None:
+    """Characters (by code point, ASCII for classes) a match can start with.
+
+    None means unknown, or that the match can be empty.
+    """
+    for index, (op, av) in enumerate(items):
+        if op in (sre.AT, sre.ASSERT, sre.ASSERT_NOT):
+            continue
+        rest = items[index + 1 :]
+        if op is sre.LITERAL:
+            chars = {av}
+        elif op is sre.NOT_LITERAL:
+            chars = _ASCII - {av}
+        elif op is sre.ANY:
+            chars = set(_ASCII)
+        elif op is sre.IN:
+            chars = _class_chars(av, sre)
+        elif op is sre.SUBPATTERN:
+            return _first_chars(list(av[3]) + rest, sre, ignore_case)
+        elif op is sre.ATOMIC_GROUP:
+            return _first_chars(list(av) + rest, sre, ignore_case)
+        elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT, sre.POSSESSIVE_REPEAT):
+            first = _first_chars(list(av[2]), sre, ignore_case)
+            if av[0] >= 1 or first is None:
+                return first
+            following = _first_chars(rest, sre, ignore_case)
+            return None if following is None else first | following
+        elif op is sre.BRANCH:
+            union: set[int] = set()
+            for branch in av[1]:
+                first = _first_chars(list(branch) + rest, sre, ignore_case)
+                if first is None:
+                    return None
+                union |= first
+            chars = union
+        else:
+            return None
+        if ignore_case:
+            chars |= {ord(chr(c).swapcase()) for c in chars if chr(c).isascii()}
+        return frozenset(chars)
+    return None
+
+
+def _class_chars(items, sre) -> set[int]:
+    """ASCII (and listed) code points a parsed character class matches."""
+    categories = {
+        sre.CATEGORY_DIGIT: str.isdigit,
+        sre.CATEGORY_NOT_DIGIT: lambda c: not c.isdigit(),
+        sre.CATEGORY_SPACE: str.isspace,
+        sre.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+        sre.CATEGORY_WORD: lambda c: c.isalnum() or c == "_",
+        sre.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == "_"),
+    }
+    chars: set[int] = set()
+    negate = False
+    for op, av in items:
+        if op is sre.NEGATE:
+            negate = True
+        elif op is sre.LITERAL:
+            chars.add(av)
+        elif op is sre.RANGE:
+            low, high = av
+            chars.update(range(low, min(high, low + 1024) + 1))
+        elif op is sre.CATEGORY and av in categories:
+            chars.update(c for c in _ASCII if categories[av](chr(c)))
+        else:
+            return set(_ASCII)
+    return set(_ASCII - chars) if negate else chars
+
+
+def _feed_stdin(
+    stdin,
+    commit_messages: Iterable[str | CommitRecord],
+    errors: list[BaseException],
+) -> None:
+    """Write commit messages to a subprocess pipe, one commit at a time.
+
+    Errors raised while producing the messages are appended to ``errors``
+    so the calling thread can re-raise them.
+    """
+    try:
+        for chunk in _commit_stream(commit_messages):
+            stdin.write(chunk)
+    except (BrokenPipeError, ValueError):
+        # The command exited (or was killed) before reading all input.
+        pass
+    except Exception as e:
+        errors.append(e)
+    finally:
+        # Stop the producer (e.g. a git log stream) if the command quit early.
+        close = getattr(commit_messages, "close", None)
+        if close is not None:
+            close()
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def _commit_stream(
+    commits: Iterable[str | CommitRecord], separated: bool = False
+) -> Iterator[str]:
+    """Yield the commit stream a shell command reads, as git log printed it.
+
+    git log's default format puts a newline between commits, whose text
+    already ends in one; ``--pretty=%B`` (a tformat) ends each message with a
+    newline instead. ``separated`` continues a stream whose earlier commits
+    were written elsewhere.
+    """
+    for commit in commits:
+        if isinstance(commit, CommitRecord) and commit.pretty:
+            yield commit.text + "\n"
+            continue
+        if separated:
+            yield "\n"
+        separated = True
+        yield commit.text if isinstance(commit, CommitRecord) else commit
+
+
+def _commit_lines(
+    commits: Iterable[str | CommitRecord], separated: bool = False
+) -> Iterator[str]:
+    """Yield the lines a shell command would read from the commit stream."""
+    pending = ""
+    for chunk in _commit_stream(commits, separated):
+        lines = (pending + chunk).split("\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _with_deadline(lines: Iterator[str], timeout: int) -> Iterator[str]:
+    """Pass lines through, failing once ``timeout`` seconds have elapsed."""
+    deadline = time.monotonic() + timeout
+    for count, line in enumerate(lines):
+        if count % 1024 == 0 and time.monotonic() > deadline:
+            fail(f"Extract command timed out after {timeout} seconds")
+        yield line
 
 
 def _run_extract_command(
-    commit_messages: str, extract_command: str, timeout: int
-) -> str:
+    commit_messages: Commits,
+    extract_command: str,
+    timeout: int,
+    workers: int = 1,
+    dedup: Dedup = Dedup(),
+) -> Matches:
     """Run extraction command on commit messages.
 
+    Commands within the built-in grep/sed/awk/cut/sort/uniq subset run
+    in-process (see app.filters); anything else goes through bash. Long
+    streams are split across ``workers`` processes when the pipeline's output
+    does not depend on seeing the whole input at once and ``dedup`` only needs
+    distinct lines, which is all a batch returns. A pipeline that is only exact
+    on ASCII text keeps the commits it has read, and replays them through bash
+    if it meets a non-ASCII line.
+
     Args:
-        commit_messages: Input text.
+        commit_messages: Input text or iterable of per-commit messages/records.
         extract_command: Shell command to run.
         timeout: Command timeout in seconds.
+        workers: Worker processes for shardable in-process pipelines.
+        dedup: How the output lines are deduplicated and ordered.
 
     Returns:
-        Deduplicated, sorted extraction result.
+        Deduplicated extraction result.
     """
+    from app.filters import UnsupportedCommand, parse_pipeline
+
+    commit_messages = _iter_commits(commit_messages)
+
+    try:
+        pipeline = parse_pipeline(extract_command)
+    except UnsupportedCommand as e:
+        print_debug(f"Running extract command with bash ({e})")
+        return _run_shell_command(commit_messages, extract_command, timeout, dedup)
+
+    print_debug("Running extract command in-process")
+    source = iter(commit_messages)
+    read: list[str | CommitRecord] = []
+    try:
+        parallel, commits = _parallel_input(
+            _recorded(source, read) if pipeline.ascii_only else source,
+            workers if pipeline.shardable and dedup.distinct_only else 1,
+        )
+        if parallel:
+            lines = _run_pipeline_parallel(commits, extract_command, timeout, workers)
+        else:
+            output = pipeline.run(_with_deadline(_commit_lines(commits), timeout))
+            lines = [line for line in output if line.strip()]
+    except UnsupportedCommand as e:
+        print_debug(f"Running extract command with bash ({e})")
+        return _run_shell_command(chain(read, source), extract_command, timeout, dedup)
+    finally:
+        _close(commit_messages)
+
+    print_debug(f"Output lines: {len(lines)}")
+    return _unique(lines, dedup)
+
+
+def _recorded(items: Iterable[T], read: list[T]) -> Iterator[T]:
+    """Yield ``items``, appending each to ``read`` so it can be replayed."""
+    for item in items:
+        read.append(item)
+        yield item
+
+
+def _run_pipeline_parallel(
+    commits: Iterator[str | CommitRecord], command: str, timeout: int, workers: int
+) -> list[str]:
+    """Run a shardable in-process pipeline over batches of commits in a pool."""
+    print_debug(f"Running extract command in parallel with {workers} workers")
+    deadline = time.monotonic() + timeout
+    tasks = (
+        (None, (command, list(_commit_lines(batch, n > 0))))
+        for n, batch in enumerate(_batched(commits, PARALLEL_BATCH_COMMITS))
+    )
+    lines: list[str] = []
     try:
-        result = subprocess.run(
+        for _, output in _parallel_map(_run_pipeline_batch, tasks, workers, deadline):
+            lines.extend(output)
+    except TimeoutError:
+        fail(f"Extract command timed out after {timeout} seconds")
+    return lines
+
+
+# Pipelines parsed in this (worker) process, by command.
+_pipelines: dict[str, "Pipeline"] = {}
+
+
+def _run_pipeline_batch(command: str, lines: list[str]) -> list[str]:
+    """Worker task: run a pipeline over one batch and return its distinct lines."""
+    pipeline = _pipelines.get(command)
+    if pipeline is None:
+        from app.filters import parse_pipeline
+
+        pipeline = _pipelines[command] = parse_pipeline(command)
+    return list(dict.fromkeys(line for line in pipeline.run(lines) if line.strip()))
+
+
+def _run_shell_command(
+    commit_messages: Iterable[str | CommitRecord],
+    extract_command: str,
+    timeout: int,
+    dedup: Dedup = Dedup(),
+) -> Matches:
+    """Run extraction command through bash.
+
+    Commits are written to the command's stdin from a feeder thread as they
+    are produced, so the full log is never materialized for the pipe.
+
+    Args:
+        commit_messages: Iterable of per-commit messages/records.
+        extract_command: Shell command to run.
+        timeout: Command timeout in seconds.
+        dedup: How the output lines are deduplicated and ordered.
+
+    Returns:
+        Deduplicated extraction result.
+    """
+    try:
+        process = subprocess.Popen(
             extract_command,
             shell=True,
-            input=commit_messages,
-            capture_output=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            check=False,
             executable="/bin/bash",
-            timeout=timeout,
         )
+    except (OSError, subprocess.SubprocessError) as e:
+        print_debug(f"Exception type: {type(e).__name__}")
+        fail(f"Failed to extract environment information: {e}")
 
-        print_debug(f"Command exit code: {result.returncode}")
-        print_debug(f"Output length: {len(result.stdout)} characters")
+    # The feeder thread owns stdin; detach it so communicate() only reads.
+    stdin, process.stdin = process.stdin, None
+    errors: list[BaseException] = []
+    feeder = threading.Thread(
+        target=_feed_stdin, args=(stdin, commit_messages, errors), daemon=True
+    )
+    feeder.start()
 
-        lines = _non_empty_lines(result.stdout)
-        environment = _deduplicate_and_join(lines)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        fail(f"Extract command timed out after {timeout} seconds")
+    finally:
+        feeder.join()
 
-        if result.returncode > 1 and result.stderr:
-            print_debug(
-                f"Command warning (exit {result.returncode}): {result.stderr}"
-            )
+    if errors:
+        raise errors[0]
 
-        return environment
+    print_debug(f"Command exit code: {process.returncode}")
+    print_debug(f"Output length: {len(stdout)} characters")
 
-    except subprocess.TimeoutExpired:
-        fail(f"Extract command timed out after {timeout} seconds")
-    except subprocess.SubprocessError as e:
-        print_debug(f"Exception type: {type(e).__name__}")
-        fail(f"Failed to extract environment information: {e}")
+    matches = _unique(_non_empty_lines(stdout), dedup)
+
+    if process.returncode > 1 and stderr:
+        print_debug(
+            f"Command warning (exit {process.returncode}): {stderr}"
+        )
 
-    return ""
+    return matches
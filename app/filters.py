@@ -0,0 +1,1039 @@
+"""In-process implementation of common extract_command text filters.
+
+Most ``extract_command`` values are short ``grep``/``sed``/``awk``/``cut``/
+``sort``/``uniq`` pipelines. :func:`parse_pipeline` turns such a command into
+a chain of Python stages that run over the commit lines without forking a
+shell. Anything outside the supported subset raises
+:class:`UnsupportedCommand` and the caller falls back to ``/bin/bash``, so the
+built-in path only ever handles commands whose output it reproduces exactly.
+
+Python works on characters where ``cut -c`` counts bytes and where the POSIX
+bracket classes of grep/sed/awk cover the whole of Unicode in a UTF-8 locale.
+Pipelines using those only run in-process over ASCII input: the first
+non-ASCII line raises :class:`UnsupportedCommand` from :meth:`Pipeline.run`
+and the caller replays the input through bash.
+"""
+
+import re
+import string
+from collections.abc import Callable, Iterable, Iterator
+
+# Characters with shell meaning beyond plain words when unquoted.
+_UNQUOTED_SPECIAL = frozenset("$*?[]{}~`\\#\n")
+_OPERATOR_CHARS = frozenset("|&;<>()")
+
+# POSIX bracket classes, translated to ASCII ranges (exact on ASCII text only).
+_POSIX_CLASSES = {
+    "alpha": "a-zA-Z",
+    "digit": "0-9",
+    "alnum": "a-zA-Z0-9",
+    "upper": "A-Z",
+    "lower": "a-z",
+    "space": " \\t\\n\\r\\f\\v",
+    "blank": " \\t",
+    "punct": "!-/:-@\\[-`{-~",
+    "xdigit": "0-9A-Fa-f",
+}
+
+_TR_CLASSES = {
+    "alpha": string.ascii_letters,
+    "digit": string.digits,
+    "alnum": string.ascii_letters + string.digits,
+    "upper": string.ascii_uppercase,
+    "lower": string.ascii_lowercase,
+    "blank": " \t",
+    "punct": string.punctuation,
+    "xdigit": string.hexdigits,
+}
+
+# GNU regex escapes outside brackets that mean the same thing in Python.
+_SHARED_ESCAPES = frozenset("wWsSbB")
+_REGEX_META = frozenset(".[]()*+?{}|^$\\")
+
+
+class UnsupportedCommand(ValueError):
+    """Raised when a command is outside the built-in filter subset."""
+
+
+Stage = Callable[[Iterable[str]], Iterator[str]]
+
+
+class Pipeline:
+    """A parsed command: stages applied left to right over input lines.
+
+    ``shardable`` is True when running the pipeline over consecutive chunks
+    of the input and concatenating the outputs gives the same lines as one
+    run over the whole input, up to order and duplicates (which extraction
+    discards anyway), so chunks can be processed in parallel. ``ascii_only`` is
+    True when a stage only matches the real tool on ASCII text.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        description: str,
+        shardable: bool = False,
+        ascii_only: bool = False,
+    ) -> None:
+        self.stages = stages
+        self.description = description
+        self.shardable = shardable
+        self.ascii_only = ascii_only
+
+    def run(self, lines: Iterable[str]) -> Iterator[str]:
+        """Lazily run every stage over ``lines``.
+
+        Raises:
+            UnsupportedCommand: While iterating, on a non-ASCII line of input
+                to an ``ascii_only`` pipeline.
+        """
+        if self.ascii_only:
+            lines = _ascii_lines(lines)
+        for stage in self.stages:
+            lines = stage(lines)
+        return iter(lines)
+
+
+def _ascii_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        if not line.isascii():
+            raise UnsupportedCommand(f"non-ASCII input: {line[:40]!r}")
+        yield line
+
+
+# ---------------------------------------------------------------------------
+# Command line tokenizing
+# ---------------------------------------------------------------------------
+
+
+def _tokenize(command: str) -> list[tuple[str, bool]]:
+    """Split a command line into ``(text, is_operator)`` tokens.
+
+    Only single and double quotes are understood. Anything whose meaning
+    depends on shell expansion (variables, globs, escapes, comments) raises
+    UnsupportedCommand so the command is left to bash.
+    """
+    tokens: list[tuple[str, bool]] = []
+    word: str | None = None
+    quote = ""
+    i = 0
+    while i < len(command):
+        char = command[i]
+        if quote:
+            if char == quote:
+                quote = ""
+            elif quote == '"' and char in "$`\\":
+                raise UnsupportedCommand(f"shell expansion inside double quotes: {char}")
+            else:
+                word += char
+            i += 1
+            continue
+        if char in "'\"":
+            quote = char
+            word = word or ""
+        elif char in " \t":
+            if word is not None:
+                tokens.append((word, False))
+                word = None
+        elif char in _OPERATOR_CHARS:
+            if word is not None:
+                tokens.append((word, False))
+                word = None
+            operator = char
+            while i + 1 < len(command) and command[i + 1] in _OPERATOR_CHARS:
+                i += 1
+                operator += command[i]
+            tokens.append((operator, True))
+        elif char in _UNQUOTED_SPECIAL:
+            raise UnsupportedCommand(f"unquoted shell character: {char!r}")
+        else:
+            word = (word or "") + char
+        i += 1
+    if quote:
+        raise UnsupportedCommand("unterminated quote")
+    if word is not None:
+        tokens.append((word, False))
+    return tokens
+
+
+def _split_commands(command: str) -> list[list[str]]:
+    """Split a command line into the argv lists of a simple ``|`` pipeline.
+
+    A trailing ``|| true`` only masks the exit status, which extraction
+    ignores anyway, so it is accepted and dropped.
+    """
+    tokens = _tokenize(command)
+    if tokens[-2:] == [("||", True), ("true", False)]:
+        tokens = tokens[:-2]
+
+    commands: list[list[str]] = [[]]
+    for text, is_operator in tokens:
+        if not is_operator:
+            commands[-1].append(text)
+        elif text == "|":
+            commands.append([])
+        else:
+            raise UnsupportedCommand(f"unsupported shell operator: {text}")
+    if any(not argv for argv in commands):
+        raise UnsupportedCommand("empty pipeline stage")
+    return commands
+
+
+def _parse_options(
+    args: list[str], flags: str, valued: str = ""
+) -> tuple[set[str], dict[str, list[str]], list[str]]:
+    """Parse short options POSIX-style.
+
+    Options after the first operand are treated as operands (no GNU
+    permutation), which only ever sends such commands to bash.
+
+    Args:
+        args: Arguments after the command name.
+        flags: Single-letter options without a value.
+        valued: Single-letter options that take a value (``-n5`` or ``-n 5``).
+
+    Returns:
+        Tuple of (flags seen, option values in order, positional arguments).
+
+    Raises:
+        UnsupportedCommand: On unknown or long options.
+    """
+    seen: set[str] = set()
+    values: dict[str, list[str]] = {}
+    positional: list[str] = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if positional or not arg.startswith("-") or arg == "-":
+            positional.append(arg)
+            continue
+        if arg == "--":
+            positional.extend(args[i:])
+            break
+        if arg.startswith("--"):
+            raise UnsupportedCommand(f"unsupported option: {arg}")
+        for j, opt in enumerate(arg[1:], 1):
+            if opt in valued:
+                value = arg[j + 1 :]
+                if not value:
+                    if i >= len(args):
+                        raise UnsupportedCommand(f"missing value for -{opt}")
+                    value = args[i]
+                    i += 1
+                values.setdefault(opt, []).append(value)
+                break
+            if opt not in flags:
+                raise UnsupportedCommand(f"unsupported option: -{opt}")
+            seen.add(opt)
+    return seen, values, positional
+
+
+# ---------------------------------------------------------------------------
+# Regex translation
+# ---------------------------------------------------------------------------
+
+
+def _translate_bracket(pattern: str, start: int) -> tuple[str, int]:
+    """Translate a POSIX bracket expression starting at ``pattern[start]``.
+
+    Returns the Python equivalent and the index just past the closing ``]``.
+    Backslash is literal inside POSIX brackets, so it is escaped here.
+    """
+    i = start + 1
+    out = "["
+    if i < len(pattern) and pattern[i] == "^":
+        out += "^"
+        i += 1
+    first = True
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "]" and not first:
+            return out + "]", i + 1
+        if pattern.startswith("[:", i):
+            end = pattern.find(":]", i + 2)
+            if end == -1:
+                raise UnsupportedCommand("unterminated character class")
+            name = pattern[i + 2 : end]
+            if name not in _POSIX_CLASSES:
+                raise UnsupportedCommand(f"unsupported character class: {name}")
+            out += _POSIX_CLASSES[name]
+            i = end + 2
+        elif pattern.startswith(("[=", "[."), i):
+            raise UnsupportedCommand("collating elements are not supported")
+        elif char in "\\[]^":
+            out += "\\" + char
+            i += 1
+        else:
+            out += char
+            i += 1
+        first = False
+    raise UnsupportedCommand("unterminated bracket expression")
+
+
+def _translate_posix(pattern: str, extended: bool) -> str:
+    """Translate a GNU basic/extended regex into Python syntax."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "[":
+            translated, i = _translate_bracket(pattern, i)
+            out.append(translated)
+            continue
+        if char == "\\":
+            if i + 1 >= len(pattern):
+                raise UnsupportedCommand("trailing backslash in regex")
+            nxt = pattern[i + 1]
+            i += 2
+            if nxt in "<>":
+                out.append("\\b")
+            elif nxt in _SHARED_ESCAPES:
+                out.append("\\" + nxt)
+            elif not extended and nxt in "(){}|+?":
+                out.append(nxt)
+            elif nxt in _REGEX_META or nxt in "/-,:=!\"'#%&@~<>; ":
+                out.append(re.escape(nxt))
+            else:
+                # \d, \n, \1 ... differ between GNU tools and Python.
+                raise UnsupportedCommand(f"unsupported regex escape: \\{nxt}")
+            continue
+        if not extended and (
+            char in "(){}|+?"
+            # BRE anchors and '*' are only special in leading/trailing position.
+            or (char == "^" and i > 0 and out[-1] != "(")
+            or (char == "$" and i < len(pattern) - 1 and pattern[i + 1 : i + 3] != "\\)")
+            or (char == "*" and (i == 0 or out[-1] in ("(", "^")))
+        ):
+            out.append("\\" + char)
+        else:
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def _is_literal(branch: str) -> bool:
+    """Return True if a Python regex branch only matches one fixed string."""
+    i = 0
+    while i < len(branch):
+        if branch[i] == "\\":
+            if i + 1 >= len(branch) or branch[i + 1].isalnum():
+                return False
+            i += 2
+            continue
+        if branch[i] in _REGEX_META:
+            return False
+        i += 1
+    return True
+
+
+def _unescape_literal(branch: str) -> str:
+    return re.sub(r"\\(.)", r"\1", branch)
+
+
+def _check_matching_discipline(pattern: str, ignore_case: bool) -> None:
+    """Reject regexes whose match can depend on the matching discipline.
+
+    POSIX tools return the leftmost-longest match while Python returns the
+    first one its backtracking finds. The two agree when every alternation is
+    made of fixed strings none of which is a prefix of another (at most one
+    alternative can match at any position) and no group is quantified, so
+    anything else is left to the real tool.
+    """
+    groups: list[list[str]] = [[""]]
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            groups[-1][-1] += pattern[i : i + 2]
+            i += 2
+            continue
+        if char == "[":
+            # Translated brackets escape every literal ']' and '\\'.
+            i += 1
+            while pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            groups[-1][-1] += "\0"  # non-literal marker
+            i += 1
+            continue
+        if char == "(":
+            groups.append([""])
+        elif char == ")":
+            _check_branches(groups.pop(), ignore_case)
+            groups[-1][-1] += "\0"
+            if pattern[i + 1 : i + 2] in ("*", "+", "?", "{"):
+                raise UnsupportedCommand("quantified group")
+        elif char == "|":
+            groups[-1].append("")
+        else:
+            groups[-1][-1] += char
+        i += 1
+    for branches in groups:
+        _check_branches(branches, ignore_case)
+
+
+def _check_branches(branches: list[str], ignore_case: bool) -> None:
+    if len(branches) < 2:
+        return
+    if not all(_is_literal(b) and "\0" not in b for b in branches):
+        raise UnsupportedCommand("alternation of non-literal branches")
+    literals = [_unescape_literal(b) for b in branches]
+    if ignore_case:
+        literals = [literal.casefold() for literal in literals]
+    for i, a in enumerate(literals):
+        for j, b in enumerate(literals):
+            if i != j and b.startswith(a):
+                raise UnsupportedCommand("alternation branches share a prefix")
+
+
+def compile_regex(pattern: str, syntax: str, ignore_case: bool = False) -> re.Pattern:
+    """Compile a grep/sed/awk regex for in-process use.
+
+    Args:
+        pattern: The regex as written on the command line.
+        syntax: ``basic`` (BRE), ``extended`` (ERE), ``perl`` or ``fixed``.
+        ignore_case: Whether to match case-insensitively.
+
+    Raises:
+        UnsupportedCommand: If the regex cannot be reproduced exactly.
+    """
+    if syntax == "fixed":
+        translated = re.escape(pattern)
+    elif syntax == "perl":
+        translated = pattern
+    else:
+        translated = _translate_posix(pattern, syntax == "extended")
+        _check_matching_discipline(translated, ignore_case)
+    try:
+        return re.compile(translated, re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        raise UnsupportedCommand(f"regex not supported in-process: {e}") from e
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+
+def _grep(args: list[str]) -> Stage:
+    flags, values, positional = _parse_options(args, "oEPFivwxcqsh", "em")
+    if "e" in values:
+        patterns = "\n".join(values["e"]).split("\n")
+    elif positional:
+        patterns = positional[0].split("\n")
+        positional = positional[1:]
+    else:
+        raise UnsupportedCommand("grep without a pattern")
+    if positional:
+        raise UnsupportedCommand("grep reading files")
+
+    syntax = "basic"
+    for flag, name in (("E", "extended"), ("P", "perl"), ("F", "fixed")):
+        if flag in flags:
+            syntax = name
+    compiled = [compile_regex(p, syntax, "i" in flags) for p in patterns]
+    if len(compiled) == 1:
+        regex = compiled[0]
+    elif "o" in flags:
+        raise UnsupportedCommand("grep -o with several patterns")
+    else:
+        regex = None
+    if "w" in flags or "x" in flags:
+        if regex is None:
+            raise UnsupportedCommand("grep -w/-x with several patterns")
+        wrap = r"(?<!\w)(?:{})(?!\w)" if "w" in flags else r"\A(?:{})\Z"
+        regex = re.compile(wrap.format(regex.pattern), regex.flags)
+    search = regex.search if regex is not None else None
+    max_count = -1
+    if "m" in values:
+        if not values["m"][-1].isdigit():
+            raise UnsupportedCommand(f"unsupported grep -m value: {values['m'][-1]}")
+        max_count = int(values["m"][-1])
+    invert = "v" in flags
+
+    def matches(line: str) -> bool:
+        if search is not None:
+            found = search(line) is not None
+        else:
+            found = any(r.search(line) for r in compiled)
+        return found != invert
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        selected = 0
+        count = 0
+        for line in lines:
+            if selected == max_count:
+                break
+            if not matches(line):
+                continue
+            selected += 1
+            if "q" in flags:
+                return
+            if "c" in flags:
+                count += 1
+            elif "o" in flags:
+                if invert:
+                    continue
+                for m in regex.finditer(line):
+                    if m.group(0):
+                        yield m.group(0)
+            else:
+                yield line
+        if "c" in flags:
+            yield str(count)
+
+    return stage
+
+
+# Replacement escapes; "\n" is absent because it would split a line in two.
+_SED_ESCAPES = {"t": "\t", "&": "&", "\\": "\\"}
+
+
+def _sed_replacement(template: str, delimiter: str) -> Callable[[re.Match], str]:
+    """Build a replacement function from a sed ``s`` replacement string."""
+    parts: list[str | int] = []
+    literal = ""
+    i = 0
+    while i < len(template):
+        char = template[i]
+        if char == "\\" and i + 1 < len(template):
+            nxt = template[i + 1]
+            i += 2
+            if nxt.isdigit():
+                parts.extend([literal, int(nxt)])
+                literal = ""
+            elif nxt in _SED_ESCAPES:
+                literal += _SED_ESCAPES[nxt]
+            elif nxt == delimiter:
+                literal += nxt
+            else:
+                raise UnsupportedCommand(f"unsupported sed escape: \\{nxt}")
+            continue
+        if char == "&":
+            parts.extend([literal, 0])
+            literal = ""
+        else:
+            literal += char
+        i += 1
+    parts.append(literal)
+
+    def replace(m: re.Match) -> str:
+        return "".join(
+            part if isinstance(part, str) else (m.group(part) or "") for part in parts
+        )
+
+    return replace
+
+
+def _split_delimited(
+    script: str, start: int, delimiter: str, count: int
+) -> tuple[list[str], int]:
+    """Split ``count`` delimiter-terminated fields of a sed command."""
+    fields = []
+    current = ""
+    i = start
+    while len(fields) < count:
+        if i >= len(script):
+            raise UnsupportedCommand("unterminated sed command")
+        char = script[i]
+        if char == "\\" and i + 1 < len(script):
+            nxt = script[i + 1]
+            if nxt == delimiter and delimiter in _REGEX_META:
+                raise UnsupportedCommand("escaped regex metacharacter as sed delimiter")
+            current += nxt if nxt == delimiter else char + nxt
+            i += 2
+            continue
+        if char == delimiter:
+            fields.append(current)
+            current = ""
+        else:
+            current += char
+        i += 1
+    return fields, i
+
+
+def _parse_sed_script(script: str, syntax: str) -> list[tuple]:
+    """Parse a sed script into (address, command, args) tuples."""
+    commands = []
+    i = 0
+    while i < len(script):
+        char = script[i]
+        if char in " \t\n;":
+            i += 1
+            continue
+        address = None
+        if char == "/":
+            (regex,), i = _split_delimited(script, i + 1, "/", 1)
+            address = compile_regex(regex, syntax)
+            while i < len(script) and script[i] in " \t":
+                i += 1
+            if i >= len(script):
+                raise UnsupportedCommand("sed address without a command")
+            char = script[i]
+        if char == "s":
+            if i + 1 >= len(script):
+                raise UnsupportedCommand("unterminated sed command")
+            delimiter = script[i + 1]
+            (regex, replacement), i = _split_delimited(script, i + 2, delimiter, 2)
+            sed_flags = ""
+            while i < len(script) and script[i] not in " \t\n;":
+                sed_flags += script[i]
+                i += 1
+            if set(sed_flags) - set("gpI"):
+                raise UnsupportedCommand(f"unsupported sed flags: {sed_flags}")
+            compiled = compile_regex(regex, syntax, "I" in sed_flags)
+            replace = _sed_replacement(replacement, delimiter)
+            commands.append((address, "s", compiled, replace, sed_flags))
+        elif char in "pd":
+            commands.append((address, char))
+            i += 1
+        else:
+            raise UnsupportedCommand(f"unsupported sed command: {char}")
+    return commands
+
+
+def _sed(args: list[str]) -> Stage:
+    flags, values, positional = _parse_options(args, "nEr", "e")
+    if "e" in values:
+        script = "\n".join(values["e"])
+    elif positional:
+        script = positional[0]
+        positional = positional[1:]
+    else:
+        raise UnsupportedCommand("sed without a script")
+    if positional:
+        raise UnsupportedCommand("sed reading files")
+    syntax = "extended" if flags & {"E", "r"} else "basic"
+    commands = _parse_sed_script(script, syntax)
+    quiet = "n" in flags
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            deleted = False
+            for command in commands:
+                address = command[0]
+                if address is not None and not address.search(line):
+                    continue
+                name = command[1]
+                if name == "d":
+                    deleted = True
+                    break
+                if name == "p":
+                    yield line
+                    continue
+                _, _, regex, replace, sed_flags = command
+                count = 0 if "g" in sed_flags else 1
+                line, replaced = regex.subn(replace, line, count=count)
+                if replaced and "p" in sed_flags:
+                    yield line
+            if not deleted and not quiet:
+                yield line
+
+    return stage
+
+
+# [/regex/] [{ print ... }] -- the only awk program shape handled in-process.
+_AWK_PROGRAM = re.compile(
+    r"\s*(?:/(?P<regex>(?:\\.|[^/\\])*)/)?"
+    r"\s*(?:\{\s*(?P<action>[^{}]*?)\s*;?\s*\})?\s*"
+)
+_AWK_TERM = re.compile(
+    r'\s*(?:\$(?P<field>\d+|NF)|(?P<nf>NF)|"(?P<string>(?:\\.|[^"\\])*)")'
+)
+_AWK_BLANKS = re.compile(r"[ \t\n]+")
+
+
+def _parse_awk_print(action: str) -> list[list[tuple[str, str]]]:
+    """Parse ``print a, b c`` into comma-separated lists of concatenated terms."""
+    if action == "":
+        return []
+    if not re.fullmatch(r"print\b.*", action, re.DOTALL):
+        raise UnsupportedCommand(f"unsupported awk action: {action}")
+    rest = action[len("print") :]
+    if not rest.strip():
+        return [[("field", "0")]]
+    items: list[list[tuple[str, str]]] = [[]]
+    i = 0
+    while i < len(rest):
+        if rest[i].isspace():
+            i += 1
+            continue
+        if rest[i] == ",":
+            items.append([])
+            i += 1
+            continue
+        m = _AWK_TERM.match(rest, i)
+        if m is None:
+            raise UnsupportedCommand(f"unsupported awk expression: {rest[i:]}")
+        if m.group("field") is not None:
+            items[-1].append(("field", m.group("field")))
+        elif m.group("nf") is not None:
+            items[-1].append(("nf", ""))
+        else:
+            string = m.group("string")
+            if "\\" in string:
+                raise UnsupportedCommand("awk string escapes are not supported")
+            items[-1].append(("string", string))
+        i = m.end()
+    if any(not item for item in items):
+        raise UnsupportedCommand("empty awk print argument")
+    return items
+
+
+def _awk(args: list[str]) -> Stage:
+    _, values, positional = _parse_options(args, "", "F")
+    if len(positional) != 1:
+        raise UnsupportedCommand("awk needs exactly one program and no files")
+    program = _AWK_PROGRAM.fullmatch(positional[0])
+    if program is None or program.group("regex", "action") == (None, None):
+        raise UnsupportedCommand(f"unsupported awk program: {positional[0]}")
+    address = (
+        compile_regex(program.group("regex"), "extended")
+        if program.group("regex") is not None
+        else None
+    )
+    action = program.group("action")
+    items = _parse_awk_print(action) if action is not None else [[("field", "0")]]
+
+    separator = values.get("F", [" "])[-1]
+    if separator == " ":
+
+        def split(line: str) -> list[str]:
+            return [field for field in _AWK_BLANKS.split(line) if field]
+
+    elif len(separator) == 1 and separator != "\\":
+
+        def split(line: str) -> list[str]:
+            return line.split(separator) if line else []
+
+    else:
+        fs = compile_regex(separator, "extended")
+
+        def split(line: str) -> list[str]:
+            return fs.split(line) if line else []
+
+    def render(term: tuple[str, str], line: str, fields: list[str]) -> str:
+        kind, value = term
+        if kind == "string":
+            return value
+        if kind == "nf":
+            return str(len(fields))
+        index = len(fields) if value == "NF" else int(value)
+        if index == 0:
+            return line
+        return fields[index - 1] if index <= len(fields) else ""
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            if address is not None and not address.search(line):
+                continue
+            if not items:
+                continue
+            fields = split(line)
+            yield " ".join(
+                "".join(render(term, line, fields) for term in item) for item in items
+            )
+
+    return stage
+
+
+def _parse_list(spec: str) -> Callable[[int], bool]:
+    """Parse a cut ``-f``/``-c`` list like ``1,3-4,6-`` into a predicate."""
+    ranges = []
+    for part in spec.split(","):
+        m = re.fullmatch(r"(\d*)(-?)(\d*)", part)
+        if m is None or part in ("", "-"):
+            raise UnsupportedCommand(f"invalid cut list: {spec}")
+        low = int(m.group(1)) if m.group(1) else 1
+        if m.group(2):
+            high = int(m.group(3)) if m.group(3) else None
+        else:
+            high = low
+        if low < 1:
+            raise UnsupportedCommand(f"invalid cut list: {spec}")
+        ranges.append((low, high))
+    return lambda n: any(
+        low <= n and (high is None or n <= high) for low, high in ranges
+    )
+
+
+def _cut(args: list[str]) -> Stage:
+    flags, values, positional = _parse_options(args, "s", "dfc")
+    if positional:
+        raise UnsupportedCommand("cut reading files")
+    if ("f" in values) == ("c" in values):
+        raise UnsupportedCommand("cut needs exactly one of -f or -c")
+    delimiter = values.get("d", ["\t"])[-1]
+    if len(delimiter) != 1 or not delimiter.isascii():
+        raise UnsupportedCommand("cut delimiter must be a single ASCII character")
+    if "c" in values:
+        wanted = _parse_list(values["c"][-1])
+
+        def stage(lines: Iterable[str]) -> Iterator[str]:
+            for line in lines:
+                yield "".join(c for n, c in enumerate(line, 1) if wanted(n))
+
+        return stage
+
+    wanted = _parse_list(values["f"][-1])
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            if delimiter not in line:
+                if "s" not in flags:
+                    yield line
+                continue
+            fields = line.split(delimiter)
+            yield delimiter.join(f for n, f in enumerate(fields, 1) if wanted(n))
+
+    return stage
+
+
+def _numeric_prefix(line: str) -> float:
+    m = re.match(r"\s*(-?\d+(?:\.\d*)?|-?\.\d+)", line)
+    return float(m.group(1)) if m else 0.0
+
+
+def _sort(args: list[str]) -> Stage:
+    flags, _, positional = _parse_options(args, "urn")
+    if positional:
+        raise UnsupportedCommand("sort reading files")
+    if {"n", "u"} <= flags:
+        raise UnsupportedCommand("sort -nu compares numeric keys only")
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        items = list(dict.fromkeys(lines)) if "u" in flags else list(lines)
+        if "n" in flags:
+            items.sort(
+                key=lambda line: (_numeric_prefix(line), line), reverse="r" in flags
+            )
+        else:
+            items.sort(reverse="r" in flags)
+        return iter(items)
+
+    return stage
+
+
+def _uniq(args: list[str]) -> Stage:
+    flags, _, positional = _parse_options(args, "cdu")
+    if positional:
+        raise UnsupportedCommand("uniq reading files")
+
+    def emit(line: str, count: int) -> Iterator[str]:
+        if "d" in flags and count < 2:
+            return
+        if "u" in flags and count > 1:
+            return
+        yield f"{count:7d} {line}" if "c" in flags else line
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        previous = None
+        count = 0
+        for line in lines:
+            if line == previous:
+                count += 1
+                continue
+            if previous is not None:
+                yield from emit(previous, count)
+            previous, count = line, 1
+        if previous is not None:
+            yield from emit(previous, count)
+
+    return stage
+
+
+def _line_count(args: list[str], command: str) -> tuple[int, bool]:
+    """Parse ``-N``, ``-n N`` and (tail) ``-n +N`` line counts."""
+    if len(args) == 1 and re.fullmatch(r"-\d+", args[0]):
+        return int(args[0][1:]), False
+    _, values, positional = _parse_options(args, "", "n")
+    if positional:
+        raise UnsupportedCommand(f"{command} reading files")
+    value = values.get("n", ["10"])[-1]
+    if command == "tail" and value.startswith("+") and value[1:].isdigit():
+        return int(value[1:]), True
+    if not value.isdigit():
+        raise UnsupportedCommand(f"unsupported {command} count: {value}")
+    return int(value), False
+
+
+def _head(args: list[str]) -> Stage:
+    count, _ = _line_count(args, "head")
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        if count == 0:
+            return
+        for n, line in enumerate(lines, 1):
+            yield line
+            if n >= count:
+                return
+
+    return stage
+
+
+def _tail(args: list[str]) -> Stage:
+    count, from_start = _line_count(args, "tail")
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        if from_start:
+            for n, line in enumerate(lines, 1):
+                if n >= count:
+                    yield line
+            return
+        if count == 0:
+            for _ in lines:
+                pass
+            return
+        buffer: list[str] = []
+        for line in lines:
+            buffer.append(line)
+            if len(buffer) > count:
+                del buffer[0]
+        yield from buffer
+
+    return stage
+
+
+def _cat(args: list[str]) -> Stage:
+    if args:
+        raise UnsupportedCommand("cat with arguments")
+    return lambda lines: iter(lines)
+
+
+def _expand_tr_set(spec: str) -> str:
+    """Expand a tr set (ranges and POSIX classes) into its characters."""
+    if "\\" in spec or "[=" in spec or re.search(r"\[.\*", spec):
+        raise UnsupportedCommand(f"unsupported tr set: {spec}")
+    if not spec.isascii():
+        # tr maps bytes, not characters.
+        raise UnsupportedCommand(f"non-ASCII tr set: {spec}")
+    chars = []
+    i = 0
+    while i < len(spec):
+        m = re.match(r"\[:(\w+):\]", spec[i:])
+        if m:
+            if m.group(1) not in _TR_CLASSES:
+                raise UnsupportedCommand(f"unsupported tr class: {m.group(1)}")
+            chars.extend(_TR_CLASSES[m.group(1)])
+            i += m.end()
+        elif i + 2 < len(spec) and spec[i + 1] == "-":
+            low, high = ord(spec[i]), ord(spec[i + 2])
+            if low > high:
+                raise UnsupportedCommand(f"invalid tr range: {spec}")
+            chars.extend(chr(c) for c in range(low, high + 1))
+            i += 3
+        else:
+            chars.append(spec[i])
+            i += 1
+    return "".join(chars)
+
+
+def _tr(args: list[str]) -> Stage:
+    flags, _, positional = _parse_options(args, "d")
+    if "d" in flags:
+        if len(positional) != 1:
+            raise UnsupportedCommand("tr -d needs one set")
+        table = str.maketrans("", "", _expand_tr_set(positional[0]))
+    else:
+        if len(positional) != 2:
+            raise UnsupportedCommand("tr needs two sets")
+        source = _expand_tr_set(positional[0])
+        target = _expand_tr_set(positional[1])
+        if not target:
+            raise UnsupportedCommand("tr with an empty target set")
+        target = target[: len(source)].ljust(len(source), target[-1])
+        table = str.maketrans(source, target)
+
+    return lambda lines: (line.translate(table) for line in lines)
+
+
+def _wc(args: list[str]) -> Stage:
+    if args != ["-l"]:
+        raise UnsupportedCommand("only wc -l is supported")
+
+    def stage(lines: Iterable[str]) -> Iterator[str]:
+        yield str(sum(1 for _ in lines))
+
+    return stage
+
+
+_COMMANDS: dict[str, Callable[[list[str]], Stage]] = {
+    "grep": _grep,
+    "egrep": lambda args: _grep(["-E", *args]),
+    "fgrep": lambda args: _grep(["-F", *args]),
+    "sed": _sed,
+    "awk": _awk,
+    "cut": _cut,
+    "sort": _sort,
+    "uniq": _uniq,
+    "head": _head,
+    "tail": _tail,
+    "cat": _cat,
+    "tr": _tr,
+    "wc": _wc,
+}
+
+
+# Commands that process each line independently, or only reorder lines.
+_SHARDABLE_COMMANDS = frozenset({"sed", "awk", "cut", "tr", "cat", "sort"})
+
+
+def _is_shardable(name: str, args: list[str]) -> bool:
+    """Whether a command's output over split input is the union of its parts.
+
+    Counting (``grep -c``, ``uniq -c``, ``wc``), selecting by position
+    (``head``, ``tail``, ``grep -m``) and ``uniq -d``/``-u`` depend on the
+    input as a whole.
+    """
+    if name in _SHARDABLE_COMMANDS:
+        return True
+    if name in ("grep", "egrep", "fgrep"):
+        flags, values, _ = _parse_options(args, "oEPFivwxcqsh", "em")
+        return not flags & {"c", "q"} and "m" not in values
+    if name == "uniq":
+        flags, _, _ = _parse_options(args, "cdu")
+        return not flags
+    return False
+
+
+def _is_ascii_only(name: str, args: list[str]) -> bool:
+    """Whether a command's result can differ from the real tool's on non-ASCII text.
+
+    ``cut -c`` counts bytes rather than characters, and in a UTF-8 locale the
+    POSIX bracket classes match non-ASCII letters, digits and spaces.
+    """
+    if name == "cut":
+        _, values, _ = _parse_options(args, "s", "dfc")
+        return "c" in values
+    if name in ("grep", "egrep", "fgrep", "sed", "awk"):
+        return any("[:" in arg for arg in args)
+    return False
+
+
+def parse_pipeline(command: str) -> Pipeline:
+    """Parse an extract command into an in-process pipeline.
+
+    Raises:
+        UnsupportedCommand: If any part of the command is outside the subset
+            that can be reproduced exactly without a shell.
+    """
+    stages = []
+    shardable = True
+    ascii_only = False
+    for argv in _split_commands(command):
+        name, *args = argv
+        if name not in _COMMANDS:
+            raise UnsupportedCommand(f"unsupported command: {name}")
+        stages.append(_COMMANDS[name](args))
+        shardable = shardable and _is_shardable(name, args)
+        ascii_only = ascii_only or _is_ascii_only(name, args)
+    return Pipeline(stages, command, shardable, ascii_only)
+
+
+def is_builtin_command(command: str) -> bool:
+    """Return True if ``command`` runs in-process, never reaching a shell."""
+    try:
+        parse_pipeline(command)
+    except UnsupportedCommand:
+        return False
+    return True
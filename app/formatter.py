@@ -1,51 +1,243 @@
-"""Output formatting for extracted values."""
+"""Output formatting for extracted values.
 
-import json
+Formatted values can be produced in chunks (see :func:`stream_output`), so
+the output writer sends them straight to ``GITHUB_ENV`` and
+``GITHUB_OUTPUT`` without building the whole formatted string first.
+"""
+
+from collections.abc import Callable, Iterator
+from typing import NamedTuple
 
 from app.logger import print_section
 
+# A formatted value: a string, or the chunks that make up one.
+Formatted = str | Iterator[str]
+
+
+class Matches:
+    """An extraction result: its values in output order and their line count.
+
+    ``values`` are what the newline-separated result is made of, so
+    ``str(matches)`` is that result and formats iterate :meth:`lines`
+    instead of re-splitting it. ``count`` (the non-blank lines, i.e.
+    ``match_count``) is taken in the same pass that builds the object.
+    """
+
+    __slots__ = ("values", "count")
+
+    def __init__(self, values: list[str]) -> None:
+        self.values = values
+        count = 0
+        for value in values:
+            if "\n" in value:
+                count += sum(1 for line in value.split("\n") if line.strip())
+            elif value.strip():
+                count += 1
+        self.count = count
+
+    @classmethod
+    def from_text(cls, text: str) -> "Matches":
+        """Wrap an already newline-separated result (e.g. the raw log)."""
+        return cls(text.split("\n"))
+
+    def __repr__(self) -> str:
+        return f"Matches({self.values!r})"
+
+    def __str__(self) -> str:
+        return "\n".join(self.values)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Matches):
+            return NotImplemented
+        return self.values == other.values
+
+    def lines(self) -> Iterator[str]:
+        """Yield the non-empty lines of the result."""
+        for value in self.values:
+            if "\n" in value:
+                yield from _iter_lines(value)
+            elif value:
+                yield value
+
+
+def _as_matches(value: str | Matches) -> Matches:
+    return Matches.from_text(value) if isinstance(value, str) else value
+
+
+class OutputFormat(NamedTuple):
+    """An ``output_format``: how an extraction result is rendered.
+
+    ``stream`` returns the formatted value as a string or text chunks, or,
+    for formats with an ``artifact_suffix``, as bytes chunks that are
+    written to a file whose path becomes the output value.
+    """
+
+    stream: Callable[[Matches], Formatted | Iterator[bytes]]
+    artifact_suffix: str = ""
+
+
+_FORMATS: dict[str, OutputFormat] = {}
+
+
+def register_format(
+    name: str,
+    stream: Callable[[Matches], Formatted | Iterator[bytes]],
+    artifact_suffix: str = "",
+) -> None:
+    """Make ``name`` a valid ``output_format`` rendered by ``stream``."""
+    _FORMATS[name] = OutputFormat(stream, artifact_suffix)
+
+
+def get_format(name: str) -> OutputFormat:
+    """Return the registered format ``name`` (KeyError if there is none)."""
+    return _FORMATS[name]
+
 
-def _split_lines(value: str) -> list[str]:
-    """Split value on newline and drop empty entries (preserves whitespace-only lines)."""
-    return [line for line in value.split("\n") if line]
+def output_formats() -> tuple[str, ...]:
+    """Names of all registered output formats, in registration order."""
+    return tuple(_FORMATS)
 
 
-def format_output(value: str, output_format: str) -> str:
+def _iter_lines(value: str) -> Iterator[str]:
+    """Yield the non-empty lines of ``value`` without splitting it all at once."""
+    start = 0
+    while (end := value.find("\n", start)) != -1:
+        if end > start:
+            yield value[start:end]
+        start = end + 1
+    if start < len(value):
+        yield value[start:]
+
+
+def format_output(value: str | Matches, output_format: str) -> str | bytes:
     """Format output based on specified format.
 
     Args:
-        value: Input value to format.
-        output_format: Desired output format (json, csv, text).
+        value: Newline-separated value, or extraction result, to format.
+        output_format: Desired output format (see :func:`output_formats`).
 
     Returns:
-        Formatted output string.
+        Formatted output string (bytes for artifact formats such as binary).
+    """
+    formatted = stream_output(value, output_format)
+    if isinstance(formatted, str):
+        return formatted
+    if get_format(output_format).artifact_suffix:
+        return b"".join(formatted)
+    return "".join(formatted)
+
+
+def stream_output(
+    value: str | Matches, output_format: str
+) -> Formatted | Iterator[bytes]:
+    """Format ``value`` lazily, as chunks, based on ``output_format``.
+
+    Text output, and blank values in text formats, need no formatting and are
+    returned as a string. Otherwise the result is an iterator of chunks that
+    join to exactly what :func:`format_output` returns (bytes chunks for
+    artifact formats).
     """
     print_section("Formatting Output")
     print(f"  - Output format: {output_format}")
 
-    if not value.strip():
-        return value
+    matches = _as_matches(value)
+    output = get_format(output_format)
+    if not matches.count and not output.artifact_suffix:
+        return str(matches)
+    return output.stream(matches)
+
+
+def _stream_json(matches: Matches) -> Iterator[str]:
+    """Yield the values as a JSON array, one element per chunk."""
+    yield "["
+    yield from _json_items(matches)
+    yield "]"
+
+
+def _json_items(matches: Matches) -> Iterator[str]:
+    import json
+
+    separator = ""
+    for line in matches.lines():
+        yield separator + json.dumps(line, ensure_ascii=False)
+        separator = ", "
+
+
+def _stream_ndjson(matches: Matches) -> Iterator[str]:
+    """Yield the values as newline-delimited JSON strings, one line per chunk."""
+    import json
 
-    if output_format == "json":
-        return _format_json(value)
-    if output_format == "csv":
-        return _format_csv(value)
-    return value
+    separator = ""
+    for line in matches.lines():
+        yield separator + json.dumps(line, ensure_ascii=False)
+        separator = "\n"
 
 
-def _format_json(value: str) -> str:
-    """Format value as JSON array."""
-    lines = _split_lines(value)
-    return json.dumps(lines, ensure_ascii=False)
+def _stream_binary(matches: Matches) -> Iterator[bytes]:
+    """Yield each value as a 4-byte big-endian length and its UTF-8 bytes."""
+    for line in matches.lines():
+        data = line.encode("utf-8")
+        yield len(data).to_bytes(4, "big") + data
 
 
-def _format_csv(value: str) -> str:
-    """Format value as CSV string."""
-    lines = _split_lines(value)
-    escaped_lines = []
-    for line in lines:
+def _stream_csv(matches: Matches) -> Iterator[str]:
+    """Yield the values as a CSV string, one field per chunk."""
+    separator = ""
+    for line in matches.lines():
         escaped = line.replace("\r", "").replace('"', '""')
         if "," in escaped or '"' in line or "\n" in line:
             escaped = f'"{escaped}"'
-        escaped_lines.append(escaped)
-    return ",".join(escaped_lines)
+        yield separator + escaped
+        separator = ","
+
+
+register_format("text", str)
+register_format("json", _stream_json)
+register_format("csv", _stream_csv)
+register_format("ndjson", _stream_ndjson)
+register_format("binary", _stream_binary, ".bin")
+
+
+def format_named_output(values: dict[str, str | Matches]) -> str:
+    """Format per-name extraction results as a JSON object of arrays."""
+    return "".join(stream_named_output(values))
+
+
+def stream_named_output(values: dict[str, str | Matches]) -> Iterator[str]:
+    """Yield per-name extraction results as a JSON object of arrays, in chunks."""
+    import json
+
+    yield "{"
+    separator = ""
+    for name, value in values.items():
+        yield f"{separator}{json.dumps(name, ensure_ascii=False)}: ["
+        yield from _json_items(_as_matches(value))
+        yield "]"
+        separator = ", "
+    yield "}"
+
+
+def format_range_output(
+    results: dict[str, dict[str, str | Matches]], named: bool
+) -> str:
+    """Format per-range results as a JSON object keyed by commit range.
+
+    Each range maps to an array of values, or with ``named`` (extract_patterns)
+    to an object of arrays per output name.
+    """
+    import json
+
+    def lines(value: str | Matches) -> list[str]:
+        return list(_as_matches(value).lines())
+
+    return json.dumps(
+        {
+            commit_range: (
+                {name: lines(value) for name, value in values.items()}
+                if named
+                else lines(values[""])
+            )
+            for commit_range, values in results.items()
+        },
+        ensure_ascii=False,
+    )
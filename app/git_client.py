@@ -1,89 +1,971 @@
 """Git operations for fetching commit messages."""
 
 import os
+import re
 import subprocess
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import NamedTuple
 
 from app.logger import print_debug, fail, print_section, print_success
 
 GIT_SAFE_DIRECTORIES = ["/usr/src", "/github/workspace"]
 
+# Bytes read from the git pipe per syscall while streaming.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+NO_COMMITS_MESSAGE = "No commit messages available."
+
+# Remote a shallow clone is deepened from, and the first --deepen step for a
+# commit range (doubled until the range's history is complete).
+DEEPEN_REMOTE = "origin"
+DEEPEN_STEP = 50
+
+# One git log record per commit: fields are separated by the ASCII unit
+# separator and, with -z, commits are terminated by NUL. The raw message goes
+# last so a stray separator inside it cannot shift the other fields. %p and
+# %ad are what git log's default format prints as ``Merge:`` and ``Date:``.
+FIELD_SEPARATOR = "\x1f"
+RECORD_FORMAT = FIELD_SEPARATOR.join(("%H", "%p", "%aN <%aE>", "%at", "%ad", "%B"))
+
+# Whitespace git trims from message lines (its isspace), and the run of blank
+# lines that separates a commit's subject from its body.
+_WHITESPACE = " \t\n\r"
+_BLANK_LINES = re.compile(r"(?:[ \t\r]*(?:\n|\Z))*")
+
+
+class LogFilter(NamedTuple):
+    """Fixed strings of which a commit message must contain at least one.
+
+    Passed to git as ``--fixed-strings --grep`` so commits that cannot match
+    the extraction pattern are never emitted. Several literals are ORed, as
+    git does for repeated ``--grep``.
+    """
+
+    literals: tuple[str, ...]
+    ignore_case: bool = False
+
+    def args(self) -> list[str]:
+        """git log options applying the filter."""
+        args = ["--fixed-strings"]
+        if self.ignore_case:
+            args.append("--regexp-ignore-case")
+        args.extend(f"--grep={literal}" for literal in self.literals)
+        return args
+
+
+class CommitRecord:
+    """A single commit parsed from ``git log``.
+
+    ``message`` is the raw message (``%B``); ``pretty`` selects what
+    :attr:`text` renders: that message, or the commit as ``git log`` prints
+    it by default, under a header of sha, merge parents, author and date.
+    ``merge`` (git's abbreviated parents of a merge commit) and ``date`` are
+    only recorded for that header.
+    """
+
+    __slots__ = ("sha", "author", "timestamp", "message", "pretty", "merge", "date")
+
+    def __init__(
+        self,
+        sha: str,
+        author: str,
+        timestamp: int,
+        message: str,
+        pretty: bool = True,
+        merge: str = "",
+        date: str = "",
+    ) -> None:
+        self.sha = sha
+        self.author = author
+        self.timestamp = timestamp
+        self.message = message
+        self.pretty = pretty
+        self.merge = merge
+        self.date = date
+
+    def __repr__(self) -> str:
+        return f"CommitRecord(sha={self.sha[:12]!r}, subject={self.subject!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CommitRecord):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    @property
+    def subject(self) -> str:
+        """The message's subject, as git's ``%s``."""
+        return split_message(self.message)[0]
+
+    @property
+    def body(self) -> str:
+        """The message's body, as git's ``%b`` without trailing newlines."""
+        return split_message(self.message)[1].rstrip("\n")
+
+    @property
+    def text(self) -> str:
+        """Text that extraction runs over for this commit."""
+        if self.pretty or not self.sha:
+            return self.message
+        lines = [f"commit {self.sha}"]
+        if self.merge:
+            lines.append(f"Merge: {self.merge}")
+        lines.append(f"Author: {self.author}")
+        lines.append(f"Date:   {self.date}")
+        lines.append("")
+        lines.extend(_indented_lines(self.message))
+        return "\n".join(lines) + "\n"
+
+
+def _indented_lines(message: str) -> list[str]:
+    """Message lines as git log's default format prints them.
+
+    Leading and trailing blank lines are dropped, trailing whitespace is
+    trimmed, tabs are expanded and every line is indented by four spaces.
+    """
+    lines = [line.rstrip(_WHITESPACE) for line in message.split("\n")]
+    start, end = 0, len(lines)
+    while start < end and not lines[start]:
+        start += 1
+    while end > start and not lines[end - 1]:
+        end -= 1
+    return [f"    {line.expandtabs(8)}" for line in lines[start:end]]
+
+
+def split_message(message: str) -> tuple[str, str]:
+    """Split a raw message into git's ``%s`` and ``%b``.
+
+    The subject is the first paragraph with its lines joined by spaces; the
+    body is everything after the blank lines that follow it.
+    """
+    first, newline, rest = message.partition("\n")
+    if first[:1] not in ("", " ", "\t", "\r") and (not newline or rest[:1] == "\n"):
+        # The common shape: a one-line subject followed by a blank line.
+        body = len(message)
+        if newline:
+            body = _BLANK_LINES.match(message, len(first) + 1).end()
+        return first.rstrip(_WHITESPACE), message[body:]
+
+    pos = _BLANK_LINES.match(message).end()
+    subject = []
+    while pos < len(message):
+        end = message.find("\n", pos)
+        if end < 0:
+            end = len(message)
+        line = message[pos:end].rstrip(_WHITESPACE)
+        if not line:
+            break
+        subject.append(line)
+        pos = end + 1
+    pos = _BLANK_LINES.match(message, min(pos, len(message))).end()
+    return " ".join(subject), message[pos:]
+
+
+def parse_commit_record(record: str, pretty: bool = True) -> CommitRecord | None:
+    """Parse one ``RECORD_FORMAT`` record, or return None if it is malformed."""
+    fields = record.split(FIELD_SEPARATOR, 5)
+    if len(fields) != 6:
+        return None
+    sha, parents, author, timestamp, date, message = fields
+    try:
+        seconds = int(timestamp)
+    except ValueError:
+        return None
+    if pretty:
+        # Only the pretty=false header shows these.
+        merge = date = ""
+    else:
+        merge = parents if " " in parents else ""
+    return CommitRecord(sha.lstrip("\n"), author, seconds, message, pretty, merge, date)
+
 
 def configure_git() -> None:
-    """Configure git safe directories."""
+    """Let this run's git commands use the workspace as a safe.directory.
+
+    git refuses repositories owned by another user unless safe.directory
+    lists them, which happens when the runner's checkout is mounted into the
+    container. Nothing is needed when the repository is ours or the
+    directories are already configured; otherwise the missing entries are
+    passed to every git this process starts through ``GIT_CONFIG_COUNT``
+    instead of being appended to the global gitconfig on every run.
+    """
     print_section("Configuring Git")
 
-    for directory in GIT_SAFE_DIRECTORIES:
-        try:
-            subprocess.run(
-                ["git", "config", "--global", "--add", "safe.directory", directory],
-                check=True,
-                capture_output=True,
-                timeout=5,
-            )
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
-            print_debug(f"Failed to configure {directory}: {e}")
+    if _owned_by_current_user():
+        print_debug("Repository is owned by the current user")
+    else:
+        configured = _safe_directories()
+        missing = [
+            directory
+            for directory in GIT_SAFE_DIRECTORIES
+            if "*" not in configured and directory not in configured
+        ]
+        if missing:
+            _add_config_env([("safe.directory", directory) for directory in missing])
+            print_debug(f"Added safe directories: {', '.join(missing)}")
+        else:
+            print_debug("Safe directories are already configured")
 
     print_success("Git configuration completed")
 
 
-def fetch_commit_messages(
-    commit_limit: int, pretty: bool, timeout: int, commit_range: str = ""
-) -> str:
-    """Fetch commit messages from git repository.
+def _owned_by_current_user() -> bool:
+    """Whether git's ownership check passes for the working directory.
 
-    Args:
-        commit_limit: Number of commits to retrieve.
-        pretty: Whether to use pretty format.
-        timeout: Command timeout in seconds.
-        commit_range: Git commit range (e.g., "HEAD~5..HEAD", "v1.0.0..v1.1.0").
+    Like git, the work tree and ``.git`` must both belong to the effective
+    user, or to ``SUDO_UID`` when running as root under sudo.
+    """
+    uid = os.geteuid()
+    sudo_uid = os.environ.get("SUDO_UID", "")
+    if uid == 0 and sudo_uid.isdigit():
+        uid = int(sudo_uid)
+    paths = [".", ".git"] if os.path.isdir(".git") else ["."]
+    try:
+        return all(os.stat(path).st_uid == uid for path in paths)
+    except OSError:
+        return False
 
-    Returns:
-        Commit messages as string.
+
+def _config_files() -> list[str]:
+    """The system and global gitconfig files git reads, in git's order."""
+    files = []
+    if not os.environ.get("GIT_CONFIG_NOSYSTEM"):
+        files.append(os.environ.get("GIT_CONFIG_SYSTEM", "/etc/gitconfig"))
+    if "GIT_CONFIG_GLOBAL" in os.environ:
+        files.append(os.environ["GIT_CONFIG_GLOBAL"])
+        return files
+    xdg = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    files.append(os.path.join(xdg, "git", "config"))
+    files.append(os.path.expanduser("~/.gitconfig"))
+    return files
+
+
+def _safe_directories() -> set[str]:
+    """safe.directory values git already sees, read without running git.
+
+    Covers the system and global gitconfig and ``GIT_CONFIG_*`` entries
+    from the environment. ``include`` directives are not followed; a
+    directory configured only there is added again, which is harmless.
     """
-    print_section("Fetching Commit Messages")
+    values: list[str] = []
+    for path in _config_files():
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                values.extend(_read_safe_directories(f))
+        except OSError:
+            continue
+    for key, value in _config_env():
+        if key.lower() == "safe.directory":
+            values.append(value)
+    # An empty value resets the list built so far.
+    if "" in values:
+        values = values[len(values) - values[::-1].index(""):]
+    return set(values)
+
+
+def _read_safe_directories(lines: Iterable[str]) -> list[str]:
+    """safe.directory values in gitconfig ``lines``, in order."""
+    values = []
+    section = ""
+    for line in lines:
+        line = line.strip()
+        if line.startswith("["):
+            header, _, line = line[1:].partition("]")
+            section = header.strip().lower()
+            line = line.strip()
+        if section != "safe" or not line or line[0] in "#;":
+            continue
+        key, sep, value = line.partition("=")
+        if key.strip().lower() != "directory":
+            continue
+        value = value.strip() if sep else "true"
+        if value.startswith('"') and value.endswith('"') and len(value) > 1:
+            value = value[1:-1]
+        else:
+            value = value.split("#", 1)[0].split(";", 1)[0].rstrip()
+        values.append(value)
+    return values
+
+
+def _config_env() -> list[tuple[str, str]]:
+    """Config entries passed to git through ``GIT_CONFIG_COUNT``."""
+    try:
+        count = int(os.environ.get("GIT_CONFIG_COUNT", "0"))
+    except ValueError:
+        return []
+    return [
+        (
+            os.environ.get(f"GIT_CONFIG_KEY_{i}", ""),
+            os.environ.get(f"GIT_CONFIG_VALUE_{i}", ""),
+        )
+        for i in range(count)
+    ]
+
+
+def _add_config_env(entries: list[tuple[str, str]]) -> None:
+    """Pass config ``entries`` to every git started by this process (git 2.31+)."""
+    count = len(_config_env())
+    for key, value in entries:
+        os.environ[f"GIT_CONFIG_KEY_{count}"] = key
+        os.environ[f"GIT_CONFIG_VALUE_{count}"] = value
+        count += 1
+    os.environ["GIT_CONFIG_COUNT"] = str(count)
+
+
+def resolve_revision(revision: str, timeout: int) -> str:
+    """Return the full SHA ``revision`` points at, or "" if it does not resolve."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--verify", "--quiet", f"{revision}^{{commit}}"],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print_debug(f"Failed to resolve {revision}: {e}")
+        return ""
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def is_ancestor(
+    ancestor: str, descendant: str, timeout: int, native: bool = False
+) -> bool:
+    """Whether ``ancestor`` is reachable from ``descendant``.
+
+    With ``native``, the check walks the object database in-process (pruned
+    by commit-graph generation numbers when there is a graph) and runs
+    ``git merge-base`` only if the repository needs git.
+    """
+    if native:
+        from app.git_objects import UnsupportedRepository, open_repository
+
+        try:
+            with open_repository() as repository:
+                return repository.is_ancestor(
+                    ancestor, descendant, time.monotonic() + timeout
+                )
+        except UnsupportedRepository as e:
+            print_debug(f"Checking ancestry with git ({e})")
+        except TimeoutError:
+            print_debug(f"Failed to check ancestry of {ancestor}: timed out")
+            return False
+    try:
+        result = subprocess.run(
+            ["git", "merge-base", "--is-ancestor", ancestor, descendant],
+            capture_output=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print_debug(f"Failed to check ancestry of {ancestor}: {e}")
+        return False
+    return result.returncode == 0
 
+
+def _has_commit_graph() -> bool:
+    """Whether the repository has a commit-graph (single file or split chain)."""
+    info = os.path.join(".git", "objects", "info")
+    return os.path.isfile(os.path.join(info, "commit-graph")) or os.path.isdir(
+        os.path.join(info, "commit-graphs")
+    )
+
+
+def ensure_commit_graph(timeout: int) -> bool:
+    """Write a commit-graph for everything reachable unless one exists.
+
+    git log (and app.git_objects) then read parents and commit dates from
+    the graph instead of inflating each commit object, which is most of the
+    cost of walking a long range. Returns whether a graph is available.
+    """
+    if _has_commit_graph():
+        print_debug("Using existing commit-graph")
+        return True
     if not os.path.isdir(".git"):
-        print("  - No git repository available")
-        return "No commit messages available."
+        return False
+    try:
+        result = subprocess.run(
+            ["git", "commit-graph", "write", "--reachable"],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print_debug(f"Failed to write commit-graph: {e}")
+        return False
+    if result.returncode != 0:
+        print_debug(f"Failed to write commit-graph: {result.stderr.strip()}")
+        return False
+    if not _has_commit_graph():
+        # git writes no graph for shallow clones, whose parents are incomplete.
+        print_debug("git wrote no commit-graph")
+        return False
+    print_debug("Wrote commit-graph")
+    return True
+
+
+def is_shallow() -> bool:
+    """Whether the repository is a shallow clone (``fetch-depth`` > 0)."""
+    return os.path.isfile(os.path.join(".git", "shallow"))
+
+
+def deepen_history(
+    commit_limit: int, commit_ranges: tuple[str, ...], timeout: int
+) -> None:
+    """Fetch as much of a shallow clone's history as this run reads.
+
+    Without ``commit_ranges`` the last ``commit_limit`` commits of HEAD must
+    be present: each fetch deepens by exactly the number still missing. A
+    range ``A..B`` needs both ends and the history joining them, which is
+    fetched with ``--deepen`` steps that double until ``git merge-base``
+    finds a common ancestor; a single revision needs all of its history.
+    Fetch failures (no remote, no credentials) are reported in debug output
+    and leave the history as it is.
+    """
+    print_section("Deepening Shallow Clone")
+    for commit_range in commit_ranges:
+        _deepen_range(commit_range, timeout)
+    if not commit_ranges:
+        _deepen_commits(commit_limit, timeout)
+
+
+def _deepen_commits(commit_limit: int, timeout: int) -> None:
+    available = _count_commits(commit_limit, timeout)
+    while available < commit_limit and is_shallow():
+        if not _deepen(["HEAD"], commit_limit - available, timeout):
+            break
+        previous, available = available, _count_commits(commit_limit, timeout)
+        if available == previous:
+            break
+    print(f"  - {available} of the last {commit_limit} commits available")
+
+
+def _deepen_range(commit_range: str, timeout: int) -> None:
+    include, exclude = _split_range(commit_range)
+    # Deepening follows the named commit behind a revision such as v1~3.
+    bases = [_base_revision(end) for end in (include, exclude) if end]
+    for base in bases:
+        if not resolve_revision(base, timeout):
+            _fetch_revision(base, timeout)
+    step = DEEPEN_STEP
+    while not _range_available(include, exclude, timeout):
+        if not is_shallow():
+            print(f"  - {commit_range}: not found")
+            return
+        if not _deepen(bases, step if exclude else 0, timeout):
+            print(f"  - {commit_range}: history incomplete")
+            return
+        step *= 2
+    print(f"  - {commit_range}: history available")
+
+
+def _base_revision(revision: str) -> str:
+    """The ref or SHA a revision expression starts from (``v1~3`` -> ``v1``)."""
+    return revision.split("~", 1)[0].split("^", 1)[0] or "HEAD"
+
+
+def _count_commits(commit_limit: int, timeout: int) -> int:
+    """Commits among the last ``commit_limit`` of HEAD that are present."""
+    result = _try_git(
+        ["rev-list", "--count", f"--max-count={commit_limit}", "HEAD"], timeout
+    )
+    if result is None or result.returncode != 0:
+        return 0
+    return int(result.stdout)
+
+
+def _range_available(include: str, exclude: str | None, timeout: int) -> bool:
+    """Whether ``exclude..include`` can be walked without missing history."""
+    include_sha = resolve_revision(include, timeout)
+    if not include_sha:
+        return False
+    if exclude is None:
+        return not is_shallow()
+    exclude_sha = resolve_revision(exclude, timeout)
+    if not exclude_sha:
+        return False
+    result = _try_git(["merge-base", exclude_sha, include_sha], timeout)
+    return result is not None and result.returncode == 0
+
 
-    cmd = ["git", "log"]
+def _fetch_revision(name: str, timeout: int) -> bool:
+    """Fetch the tip of a range end missing from the clone, without history.
 
+    A full SHA is fetched as is and ``origin/<branch>`` into its
+    remote-tracking ref. Any other name is tried as a branch, then as a tag,
+    and fetched into the local ref of the same kind, so the name resolves
+    afterwards.
+    """
+    if len(name) == 40 and all(c in "0123456789abcdef" for c in name.lower()):
+        return _fetch(["--depth=1"], [name], timeout)
+    if name.startswith(f"{DEEPEN_REMOTE}/"):
+        branch = name[len(DEEPEN_REMOTE) + 1 :]
+        refspec = f"+refs/heads/{branch}:refs/remotes/{name}"
+        return _fetch(["--depth=1"], [refspec], timeout)
+    return any(
+        _fetch(["--depth=1"], [f"+refs/{kind}/{name}:refs/{kind}/{name}"], timeout)
+        for kind in ("heads", "tags")
+    )
+
+
+def _deepen(revisions: list[str], depth: int, timeout: int) -> bool:
+    """Fetch ``depth`` more commits behind ``revisions`` (0: all of them).
+
+    Revisions are fetched by SHA, so the deepening follows them rather than
+    the remote's default branch.
+    """
+    targets = [resolve_revision(name, timeout) or name for name in revisions]
+    option = f"--deepen={depth}" if depth else "--unshallow"
+    return _fetch([option], list(dict.fromkeys(targets)), timeout)
+
+
+def _fetch(options: list[str], refspecs: list[str], timeout: int) -> bool:
+    """``git fetch`` from DEEPEN_REMOTE; failures are reported in debug output."""
+    cmd = ["fetch", "--quiet", "--no-tags", *options, DEEPEN_REMOTE, *refspecs]
+    print_debug(f"Executing: git {' '.join(cmd)} (timeout: {timeout}s)")
+    result = _try_git(cmd, timeout)
+    if result is None:
+        return False
+    if result.returncode != 0:
+        print_debug(f"Failed to fetch history: {result.stderr.strip()}")
+        return False
+    return True
+
+
+def _try_git(args: list[str], timeout: int) -> subprocess.CompletedProcess | None:
+    """Run a short git command, or return None if it cannot be run."""
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print_debug(f"Failed to run git {args[0]}: {e}")
+        return None
+
+
+def _split_range(commit_range: str) -> tuple[str, str | None]:
+    """Split ``A..B`` into (``B``, ``A``), either defaulting to HEAD.
+
+    A single revision is returned as (revision, None): everything reachable.
+    """
+    if ".." not in commit_range:
+        return commit_range, None
+    exclude, _, include = commit_range.partition("..")
+    return include or "HEAD", exclude or "HEAD"
+
+
+def _run_git(args: list[str], timeout: int, ok: tuple[int, ...] = (0,)) -> str:
+    """Run a short git command and return its stdout, failing the action on error."""
+    try:
+        result = subprocess.run(
+            ["git", *args], capture_output=True, text=True, timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        fail(f"Failed to run git {args[0]}: {e}")
+    if result.returncode not in ok:
+        fail(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def resolve_ranges(
+    commit_ranges: Iterable[str], timeout: int
+) -> tuple[list[str], dict[str, set[str]]]:
+    """Resolve several commit ranges with a single walk of history.
+
+    One ``git rev-list --parents`` lists every commit reachable from any
+    range's ends, stopping at the commits every range excludes (the merge
+    bases of all the excluded ends). Which ranges contain each commit is then
+    worked out in memory from the parent links, so history shared by
+    overlapping ranges is walked once.
+
+    Returns:
+        Tuple of (the commits in at least one range, newest first; each
+        range mapped to the SHAs it contains).
+    """
+    print_section("Resolving Commit Ranges")
+    ends = {commit_range: _split_range(commit_range) for commit_range in commit_ranges}
+    names = list(
+        dict.fromkeys(name for pair in ends.values() for name in pair if name)
+    )
+    resolved = _run_git(
+        ["rev-parse", *(f"{name}^{{commit}}" for name in names)], timeout
+    ).split()
+    sha = dict(zip(names, resolved))
+
+    excluded = [sha[exclude] for _, exclude in ends.values() if exclude]
+    bases: list[str] = []
+    if len(excluded) == len(ends):
+        # Only commits every range excludes can be left out of the walk.
+        # Exit status 1: the excluded ends share no history.
+        bases = _run_git(
+            ["merge-base", "--all", "--octopus", *dict.fromkeys(excluded)],
+            timeout,
+            ok=(0, 1),
+        ).split()
+
+    # Excluded ends are walked too: a commit can be reachable from one only
+    # through history no range includes.
+    cmd = ["rev-list", "--parents", *dict.fromkeys(sha[name] for name in names)]
+    if bases:
+        cmd += ["--not", *bases]
+    print_debug(f"Executing: git {' '.join(cmd)} (timeout: {timeout}s)")
+    parents: dict[str, list[str]] = {}
+    for line in _run_git(cmd, timeout).splitlines():
+        commit, *rest = line.split()
+        parents[commit] = rest
+
+    members: dict[str, set[str]] = {}
+    for commit_range, (include, exclude) in ends.items():
+        inside = _reachable(sha[include], parents)
+        if exclude:
+            inside -= _reachable(sha[exclude], parents)
+        members[commit_range] = inside
+        print(f"  - {commit_range}: {len(inside)} commits")
+
+    union = set().union(*members.values())
+    order = [commit for commit in parents if commit in union]
+    print_debug(f"Walked {len(parents)} commits; {len(order)} are in a range")
+    return order, members
+
+
+def _reachable(start: str, parents: dict[str, list[str]]) -> set[str]:
+    """Commits in ``parents`` reachable from ``start`` (itself included)."""
+    if start not in parents:
+        return set()
+    seen = {start}
+    stack = [start]
+    while stack:
+        for parent in parents[stack.pop()]:
+            if parent in parents and parent not in seen:
+                seen.add(parent)
+                stack.append(parent)
+    return seen
+
+
+def _build_log_command(
+    commit_limit: int,
+    commit_range: str,
+    log_filter: LogFilter | None = None,
+    revisions: list[str] | None = None,
+) -> tuple[list[str], list[str] | None]:
+    """Build the NUL-delimited, field-separated git log command line.
+
+    Returns the git log command and, when its revisions must be piped in, the
+    command producing them. ``git log -N --grep`` would return the last N
+    *matching* commits, so a filtered commit_limit run lists the last N
+    commits with ``git rev-list`` and lets ``git log --no-walk --stdin`` filter
+    exactly those. Explicit ``revisions`` are read from stdin the same way.
+    """
+    cmd = ["git", "log", "-z", f"--format={RECORD_FORMAT}"]
+    if log_filter is not None:
+        cmd.extend(log_filter.args())
+        print_debug(f"Filtering commits in git: {', '.join(log_filter.literals)}")
+
+    if revisions is not None:
+        cmd.extend(["--no-walk=unsorted", "--stdin"])
+        return cmd, None
     if commit_range:
         cmd.append(commit_range)
         print_debug(f"Using commit range: {commit_range}")
-    else:
-        cmd.append(f"-{commit_limit}")
+        return cmd, None
+    if log_filter is not None:
+        cmd.extend(["--no-walk=unsorted", "--stdin"])
+        return cmd, ["git", "rev-list", f"-{commit_limit}", "HEAD"]
+    cmd.append(f"-{commit_limit}")
+    return cmd, None
 
-    if pretty:
-        cmd.append("--pretty=%B")
 
+def _split_records(chunks: Iterator[bytes], separator: bytes = b"\0") -> Iterator[bytes]:
+    """Re-split a stream of byte chunks on a record separator.
+
+    Only the trailing partial record is buffered between chunks, so memory
+    is bounded by the largest single record rather than the whole stream.
+    """
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *records, pending = pending.split(separator)
+        yield from records
+    if pending:
+        yield pending
+
+
+def _stream_git(
+    cmd: list[str],
+    timeout: int,
+    stdin_cmd: list[str] | None = None,
+    stdin_data: bytes | None = None,
+) -> Iterator[bytes]:
+    """Run a git command and yield its stdout in chunks.
+
+    The whole command, not each read, is bounded by ``timeout``: a timer
+    kills the process when the deadline passes. Closing the generator early
+    terminates git so abandoned reads do not leave it running. With
+    ``stdin_cmd``, that command's stdout is piped into ``cmd``
+    (``stdin_cmd | cmd``) and both are bounded and checked together;
+    ``stdin_data`` is instead written to git's stdin from a thread.
+    """
+    if stdin_cmd:
+        print_debug(f"Executing: {' '.join(stdin_cmd)} | (timeout: {timeout}s)")
     print_debug(f"Executing: {' '.join(cmd)} (timeout: {timeout}s)")
 
+    feeder = None
     try:
-        result = subprocess.run(
+        if stdin_cmd:
+            feeder = subprocess.Popen(
+                stdin_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        stdin = feeder.stdout if feeder else None
+        if stdin_data is not None:
+            stdin = subprocess.PIPE
+        process = subprocess.Popen(
             cmd,
-            check=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
+            stdin=stdin,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError as e:
+        if feeder is not None:
+            feeder.kill()
+            feeder.wait()
+        fail(f"Failed to start git: {e}")
+    if feeder is not None:
+        # The reader owns the pipe now; closing our copy lets it see EOF.
+        feeder.stdout.close()
+    if stdin_data is not None:
+        writer = threading.Thread(
+            target=_write_stdin, args=(process.stdin, stdin_data), daemon=True
         )
+        writer.start()
 
-        commit_messages = result.stdout
-        if commit_messages:
-            label = f"range {commit_range}" if commit_range else f"last {commit_limit} commits"
-            print(f"  - {label}:")
-            for line in commit_messages.split("\n"):
-                if line:
-                    print(f"    {line}")
+    timed_out = threading.Event()
 
-        return commit_messages
+    def _kill() -> None:
+        timed_out.set()
+        process.kill()
+        if feeder is not None:
+            feeder.kill()
 
-    except subprocess.TimeoutExpired:
+    timer = threading.Timer(timeout, _kill)
+    timer.daemon = True
+    timer.start()
+
+    finished = False
+    try:
+        while chunk := process.stdout.read1(STREAM_CHUNK_SIZE):
+            yield chunk
+        finished = True
+    finally:
+        timer.cancel()
+        if not finished:
+            process.kill()
+            if feeder is not None:
+                feeder.kill()
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+        if feeder is not None and feeder.wait() != 0 and returncode == 0:
+            returncode = feeder.returncode
+
+    if timed_out.is_set():
         fail(f"Git command timed out after {timeout} seconds")
-    except subprocess.CalledProcessError as e:
-        print_debug(f"Git command failed with exit code {e.returncode}")
-        if e.stderr:
-            print_debug(f"Git stderr: {e.stderr}")
+    if returncode != 0:
+        print_debug(f"Git command failed with exit code {returncode}")
+        if stderr:
+            print_debug(f"Git stderr: {stderr.decode('utf-8', errors='replace')}")
         fail("Failed to fetch commit messages")
 
-    return ""
+
+def _write_stdin(pipe, data: bytes) -> None:
+    """Write ``data`` to a child's stdin and close it; a killed child is fine."""
+    try:
+        pipe.write(data)
+        pipe.close()
+    except OSError:
+        pass
+
+
+def stream_commits(
+    commit_limit: int,
+    pretty: bool,
+    timeout: int,
+    commit_range: str = "",
+    log_filter: LogFilter | None = None,
+    native: bool = False,
+    revisions: list[str] | None = None,
+) -> Iterator[CommitRecord]:
+    """Yield structured commit records from a single streaming git log.
+
+    ``git log -z`` terminates each commit with NUL, so the output is read
+    incrementally from the pipe and split on commit boundaries without ever
+    holding the full log in memory. With ``native``, commits are read from
+    the object database in-process (see app.git_objects) when the
+    repository allows it, and from git log otherwise.
+
+    Args:
+        commit_limit: Number of commits to retrieve.
+        pretty: Whether records render as bare messages (see CommitRecord.text).
+        timeout: Command timeout in seconds.
+        commit_range: Git commit range (e.g., "HEAD~5..HEAD", "v1.0.0..v1.1.0").
+        log_filter: Optional filter applied by git; commits it rejects are
+            not yielded.
+        native: Whether to try reading commits without running git.
+        revisions: Exact commits to read, in order, instead of commit_limit
+            or commit_range (see resolve_ranges).
+
+    Yields:
+        One CommitRecord per commit, newest first.
+    """
+    print_section("Fetching Commit Messages")
+
+    if not os.path.isdir(".git"):
+        print("  - No git repository available")
+        yield CommitRecord("", "", 0, NO_COMMITS_MESSAGE, pretty=pretty)
+        return
+
+    commits = None
+    if revisions is not None:
+        commits = _read_log(
+            commit_limit, pretty, timeout, commit_range, log_filter, revisions
+        )
+    elif native:
+        commits = _read_native(commit_limit, pretty, timeout, commit_range, log_filter)
+    if commits is None:
+        if log_filter is not None and not commit_range and not _has_commit_graph():
+            # Listing the last N commits separately costs a second full walk
+            # unless a commit-graph makes it nearly free.
+            print_debug("No commit-graph; not filtering the last commits in git")
+            log_filter = None
+        commits = _read_log(commit_limit, pretty, timeout, commit_range, log_filter)
+
+    if revisions is not None:
+        label = f"{len(revisions)} commits in commit_ranges"
+    elif commit_range:
+        label = f"range {commit_range}"
+    else:
+        label = f"last {commit_limit} commits"
+    if log_filter is not None:
+        label += " (filtered by git)"
+    printed_label = False
+
+    for commit in commits:
+        if not printed_label:
+            print(f"  - {label}:")
+            printed_label = True
+        for line in commit.text.split("\n"):
+            if line:
+                print(f"    {line}")
+        yield commit
+
+
+def _read_log(
+    commit_limit: int,
+    pretty: bool,
+    timeout: int,
+    commit_range: str,
+    log_filter: LogFilter | None,
+    revisions: list[str] | None = None,
+) -> Iterator[CommitRecord]:
+    """Parse commit records from a streaming git log."""
+    if revisions is not None and not revisions:
+        return  # git log --stdin would fall back to HEAD
+    cmd, stdin_cmd = _build_log_command(
+        commit_limit, commit_range, log_filter, revisions
+    )
+    stdin_data = None
+    if revisions is not None:
+        stdin_data = "".join(f"{sha}\n" for sha in revisions).encode("ascii")
+    for raw in _split_records(_stream_git(cmd, timeout, stdin_cmd, stdin_data)):
+        commit = parse_commit_record(raw.decode("utf-8", errors="replace"), pretty)
+        if commit is None:
+            print_debug(f"Skipping malformed git log record: {raw[:80]!r}")
+            continue
+        yield commit
+
+
+def _read_native(
+    commit_limit: int,
+    pretty: bool,
+    timeout: int,
+    commit_range: str,
+    log_filter: LogFilter | None,
+) -> Iterator[CommitRecord] | None:
+    """Read commits without git, or return None if the repository needs git.
+
+    If the reader hits something it cannot handle after it has started
+    yielding (a missing object, say), git log takes over from the same
+    position: both produce the same commits in the same order.
+    """
+    from app.git_objects import UnsupportedRepository, open_repository
+
+    deadline = time.monotonic() + timeout
+    try:
+        repository = open_repository()
+        try:
+            commits = repository.log(
+                commit_limit, commit_range, log_filter, pretty, deadline
+            )
+        except BaseException:
+            repository.close()
+            raise
+    except UnsupportedRepository as e:
+        print_debug(f"Reading commits with git log ({e})")
+        return None
+
+    def _read() -> Iterator[CommitRecord]:
+        print_debug("Reading commits from the object database")
+        produced = 0
+        try:
+            for commit in commits:
+                yield commit
+                produced += 1
+        except UnsupportedRepository as e:
+            print_debug(f"Continuing with git log after {produced} commits ({e})")
+            fallback = _read_log(commit_limit, pretty, timeout, commit_range, log_filter)
+            yield from islice(fallback, produced, None)
+        except TimeoutError:
+            fail(f"Reading commits timed out after {timeout} seconds")
+        finally:
+            repository.close()
+
+    return _read()
+
+
+def stream_commit_messages(
+    commit_limit: int, pretty: bool, timeout: int, commit_range: str = ""
+) -> Iterator[str]:
+    """Yield commit message text one commit at a time.
+
+    Args:
+        commit_limit: Number of commits to retrieve.
+        pretty: Whether to use pretty format.
+        timeout: Command timeout in seconds.
+        commit_range: Git commit range (e.g., "HEAD~5..HEAD", "v1.0.0..v1.1.0").
+
+    Yields:
+        One commit message per commit, newest first.
+    """
+    for commit in stream_commits(commit_limit, pretty, timeout, commit_range):
+        yield commit.text
+
+
+def fetch_commit_messages(
+    commit_limit: int, pretty: bool, timeout: int, commit_range: str = ""
+) -> str:
+    """Fetch commit messages from git repository.
+
+    Args:
+        commit_limit: Number of commits to retrieve.
+        pretty: Whether to use pretty format.
+        timeout: Command timeout in seconds.
+        commit_range: Git commit range (e.g., "HEAD~5..HEAD", "v1.0.0..v1.1.0").
+
+    Returns:
+        Commit messages as string.
+    """
+    return "\n".join(
+        stream_commit_messages(commit_limit, pretty, timeout, commit_range)
+    )
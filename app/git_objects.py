@@ -0,0 +1,968 @@
+"""Read commits straight from a repository's object database.
+
+For message extraction most of a ``git log`` run is process startup and
+formatting text that is parsed straight back. This module walks history
+in-process instead: refs are resolved from ``.git``, commits are read from
+loose objects or memory-mapped packfiles (version 2 ``.idx`` lookup, zlib,
+offset and ref deltas), and the walk reproduces ``git log``'s date order,
+including ``A..B`` ranges. Where ``objects/info/commit-graph`` covers a
+commit, its parents, date and generation number come from there, so commits
+that are walked but not printed are never inflated.
+
+Only repositories this reader can handle exactly are accepted. Anything
+else (partial clones, alternates, grafts or replace refs, SHA-256 or
+reftable repositories, revision syntax beyond plain refs and full SHAs)
+raises :class:`UnsupportedRepository` so the caller can use the git CLI.
+"""
+
+import heapq
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from itertools import islice
+
+from app.git_client import CommitRecord, LogFilter, _config_files
+
+_OBJ_TYPES = {1: b"commit", 2: b"tree", 3: b"blob", 4: b"tag"}
+_OFS_DELTA = 6
+_REF_DELTA = 7
+
+_FULL_SHA = re.compile(r"[0-9a-f]{40}")
+
+# How git expands a short ref name, in order (see git rev-parse --symbolic).
+_REF_RULES = (
+    "{}",
+    "refs/{}",
+    "refs/tags/{}",
+    "refs/heads/{}",
+    "refs/remotes/{}",
+    "refs/remotes/{}/HEAD",
+)
+
+# Repository extensions that do not change how objects or refs are stored.
+_HARMLESS_EXTENSIONS = frozenset({"noop", "worktreeconfig", "preciousobjects"})
+
+# Environment variables that point git at other object or ref storage.
+_GIT_ENV_OVERRIDES = (
+    "GIT_DIR",
+    "GIT_OBJECT_DIRECTORY",
+    "GIT_ALTERNATE_OBJECT_DIRECTORIES",
+    "GIT_REPLACE_REF_BASE",
+    "GIT_GRAFT_FILE",
+    "GIT_SHALLOW_FILE",
+)
+
+# git keeps walking this many commits past the point where only excluded
+# commits remain, to tolerate clock skew (SLOP in revision.c).
+_SLOP = 5
+
+_PARENT = re.compile(rb"^parent ([0-9a-f]{40})$", re.M)
+_COMMITTER_DATE = re.compile(rb"^committer .*> (\d+)", re.M)
+
+# Below this many candidates a pack index lookup scans instead of bisecting.
+_INDEX_SCAN = 64
+
+# A commit-graph parent slot holding no parent.
+_GRAPH_NO_PARENT = 0x70000000
+
+
+class UnsupportedRepository(Exception):
+    """The repository (or request) needs the git CLI to be read exactly."""
+
+
+# Objects read, by SHA, kept across repositories by a long-running process
+# (see cache_objects). Objects are immutable, so entries never go stale.
+_object_cache: "OrderedDict[str, tuple[bytes, bytes]] | None" = None
+_object_cache_size = 0
+
+
+def cache_objects(max_objects: int) -> None:
+    """Keep up to ``max_objects`` objects in memory across reads (0 disables)."""
+    global _object_cache, _object_cache_size
+    _object_cache = OrderedDict() if max_objects > 0 else None
+    _object_cache_size = max_objects
+
+
+def _inflate(data, offset: int, size: int) -> bytes:
+    """Decompress the zlib stream at ``offset`` that inflates to ``size`` bytes."""
+    # Nearly every object compresses into size + 64 bytes; zlib ignores
+    # whatever follows the end of the stream.
+    try:
+        inflated = zlib.decompress(data[offset : offset + size + 64], bufsize=size or 1)
+    except zlib.error:
+        pass
+    else:
+        if len(inflated) == size:
+            return inflated
+    decompressor = zlib.decompressobj()
+    parts = []
+    step = size + 64
+    while not decompressor.eof:
+        block = data[offset : offset + step]
+        if not block:
+            raise UnsupportedRepository("truncated packed object")
+        parts.append(decompressor.decompress(block))
+        offset += step
+        step = 64 * 1024
+    inflated = b"".join(parts)
+    if len(inflated) != size:
+        raise UnsupportedRepository("packed object has the wrong size")
+    return inflated
+
+
+def _delta_size(delta: bytes, pos: int) -> tuple[int, int]:
+    """Read a delta header size varint; return (size, next position)."""
+    size = shift = 0
+    while True:
+        byte = delta[pos]
+        pos += 1
+        size |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Apply a git pack delta to ``base``."""
+    base_size, pos = _delta_size(delta, 0)
+    result_size, pos = _delta_size(delta, pos)
+    if base_size != len(base):
+        raise UnsupportedRepository("delta does not match its base object")
+    out = bytearray()
+    while pos < len(delta):
+        opcode = delta[pos]
+        pos += 1
+        if opcode & 0x80:
+            # Copy: offset and size bytes are present per flag bit.
+            offset = size = 0
+            for i in range(4):
+                if opcode & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if opcode & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[offset : offset + (size or 0x10000)]
+        elif opcode:
+            out += delta[pos : pos + opcode]
+            pos += opcode
+        else:
+            raise UnsupportedRepository("invalid delta opcode")
+    if len(out) != result_size:
+        raise UnsupportedRepository("delta produced the wrong size")
+    return bytes(out)
+
+
+class _Pack:
+    """One packfile and its version 2 index, memory-mapped."""
+
+    def __init__(self, index_path: str) -> None:
+        self._maps: list[mmap.mmap] = []
+        try:
+            self.index = self._map(index_path)
+            if self.index[:8] != b"\377tOc\0\0\0\2":
+                raise UnsupportedRepository(f"unsupported pack index: {index_path}")
+            self.fanout = struct.unpack_from(">256I", self.index, 8)
+            count = self.fanout[255]
+            self._shas = 8 + 256 * 4
+            self._offsets = self._shas + count * 24  # SHA-1s, then CRC32s
+            self._large_offsets = self._offsets + count * 4
+            self.pack = self._map(index_path[: -len(".idx")] + ".pack")
+            if self.pack[:4] != b"PACK":
+                raise UnsupportedRepository(f"not a packfile: {index_path}")
+        except BaseException:
+            self.close()
+            raise
+
+    def _map(self, path: str) -> mmap.mmap:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def close(self) -> None:
+        for mapped in self._maps:
+            mapped.close()
+        self._maps.clear()
+
+    def find(self, sha: bytes) -> int | None:
+        """Return the pack offset of the object with binary ``sha``, if present."""
+        index = self.index
+        lo = self.fanout[sha[0] - 1] if sha[0] else 0
+        hi = self.fanout[sha[0]]
+        while hi - lo > _INDEX_SCAN:
+            mid = (lo + hi) // 2
+            start = self._shas + mid * 20
+            if index[start : start + 20] < sha:
+                lo = mid + 1
+            else:
+                hi = mid + 1
+        # Search the remaining window in C; a hit must be entry-aligned.
+        start = self._shas + lo * 20
+        found = index.find(sha, start, self._shas + hi * 20)
+        while found >= 0 and (found - start) % 20:
+            found = index.find(sha, found + 1, self._shas + hi * 20)
+        if found < 0:
+            return None
+        position = (found - self._shas) // 20
+        (offset,) = struct.unpack_from(">I", index, self._offsets + position * 4)
+        if offset & 0x80000000:
+            (offset,) = struct.unpack_from(
+                ">Q", index, self._large_offsets + (offset & 0x7FFFFFFF) * 8
+            )
+        return offset
+
+    def entry(self, offset: int) -> tuple[int, int | bytes | None, bytes]:
+        """Read the object at ``offset``.
+
+        Returns ``(type, base, data)``: for deltas, ``base`` is the base's
+        pack offset (offset delta) or binary SHA (ref delta) and ``data`` the
+        delta; otherwise ``base`` is None and ``data`` the object content.
+        """
+        pack = self.pack
+        byte = pack[offset]
+        kind = (byte >> 4) & 7
+        size = byte & 0x0F
+        shift = 4
+        pos = offset + 1
+        while byte & 0x80:
+            byte = pack[pos]
+            pos += 1
+            size |= (byte & 0x7F) << shift
+            shift += 7
+
+        base = None
+        if kind == _OFS_DELTA:
+            byte = pack[pos]
+            pos += 1
+            distance = byte & 0x7F
+            while byte & 0x80:
+                byte = pack[pos]
+                pos += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7F)
+            base = offset - distance
+        elif kind == _REF_DELTA:
+            base = pack[pos : pos + 20]
+            pos += 20
+        elif kind not in _OBJ_TYPES:
+            raise UnsupportedRepository(f"unknown packed object type {kind}")
+        return kind, base, _inflate(pack, pos, size)
+
+
+class ObjectStore:
+    """Loose and packed objects of one repository, looked up by SHA-1."""
+
+    def __init__(self, objects_dir: str) -> None:
+        self.objects_dir = objects_dir
+        alternates = os.path.join(objects_dir, "info", "alternates")
+        if os.path.isfile(alternates) and os.path.getsize(alternates):
+            raise UnsupportedRepository("repository borrows objects via alternates")
+
+        pack_dir = os.path.join(objects_dir, "pack")
+        names = os.listdir(pack_dir) if os.path.isdir(pack_dir) else []
+        if any(name.endswith(".promisor") for name in names):
+            raise UnsupportedRepository("partial clone (promisor packs)")
+        # Newest packs first, as git searches them.
+        indexes = sorted(
+            (os.path.join(pack_dir, name) for name in names if name.endswith(".idx")),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        self.packs: list[_Pack] = []
+        try:
+            for index in indexes:
+                self.packs.append(_Pack(index))
+        except (OSError, ValueError) as e:
+            self.close()
+            raise UnsupportedRepository(f"cannot map packfile: {e}") from e
+        except UnsupportedRepository:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        for pack in self.packs:
+            pack.close()
+        self.packs.clear()
+
+    def read(self, sha: str) -> tuple[bytes, bytes]:
+        """Return ``(type, content)`` of the object with hex ``sha``."""
+        cache = _object_cache
+        if cache is None:
+            return self._read(sha)
+        found = cache.get(sha)
+        if found is not None:
+            cache.move_to_end(sha)
+            return found
+        found = cache[sha] = self._read(sha)
+        if len(cache) > _object_cache_size:
+            cache.popitem(last=False)
+        return found
+
+    def _read(self, sha: str) -> tuple[bytes, bytes]:
+        binary = bytes.fromhex(sha)
+        for pack in self.packs:
+            offset = pack.find(binary)
+            if offset is not None:
+                return self._read_packed(pack, offset)
+        return self._read_loose(sha)
+
+    def _read_loose(self, sha: str) -> tuple[bytes, bytes]:
+        path = os.path.join(self.objects_dir, sha[:2], sha[2:])
+        try:
+            with open(path, "rb") as f:
+                raw = zlib.decompress(f.read())
+        except FileNotFoundError:
+            raise UnsupportedRepository(f"object {sha} is missing") from None
+        except (OSError, zlib.error) as e:
+            raise UnsupportedRepository(f"cannot read object {sha}: {e}") from e
+        header, _, content = raw.partition(b"\0")
+        kind, _, size = header.partition(b" ")
+        if not size.isdigit() or int(size) != len(content):
+            raise UnsupportedRepository(f"corrupt loose object {sha}")
+        return kind, content
+
+    def _read_packed(self, pack: _Pack, offset: int) -> tuple[bytes, bytes]:
+        deltas = []
+        while True:
+            kind, base, data = pack.entry(offset)
+            if base is None:
+                break
+            deltas.append(data)
+            if kind == _OFS_DELTA:
+                offset = base
+                continue
+            kind_name, data = self.read(base.hex())
+            kind = next(k for k, name in _OBJ_TYPES.items() if name == kind_name)
+            break
+        for delta in reversed(deltas):
+            data = apply_delta(data, delta)
+        return _OBJ_TYPES[kind], data
+
+
+class CommitGraph:
+    """A memory-mapped ``objects/info/commit-graph`` file (SHA-1, version 1).
+
+    Gives the parents, committer date and generation number (topological
+    level) of the commits it covers without inflating them. Commits made
+    after the graph was written are simply absent: :meth:`position` returns
+    None and the caller reads the object instead.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            signature, version, hash_version, chunks, bases = struct.unpack_from(
+                ">4sBBBB", self.data
+            )
+            if signature != b"CGPH" or version != 1 or hash_version != 1:
+                raise UnsupportedRepository(f"unsupported commit-graph: {path}")
+            if bases:
+                raise UnsupportedRepository("split commit-graph chains")
+            offsets = {}
+            for i in range(chunks):
+                chunk, offset = struct.unpack_from(">4sQ", self.data, 8 + i * 12)
+                offsets[chunk] = offset
+            if not {b"OIDF", b"OIDL", b"CDAT"} <= offsets.keys():
+                raise UnsupportedRepository(f"commit-graph lacks chunks: {path}")
+            self.fanout = struct.unpack_from(">256I", self.data, offsets[b"OIDF"])
+            self._shas = offsets[b"OIDL"]
+            self._commits = offsets[b"CDAT"]
+            self._edges = offsets.get(b"EDGE")
+        except BaseException:
+            self.data.close()
+            raise
+
+    def close(self) -> None:
+        self.data.close()
+
+    def __len__(self) -> int:
+        return self.fanout[255]
+
+    def sha(self, position: int) -> str:
+        start = self._shas + position * 20
+        return self.data[start : start + 20].hex()
+
+    def position(self, sha: str) -> int | None:
+        """Position of the commit with hex ``sha`` in the graph, if present."""
+        binary = bytes.fromhex(sha)
+        data = self.data
+        lo = self.fanout[binary[0] - 1] if binary[0] else 0
+        hi = self.fanout[binary[0]]
+        while hi - lo > _INDEX_SCAN:
+            mid = (lo + hi) // 2
+            start = self._shas + mid * 20
+            if data[start : start + 20] < binary:
+                lo = mid + 1
+            else:
+                hi = mid + 1
+        start = self._shas + lo * 20
+        found = data.find(binary, start, self._shas + hi * 20)
+        while found >= 0 and (found - start) % 20:
+            found = data.find(binary, found + 1, self._shas + hi * 20)
+        return None if found < 0 else (found - self._shas) // 20
+
+    def entry(self, position: int) -> tuple[list[int], int, int]:
+        """Return ``(parent positions, generation, committer date)``."""
+        first, second, generation, date = struct.unpack_from(
+            ">4I", self.data, self._commits + position * 36 + 20
+        )
+        date |= (generation & 3) << 32
+        generation >>= 2
+        parents = []
+        if first != _GRAPH_NO_PARENT:
+            parents.append(first)
+        if second & 0x80000000:
+            # An octopus merge: the rest of the parents are in EDGE, the
+            # last one flagged with the top bit.
+            if self._edges is None:
+                raise UnsupportedRepository("commit-graph lacks its EDGE chunk")
+            edge = self._edges + (second & 0x7FFFFFFF) * 4
+            while True:
+                (parent,) = struct.unpack_from(">I", self.data, edge)
+                parents.append(parent & 0x7FFFFFFF)
+                if parent & 0x80000000:
+                    break
+                edge += 4
+        elif second != _GRAPH_NO_PARENT:
+            parents.append(second)
+        return parents, generation, date
+
+
+class _GraphCommit:
+    """A commit known from the commit-graph: parents and date, no message."""
+
+    __slots__ = ("parents", "date", "generation")
+
+    def __init__(self, parents: list[str], date: int, generation: int) -> None:
+        self.parents = parents
+        self.date = date
+        self.generation = generation
+
+
+class _Commit:
+    """A commit object, parsed as far as the walk needs.
+
+    The walk only needs parents and the committer date; the author and
+    encoding are parsed from ``header`` when a record is built.
+    """
+
+    __slots__ = ("parents", "date", "header", "message")
+
+    def __init__(self, content: bytes) -> None:
+        self.header, _, self.message = content.partition(b"\n\n")
+        self.parents = [sha.decode("ascii") for sha in _PARENT.findall(self.header)]
+        date = _COMMITTER_DATE.search(self.header)
+        self.date = int(date.group(1)) if date else 0
+
+    def field(self, name: bytes) -> bytes:
+        """Value of the first ``name`` header line, or b"" if absent."""
+        if self.header.startswith(name + b" "):
+            start = len(name) + 1
+        else:
+            start = self.header.find(b"\n" + name + b" ")
+            if start < 0:
+                return b""
+            start += len(name) + 2
+        end = self.header.find(b"\n", start)
+        return self.header[start:] if end < 0 else self.header[start:end]
+
+
+def _split_ident(ident: bytes) -> tuple[bytes, int]:
+    """Split ``Name <email> 1700000000 +0000`` into (``Name <email>``, seconds)."""
+    start = ident.find(b"<")
+    end = ident.find(b">", start)
+    if start < 0 or end < 0:
+        return ident, 0
+    stamp = ident[end + 1 :].split()
+    seconds = int(stamp[0]) if stamp and stamp[0].isdigit() else 0
+    name = ident[:start].rstrip(b" \t\n\r")
+    return name + b" <" + ident[start + 1 : end] + b">", seconds
+
+
+def _git_date(ident: bytes) -> str:
+    """An ident's date in git's default format, in the author's own time zone.
+
+    ``Name <email> 1700000000 +0530`` gives ``Wed Nov 15 03:43:20 2023 +0530``,
+    as ``%ad`` and the ``Date:`` line of git log print it.
+    """
+    stamp = ident[ident.rfind(b">") + 1 :].split()
+    seconds = int(stamp[0]) if stamp and stamp[0].isdigit() else 0
+    zone = stamp[1].decode("ascii", errors="replace") if len(stamp) > 1 else "+0000"
+    try:
+        offset = int(zone)
+    except ValueError:
+        offset = 0
+    sign = -1 if offset < 0 else 1
+    hours, minutes = divmod(abs(offset), 100)
+    date = time.gmtime(seconds + sign * (hours * 3600 + minutes * 60))
+    return (
+        f"{time.strftime('%a %b', date)} {date.tm_mday} "
+        f"{time.strftime('%H:%M:%S %Y', date)} {offset:+05d}"
+    )
+
+
+def _decode(raw: bytes, encoding: str) -> str:
+    """Decode commit text as git log would re-encode it to UTF-8."""
+    if encoding:
+        try:
+            return raw.decode(encoding, errors="replace")
+        except LookupError:
+            pass
+    return raw.decode("utf-8", errors="replace")
+
+
+def _read_config(path: str) -> dict[str, str]:
+    """Read ``section.key`` (lowercased) values from a git config file.
+
+    Enough for the core and extensions sections: subsections, includes and
+    multi-valued keys are not interpreted.
+    """
+    values: dict[str, str] = {}
+    section = ""
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return values
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith("["):
+            section = line[1:].split("]", 1)[0].split(None, 1)[0].strip().lower()
+            continue
+        key, _, value = line.partition("=")
+        values[f"{section}.{key.strip().lower()}"] = value.strip() or "true"
+    return values
+
+
+class Repository:
+    """A repository whose commits can be read without the git CLI."""
+
+    def __init__(self, git_dir: str) -> None:
+        overrides = [name for name in _GIT_ENV_OVERRIDES if os.environ.get(name)]
+        if overrides:
+            raise UnsupportedRepository(f"{overrides[0]} is set")
+        if not os.path.isdir(git_dir):
+            raise UnsupportedRepository(f"{git_dir} is not a directory")
+        config = _read_config(os.path.join(git_dir, "config"))
+        extensions = {
+            key.split(".", 1)[1]
+            for key in config
+            if key.startswith("extensions.")
+        }
+        if extensions - _HARMLESS_EXTENSIONS:
+            raise UnsupportedRepository(
+                f"repository extension {sorted(extensions - _HARMLESS_EXTENSIONS)[0]}"
+            )
+        if os.path.exists(os.path.join(git_dir, "info", "grafts")):
+            raise UnsupportedRepository("repository uses grafts")
+        if os.path.exists(os.path.join(git_dir, "commondir")):
+            raise UnsupportedRepository("linked worktree")
+        encoding = config.get("i18n.logoutputencoding", "utf-8").lower()
+        if encoding.replace("-", "") != "utf8":
+            raise UnsupportedRepository(f"log output encoding {encoding}")
+
+        self.git_dir = git_dir
+        self._config = config
+        self._packed_refs = self._read_packed_refs()
+        replace_dir = os.path.join(git_dir, "refs", "replace")
+        if any(ref.startswith("refs/replace/") for ref in self._packed_refs) or (
+            os.path.isdir(replace_dir) and os.listdir(replace_dir)
+        ):
+            raise UnsupportedRepository("repository has replace refs")
+        self.shallow = self._read_shallow()
+        self.objects = ObjectStore(os.path.join(git_dir, "objects"))
+        self.graph = self._open_graph(config)
+
+    def close(self) -> None:
+        self.objects.close()
+        if self.graph is not None:
+            self.graph.close()
+
+    def __enter__(self) -> "Repository":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _read_packed_refs(self) -> dict[str, str]:
+        refs = {}
+        try:
+            with open(os.path.join(self.git_dir, "packed-refs"), encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip() or line.startswith(("#", "^")):
+                        continue
+                    sha, _, name = line.rstrip("\n").partition(" ")
+                    refs[name] = sha
+        except FileNotFoundError:
+            pass
+        return refs
+
+    def _read_shallow(self) -> frozenset[str]:
+        try:
+            with open(os.path.join(self.git_dir, "shallow"), encoding="ascii") as f:
+                return frozenset(line.strip() for line in f if line.strip())
+        except FileNotFoundError:
+            return frozenset()
+
+    def _open_graph(self, config: dict[str, str]) -> CommitGraph | None:
+        """The commit-graph, if there is one git itself would use.
+
+        git ignores the graph in shallow clones, whose parents it does not
+        record, and when ``core.commitGraph`` is off. A graph this reader
+        cannot parse is skipped: it only saves work.
+        """
+        if self.shallow or config.get("core.commitgraph", "true").lower() in (
+            "false",
+            "no",
+            "off",
+            "0",
+        ):
+            return None
+        path = os.path.join(self.git_dir, "objects", "info", "commit-graph")
+        try:
+            return CommitGraph(path)
+        except (OSError, ValueError, struct.error, UnsupportedRepository):
+            return None
+
+    def _read_ref(self, name: str, depth: int = 0) -> str | None:
+        """Resolve a full ref name (following symbolic refs) to a SHA."""
+        if depth > 5:
+            raise UnsupportedRepository(f"symbolic ref loop at {name}")
+        path = os.path.join(self.git_dir, *name.split("/"))
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = f.read().strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return self._packed_refs.get(name)
+        if value.startswith("ref: "):
+            return self._read_ref(value[5:], depth + 1)
+        return value if _FULL_SHA.fullmatch(value) else None
+
+    def resolve(self, revision: str) -> str:
+        """Resolve a ref name or full SHA to the commit it points at."""
+        if _FULL_SHA.fullmatch(revision):
+            sha = revision
+        else:
+            if not revision or not re.fullmatch(r"[\w./-]+", revision):
+                raise UnsupportedRepository(f"revision syntax: {revision!r}")
+            for rule in _REF_RULES:
+                sha = self._read_ref(rule.format(revision))
+                if sha:
+                    break
+            else:
+                raise UnsupportedRepository(f"cannot resolve {revision!r}")
+        # Peel annotated tags down to the commit.
+        for _ in range(10):
+            kind, content = self.objects.read(sha)
+            if kind == b"commit":
+                return sha
+            if kind != b"tag" or not content.startswith(b"object "):
+                raise UnsupportedRepository(f"{revision!r} is not a commit")
+            sha = content[7:47].decode("ascii")
+        raise UnsupportedRepository(f"tag chain too long at {revision!r}")
+
+    def commit(self, sha: str) -> _Commit:
+        kind, content = self.objects.read(sha)
+        if kind != b"commit":
+            raise UnsupportedRepository(f"object {sha} is not a commit")
+        commit = _Commit(content)
+        if sha in self.shallow:
+            commit.parents = []
+        return commit
+
+    def _node(self, sha: str) -> _GraphCommit | _Commit:
+        """The commit's parents and date, from the commit-graph when it has them."""
+        graph = self.graph
+        position = None if graph is None else graph.position(sha)
+        if position is None:
+            return self.commit(sha)
+        parents, generation, date = graph.entry(position)
+        return _GraphCommit([graph.sha(p) for p in parents], date, generation)
+
+    def _range(self, commit_range: str) -> tuple[list[str], list[str]]:
+        """Resolve ``commit_range`` into (included, excluded) commits."""
+        if "..." in commit_range:
+            raise UnsupportedRepository("symmetric difference ranges")
+        if ".." in commit_range:
+            exclude, _, include = commit_range.partition("..")
+            return [self.resolve(include or "HEAD")], [self.resolve(exclude or "HEAD")]
+        return [self.resolve(commit_range)], []
+
+    def log(
+        self,
+        commit_limit: int,
+        commit_range: str = "",
+        log_filter: LogFilter | None = None,
+        pretty: bool = True,
+        deadline: float | None = None,
+    ) -> Iterator[CommitRecord]:
+        """Yield the commits ``git log`` would print, newest first.
+
+        Without a range, the last ``commit_limit`` commits reachable from
+        HEAD; with ``A..B`` (either side defaulting to HEAD) or a single
+        revision, every commit in the range. ``log_filter`` drops commits
+        whose message contains none of its literals, as ``git log --grep``
+        does. Revisions are resolved before this returns, so unsupported
+        ones raise here rather than mid-iteration. Iteration raises
+        TimeoutError once ``time.monotonic()`` passes ``deadline``.
+        """
+        if not pretty:
+            self._check_log_header()
+        if not commit_range:
+            walk = self._walk([self.resolve("HEAD")], [], deadline)
+            return self._records(walk, commit_limit, log_filter, pretty)
+
+        included, excluded = self._range(commit_range)
+        walk = self._walk(included, excluded, deadline)
+        return self._records(walk, None, log_filter, pretty)
+
+    def _check_log_header(self) -> None:
+        """Refuse settings that change the header of git log's default format.
+
+        The author is shown through the mailmap and the date in the format
+        ``log.date`` selects; this reader renders neither.
+        """
+        config: dict[str, str] = {}
+        for path in _config_files():
+            config.update(_read_config(path))
+        config.update(self._config)
+        for key in ("log.date", "mailmap.file", "mailmap.blob"):
+            if key in config:
+                raise UnsupportedRepository(f"{key} is set")
+        worktree = os.path.dirname(os.path.abspath(self.git_dir))
+        if os.path.exists(os.path.join(worktree, ".mailmap")):
+            raise UnsupportedRepository("repository has a .mailmap")
+
+    def revisions(
+        self, commit_limit: int, commit_range: str = "", deadline: float | None = None
+    ) -> Iterator[str]:
+        """Yield the SHAs :meth:`log` would, as ``git rev-list`` does.
+
+        Commits covered by the commit-graph are never inflated, so counting
+        a range costs a lookup per commit rather than a decompression.
+        """
+        if commit_range:
+            included, excluded = self._range(commit_range)
+            limit = None
+        else:
+            included, excluded = [self.resolve("HEAD")], []
+            limit = commit_limit
+        walk = self._walk(included, excluded, deadline, messages=False)
+        return (sha for sha, _ in islice(walk, limit))
+
+    def is_ancestor(
+        self, ancestor: str, descendant: str, deadline: float | None = None
+    ) -> bool:
+        """Whether ``ancestor`` is reachable from ``descendant``.
+
+        Generation numbers from the commit-graph prune the search: a commit
+        whose generation is below the ancestor's cannot reach it.
+        """
+        target = self.resolve(ancestor)
+        start = self.resolve(descendant)
+        position = None if self.graph is None else self.graph.position(target)
+        floor = 0 if position is None else self.graph.entry(position)[1]
+        stack = [start]
+        seen = {start}
+        while stack:
+            sha = stack.pop()
+            if sha == target:
+                return True
+            if deadline is not None and len(seen) % 1024 == 0:
+                if time.monotonic() > deadline:
+                    raise TimeoutError
+            node = self._node(sha)
+            if isinstance(node, _GraphCommit) and node.generation < floor:
+                continue
+            for parent in node.parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def _records(
+        self,
+        walk: Iterator[tuple[str, _Commit | _GraphCommit]],
+        limit: int | None,
+        log_filter: LogFilter | None,
+        pretty: bool,
+    ) -> Iterator[CommitRecord]:
+        literals = None
+        if log_filter is not None:
+            literals = [literal.encode("utf-8") for literal in log_filter.literals]
+            if log_filter.ignore_case:
+                literals = [literal.lower() for literal in literals]
+
+        for count, (sha, commit) in enumerate(walk):
+            if limit is not None and count >= limit:
+                return
+            if not isinstance(commit, _Commit):
+                commit = self.commit(sha)
+            message = commit.message
+            encoding = commit.field(b"encoding").decode("ascii", errors="replace")
+            if encoding:
+                message = _decode(message, encoding).encode("utf-8")
+            if literals is not None:
+                haystack = message.lower() if log_filter.ignore_case else message
+                if not any(literal in haystack for literal in literals):
+                    continue
+            ident = commit.field(b"author")
+            author, author_date = _split_ident(ident)
+            merge = date = ""
+            if not pretty:
+                if len(commit.parents) > 1:
+                    # Merge: shows parents abbreviated as git would.
+                    raise UnsupportedRepository("merge commit header")
+                date = _git_date(ident)
+            yield CommitRecord(
+                sha,
+                _decode(author, encoding),
+                author_date,
+                message.decode("utf-8", errors="replace"),
+                pretty,
+                merge,
+                date,
+            )
+
+    def _walk(
+        self,
+        included: list[str],
+        excluded: list[str],
+        deadline: float | None = None,
+        messages: bool = True,
+    ) -> Iterator[tuple[str, _Commit | _GraphCommit]]:
+        """Yield commits reachable from ``included`` but not ``excluded``.
+
+        Commits come out newest committer date first (ties in the order they
+        were queued), as in git's revision walk. With exclusions, git first
+        walks until only excluded commits remain queued (plus a few more for
+        clock skew) and only then emits; so does this.
+
+        Excluded commits, and with ``messages`` false every commit, are read
+        from the commit-graph where it covers them (as ``_GraphCommit``):
+        their messages are never needed, so they are never inflated.
+        """
+        read = self.commit if messages else self._node
+        commits: dict[str, _Commit | _GraphCommit] = {}
+        uninteresting: set[str] = set()
+        seen: set[str] = set()
+        queue: list[tuple[int, int, str]] = []
+        counter = 0  # commits loaded, for the deadline check
+
+        def load(sha: str, excluded: bool = False) -> _Commit | _GraphCommit:
+            nonlocal counter
+            if sha not in commits:
+                counter += 1
+                if deadline is not None and counter % 1024 == 0:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError
+                commits[sha] = self._node(sha) if excluded else read(sha)
+            return commits[sha]
+
+        def push(sha: str) -> None:
+            if sha in seen:
+                return
+            seen.add(sha)
+            heapq.heappush(queue, (-load(sha).date, len(seen), sha))
+
+        for sha in excluded:
+            uninteresting.add(sha)
+            self._mark_uninteresting(load(sha, True), commits, uninteresting)
+            push(sha)
+        for sha in included:
+            push(sha)
+
+        if not excluded:
+            while queue:
+                _, _, sha = heapq.heappop(queue)
+                commit = commits.pop(sha)
+                # Linear history: while nothing else is queued, the only
+                # parent is next, so skip the queue.
+                while not queue and len(commit.parents) == 1:
+                    parent = commit.parents[0]
+                    if parent in seen:
+                        break
+                    seen.add(parent)
+                    yield sha, commit
+                    sha, commit = parent, load(parent)
+                    del commits[sha]
+                for parent in commit.parents:
+                    push(parent)
+                yield sha, commit
+            return
+
+        interesting: list[str] = []
+        date = None
+        slop = _SLOP
+        while queue:
+            _, _, sha = heapq.heappop(queue)
+            commit = commits[sha]
+            if sha in uninteresting:
+                # As git's process_parents(): parents are excluded, and so
+                # are the already loaded ancestors of each parent.
+                for parent in commit.parents:
+                    uninteresting.add(parent)
+                    self._mark_uninteresting(load(parent, True), commits, uninteresting)
+                    push(parent)
+                slop = self._still_interesting(queue, date, slop, uninteresting)
+                if slop:
+                    continue
+                break
+            for parent in commit.parents:
+                push(parent)
+            date = commit.date
+            interesting.append(sha)
+
+        for sha in interesting:
+            if sha not in uninteresting:
+                yield sha, commits[sha]
+
+    @staticmethod
+    def _mark_uninteresting(
+        commit: _Commit | _GraphCommit,
+        commits: dict[str, _Commit | _GraphCommit],
+        uninteresting: set[str],
+    ) -> None:
+        """Exclude the parents of ``commit`` and, transitively, their loaded parents."""
+        stack = list(commit.parents)
+        while stack:
+            sha = stack.pop()
+            if sha in uninteresting:
+                continue
+            uninteresting.add(sha)
+            if sha in commits:
+                stack.extend(commits[sha].parents)
+
+    @staticmethod
+    def _still_interesting(
+        queue: list[tuple[int, int, str]],
+        date: int | None,
+        slop: int,
+        uninteresting: set[str],
+    ) -> int:
+        """git's still_interesting(): the remaining slop, or 0 to stop walking."""
+        if not queue:
+            return 0
+        newest = -min(queue)[0]
+        if date is not None and date <= newest:
+            return _SLOP
+        if any(sha not in uninteresting for _, _, sha in queue):
+            return _SLOP
+        return slop - 1
+
+
+def open_repository(git_dir: str = ".git") -> Repository:
+    """Open ``git_dir`` for native reads, or raise UnsupportedRepository."""
+    try:
+        return Repository(git_dir)
+    except OSError as e:
+        raise UnsupportedRepository(str(e)) from e
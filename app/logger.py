@@ -1,7 +1,11 @@
 """Logging and output formatting utilities."""
 
 import sys
-from typing import NoReturn
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, NoReturn, TypeVar
+
+T = TypeVar("T")
 
 
 class ActionError(RuntimeError):
@@ -50,3 +54,144 @@ def fail(message: str) -> NoReturn:
     """Print error message and raise ActionError. Control does not return."""
     print(f"[ERROR] {message}", file=sys.stderr)
     raise ActionError(message)
+
+
+class Stage:
+    """Wall time, counters and (optionally) peak traced memory for one phase."""
+
+    __slots__ = ("name", "seconds", "nested", "counters", "peak_memory")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.seconds = 0.0
+        self.nested = 0.0
+        self.counters: dict[str, int] = {}
+        self.peak_memory: int | None = None
+
+    def count(self, **counters: int) -> None:
+        """Add to named counters such as ``lines=`` or ``bytes=``."""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def as_dict(self) -> dict:
+        data = {"seconds": round(max(self.seconds - self.nested, 0.0), 6)}
+        data.update(self.counters)
+        if self.peak_memory is not None:
+            data["peak_memory_bytes"] = self.peak_memory
+        return data
+
+
+class Timings:
+    """Collect per-stage timings for a run.
+
+    Stages nest: time a lazy input spends producing items (see :meth:`iterate`)
+    while another stage consumes it is charged to the producer only, so the
+    streamed git fetch and the extraction that pulls from it are reported
+    separately even though they run interleaved.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.stages: dict[str, Stage] = {}
+        self.trace_memory = trace_memory
+        self._active: list[Stage] = []
+        self._start = time.perf_counter()
+        if trace_memory:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def _get(self, name: str) -> Stage:
+        if name not in self.stages:
+            self.stages[name] = Stage(name)
+        return self.stages[name]
+
+    def _charge(self, stage: Stage, elapsed: float) -> None:
+        stage.seconds += elapsed
+        if self._active and self._active[-1] is not stage:
+            self._active[-1].nested += elapsed
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        """Time the enclosed block as stage ``name``."""
+        stage = self._get(name)
+        if self.trace_memory:
+            import tracemalloc
+
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        self._active.append(stage)
+        try:
+            yield stage
+        finally:
+            self._active.pop()
+            self._charge(stage, time.perf_counter() - start)
+            if self.trace_memory:
+                import tracemalloc
+
+                peak = tracemalloc.get_traced_memory()[1]
+                stage.peak_memory = max(stage.peak_memory or 0, peak)
+
+    def iterate(
+        self,
+        name: str,
+        items: Iterable[T],
+        unit: str = "items",
+        text: Callable[[T], str] | None = None,
+    ) -> Iterator[T]:
+        """Yield from ``items``, charging time spent producing them to ``name``.
+
+        Each item adds one to the ``unit`` counter; when ``text`` is given, the
+        string it returns for an item also adds to ``lines`` and ``bytes``.
+        """
+        return self._iterate(self._get(name), iter(items), unit, text)
+
+    def _iterate(
+        self,
+        stage: Stage,
+        iterator: Iterator[T],
+        unit: str,
+        text: Callable[[T], str] | None,
+    ) -> Iterator[T]:
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self._charge(stage, time.perf_counter() - start)
+                if text is None:
+                    stage.count(**{unit: 1})
+                else:
+                    value = text(item)
+                    stage.count(
+                        **{unit: 1},
+                        lines=value.count("\n") + 1,
+                        bytes=len(value.encode("utf-8")),
+                    )
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def as_dict(self) -> dict:
+        """Return a JSON-serializable summary of every stage."""
+        return {
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "stages": {name: stage.as_dict() for name, stage in self.stages.items()},
+        }
+
+    def print_summary(self) -> None:
+        """Print a table of stage timings."""
+        summary = self.as_dict()
+        print_section("Stage Timings")
+        for name, data in summary["stages"].items():
+            extras = ", ".join(
+                f"{key}={value}" for key, value in data.items() if key != "seconds"
+            )
+            line = f"  - {name:<14} {data['seconds']:>10.4f}s"
+            print(f"{line}  {extras}" if extras else line)
+        print(f"  - {'total':<14} {summary['total_seconds']:>10.4f}s")
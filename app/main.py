@@ -1,11 +1,57 @@
 """Main orchestration for commit-info-extractor."""
 
+from typing import TYPE_CHECKING
+
 from app.config import AppConfig
-from app.extractor import extract_info
-from app.formatter import format_output
-from app.git_client import configure_git, fetch_commit_messages
-from app.logger import print_debug, fail, print_header, set_debug
-from app.output_writer import set_output_variables
+from app.extractor import (
+    Dedup,
+    RangeResults,
+    extract_info,
+    extract_named_info,
+    git_log_filter,
+    merge_results,
+    precompile_patterns,
+)
+from app.formatter import (
+    Formatted,
+    Matches,
+    format_range_output,
+    get_format,
+    stream_named_output,
+    stream_output,
+)
+from app.git_client import (
+    configure_git,
+    deepen_history,
+    ensure_commit_graph,
+    is_ancestor,
+    is_shallow,
+    resolve_ranges,
+    resolve_revision,
+    stream_commits,
+)
+from app.logger import (
+    Timings,
+    print_debug,
+    fail,
+    print_header,
+    print_section,
+    set_debug,
+)
+from app.output_writer import (
+    ValueFile,
+    match_commits_json,
+    set_output_variables,
+    spill_value,
+    write_artifact,
+    write_timings,
+)
+
+if TYPE_CHECKING:
+    from app.state import ExtractionState
+
+# State key for the single extract_command/extract_pattern result.
+STATE_VALUE = "value"
 
 
 def run() -> None:
@@ -28,26 +74,284 @@ def run() -> None:
     print_debug(f"Debug mode: {config.debug}")
     print_debug(f"Commit limit: {config.commit_limit}")
     print_debug(f"Commit range: {config.commit_range or 'N/A'}")
+    print_debug(f"Commit ranges: {', '.join(config.commit_ranges) or 'N/A'}")
     print_debug(f"Timeout: {config.timeout}s")
     print_debug(f"Output format: {config.output_format}")
+    print_debug(f"Cache dir: {config.cache_dir or 'disabled'}")
+    print_debug(f"Workers: {config.workers}")
+    print_debug(f"Native reader: {config.native_reader}")
+    print_debug(f"Commit graph: {config.commit_graph}")
+    print_debug(f"Deepen shallow clones: {config.deepen_shallow}")
+
+    # A bad pattern fails here rather than after the log is read; risky
+    # ones are flagged. Extraction reuses the compiled patterns.
+    if config.extract_patterns:
+        precompile_patterns(config.extract_patterns.values())
+    elif config.extract_pattern:
+        precompile_patterns([config.extract_pattern])
+
+    timings = Timings(config.trace_memory)
+
+    with timings.stage("configure_git"):
+        configure_git()
+
+    if config.deepen_shallow and is_shallow():
+        # Incremental runs pick their range later; their fallback is the last
+        # commit_limit commits.
+        wanted = config.commit_ranges
+        if config.commit_range:
+            wanted = (config.commit_range,)
+        with timings.stage("deepen"):
+            deepen_history(config.commit_limit, wanted, config.timeout)
+
+    if config.commit_graph:
+        with timings.stage("commit_graph"):
+            ensure_commit_graph(config.timeout)
 
-    configure_git()
+    commit_range = config.commit_range
+    state = None
+    head = spec = ""
+    if config.state_file:
+        with timings.stage("state"):
+            state, head, spec = _load_state(config)
+        if state is not None:
+            commit_range = f"{state.head}..{head}"
 
-    commit_messages = fetch_commit_messages(
-        config.commit_limit, config.pretty, config.timeout, config.commit_range
+    # Batch mode: one walk for all ranges, then one git log of their union.
+    dedup = Dedup(config.dedup, config.top_n, config.max_matches)
+    revisions = ranges = None
+    if config.commit_ranges:
+        with timings.stage("ranges"):
+            revisions, members = resolve_ranges(config.commit_ranges, config.timeout)
+        ranges = RangeResults(members, dedup)
+
+    # Without pretty, records render a header (sha, author, date) the pattern
+    # may match, so only bare-message runs can be filtered by git.
+    log_filter = None
+    if config.pretty and (config.extract_pattern or config.extract_patterns):
+        log_filter = git_log_filter(
+            config.extract_patterns.values()
+            if config.extract_patterns
+            else [config.extract_pattern]
+        )
+
+    commits = timings.iterate(
+        "fetch",
+        stream_commits(
+            config.commit_limit,
+            config.pretty,
+            config.timeout,
+            commit_range,
+            log_filter,
+            config.native_reader,
+            revisions,
+        ),
+        unit="commits",
+        text=lambda commit: commit.message,
     )
 
-    environment, match_count = extract_info(
-        commit_messages,
+    cache = None
+    if config.extract_pattern or config.extract_patterns:
+        from app.cache import open_cache
+
+        cache = open_cache(
+            config.cache_dir, config.cache_max_age_days, config.cache_max_entries
+        )
+
+    # With previous state, emptiness is judged after merging the new matches.
+    fail_on_empty = config.fail_on_empty and state is None
+    # value -> SHAs, or with extract_patterns name -> value -> SHAs.
+    sources: dict = {}
+    try:
+        with timings.stage("extract"):
+            if config.extract_patterns:
+                results = extract_named_info(
+                    commits,
+                    config.extract_patterns,
+                    fail_on_empty,
+                    sources,
+                    cache,
+                    config.workers,
+                    ranges,
+                    config.timeout,
+                    dedup,
+                )
+            else:
+                matches = extract_info(
+                    commits,
+                    config.extract_command,
+                    config.extract_pattern,
+                    fail_on_empty,
+                    config.timeout,
+                    sources,
+                    cache,
+                    config.workers,
+                    ranges,
+                    dedup,
+                )
+                results = {STATE_VALUE: matches}
+    finally:
+        if cache is not None:
+            with timings.stage("cache"):
+                cache.close()
+
+    if state is not None:
+        with timings.stage("state"):
+            results, sources = _merge_state(state, results, sources, dedup)
+        if config.fail_on_empty and not any(m.count for m in results.values()):
+            fail(
+                "No environment information extracted and fail_on_empty is set to true"
+            )
+
+    # Formatted values are streamed into the output files; the time spent
+    # producing their chunks is charged to "format".
+    def streamed(value: Formatted) -> Formatted:
+        if isinstance(value, str):
+            return value
+        return timings.iterate("format", value, unit="chunks")
+
+    # Artifact formats (binary) go to a file; the output value is its path.
+    artifact_suffix = get_format(config.output_format).artifact_suffix
+
+    def formatted(matches: Matches) -> tuple[Formatted, ValueFile | None]:
+        if artifact_suffix:
+            chunks = stream_output(matches, config.output_format)
+            value_file = write_artifact(
+                streamed(chunks), artifact_suffix, config.output_file_compress
+            )
+            return value_file.path, value_file
+        if not matches.count:
+            return str(matches), None
+        return streamed(stream_output(matches, config.output_format)), None
+
+    environment: Formatted
+    value_file = None
+    # Files the other outputs were written to, by output name.
+    value_files: dict[str, ValueFile] = {}
+    named_outputs: dict[str, Formatted] = {}
+    range_output = ""
+    with timings.stage("format"):
+        match_count = sum(matches.count for matches in results.values())
+        if config.extract_patterns:
+            environment = streamed(stream_named_output(results))
+            for name, matches in results.items():
+                named_outputs[name], named_file = formatted(matches)
+                if named_file is not None:
+                    value_files[name] = named_file
+        else:
+            environment, value_file = formatted(results[STATE_VALUE])
+        if ranges is not None:
+            named = bool(config.extract_patterns)
+            range_output = format_range_output(
+                ranges.results(config.extract_patterns if named else ("",)), named
+            )
+
+    with timings.stage("output"):
+        # Values over the threshold are written to a file once, and only its
+        # path (and digest) goes into the environment of every later step.
+        def spilled(
+            value: Formatted, suffix: str
+        ) -> tuple[Formatted, ValueFile | None]:
+            return spill_value(
+                value, config.output_file_threshold, suffix, config.output_file_compress
+            )
+
+        def spilled_output(name: str, value: Formatted, suffix: str) -> Formatted:
+            value, spilled_file = spilled(value, suffix)
+            if spilled_file is not None:
+                value_files[name] = spilled_file
+            return value
+
+        if value_file is None:
+            suffix = ".json" if config.extract_patterns else f".{config.output_format}"
+            environment, value_file = spilled(environment, suffix)
+        if not artifact_suffix:
+            for name, value in named_outputs.items():
+                named_outputs[name] = spilled_output(
+                    name, value, f".{config.output_format}"
+                )
+        match_commits = spilled_output(
+            "match_commits", match_commits_json(sources), ".json"
+        )
+        if range_output:
+            range_output = spilled_output("range_results", range_output, ".json")
+        set_output_variables(
+            environment,
+            config.key_variable,
+            match_count,
+            match_commits,
+            named_outputs,
+            range_output,
+            value_file,
+            value_files,
+        )
+
+    if config.state_file and head:
+        from app.state import ExtractionState, save_state
+
+        with timings.stage("state"):
+            try:
+                values = {name: str(matches) for name, matches in results.items()}
+                save_state(
+                    config.state_file, ExtractionState(head, spec, values, sources)
+                )
+                print_debug(f"Saved state at {head[:12]} to {config.state_file}")
+            except OSError as e:
+                print_debug(f"Failed to save state file: {e}")
+
+    timings.print_summary()
+    write_timings(timings.as_dict())
+
+    print_header("Process Completed Successfully")
+
+
+def _load_state(config: AppConfig) -> tuple["ExtractionState | None", str, str]:
+    """Load incremental state usable for this run.
+
+    Returns:
+        Tuple of (state or None for a full run, HEAD SHA, extraction spec).
+    """
+    from app.state import extraction_spec, load_state
+
+    print_section("Loading Incremental State")
+    spec = extraction_spec(
         config.extract_command,
         config.extract_pattern,
-        config.fail_on_empty,
-        config.timeout,
+        config.extract_patterns,
+        config.pretty,
     )
+    head = resolve_revision("HEAD", config.timeout)
+    if not head:
+        print("  - HEAD does not resolve; incremental mode disabled")
+        return None, "", spec
 
-    if environment.strip():
-        environment = format_output(environment, config.output_format)
+    state = load_state(config.state_file, spec)
+    if state is None:
+        return None, head, spec
+    if not is_ancestor(state.head, head, config.timeout, config.native_reader):
+        print("  - Last processed commit is no longer in history; starting over")
+        return None, head, spec
+    print(f"  - Processing commits since {state.head[:12]}")
+    return state, head, spec
 
-    set_output_variables(environment, config.key_variable, match_count)
 
-    print_header("Process Completed Successfully")
+def _merge_state(
+    state: "ExtractionState",
+    results: dict[str, Matches],
+    sources: dict,
+    dedup: Dedup,
+) -> tuple[dict[str, Matches], dict]:
+    """Merge this run's results into the persisted ones."""
+    from app.state import merge_sources
+
+    merged = {
+        name: merge_results(state.values.get(name, ""), matches, dedup)
+        for name, matches in results.items()
+    }
+    if STATE_VALUE in results:
+        return merged, merge_sources(state.sources, sources)
+    names = dict.fromkeys([*sources, *state.sources])
+    return merged, {
+        name: merge_sources(state.sources.get(name, {}), sources.get(name, {}))
+        for name in names
+    }
@@ -1,20 +1,53 @@
 """Write output variables for GitHub Actions."""
 
 import os
-import uuid
+from collections.abc import Iterable
+from itertools import chain
+from typing import TYPE_CHECKING, NamedTuple
 
 from app.logger import fail, print_section, print_success
 
+if TYPE_CHECKING:
+    from app.formatter import Formatted
+
+
+class ValueFile(NamedTuple):
+    """An output value written to a file rather than inlined."""
+
+    path: str
+    sha256: str  # of the value, before any compression
+    size: int  # bytes of the value, before any compression
+
 
 def set_output_variables(
-    environment: str, key_variable: str, match_count: int = 0
+    environment: "Formatted",
+    key_variable: str,
+    match_count: int = 0,
+    match_commits: str = "{}",
+    named_outputs: "dict[str, Formatted] | None" = None,
+    range_results: str = "",
+    value_file: ValueFile | None = None,
+    value_files: dict[str, ValueFile] | None = None,
 ) -> None:
     """Set output variables for GitHub Actions.
 
     Args:
-        environment: The value to set.
+        environment: The value to set, as a string or an iterator of chunks
+            (see :func:`app.formatter.stream_output`).
         key_variable: The name of the key variable.
         match_count: Number of extracted matches.
+        match_commits: JSON map of matched value to the SHAs it came from
+            (see :func:`match_commits_json`), or the path of the file it was
+            written to.
+        named_outputs: Optional extra outputs (from extract_patterns), each
+            written as its own step output and env var; values may be chunk
+            iterators too.
+        range_results: JSON map of per-range results (commit_ranges mode),
+            written as the ``range_results`` step output.
+        value_file: The file ``environment`` was written to instead, if any,
+            exposed as the ``value_file`` and ``value_sha256`` step outputs.
+        value_files: Files other outputs were written to instead, by output
+            name, exposed as the ``value_files`` JSON step output.
     """
     print_section("Setting Output Variables")
 
@@ -25,29 +58,87 @@ def set_output_variables(
     github_env = os.getenv("GITHUB_ENV")
     github_output = os.getenv("GITHUB_OUTPUT")
 
+    files = _files_json(value_files) if value_files else ""
+
     if github_env and github_output:
         _write_github_outputs(
-            environment, output_var, match_count, github_env, github_output
+            environment,
+            output_var,
+            match_count,
+            github_env,
+            github_output,
+            match_commits,
+            named_outputs or {},
+            range_results,
+            value_file,
+            files,
         )
     else:
         print_success("Local execution - variables would be set as:")
-        print(f"  - {output_var}={environment}")
+        print(f"  - {output_var}={_joined(environment)}")
         print(f"  - match_count={match_count}")
+        if match_commits != "{}":
+            print(f"  - match_commits={match_commits}")
+        for name, value in (named_outputs or {}).items():
+            print(f"  - {name}={_joined(value)}")
+        if range_results:
+            print(f"  - range_results={range_results}")
+        if value_file:
+            print(f"  - value_file={value_file.path}")
+            print(f"  - value_sha256={value_file.sha256}")
+        if files:
+            print(f"  - value_files={files}")
+
+
+def match_commits_json(sources: dict) -> str:
+    """Render the ``match_commits`` output: matched value to commit SHAs.
+
+    With extract_patterns, ``sources`` (and the output) map each output name
+    to its own value -> SHAs map.
+    """
+    import json
+
+    return json.dumps(sources, ensure_ascii=False, sort_keys=True) if sources else "{}"
+
+
+def _files_json(value_files: dict[str, ValueFile]) -> str:
+    import json
+
+    return json.dumps(
+        {name: value_file._asdict() for name, value_file in value_files.items()},
+        sort_keys=True,
+    )
+
+
+def _joined(value: "Formatted") -> str:
+    return value if isinstance(value, str) else "".join(value)
 
 
 def _write_github_outputs(
-    environment: str,
+    environment: "Formatted",
     output_var: str,
     match_count: int,
     github_env: str,
     github_output: str,
+    match_commits: str = "{}",
+    named_outputs: "dict[str, Formatted] | None" = None,
+    range_results: str = "",
+    value_file: ValueFile | None = None,
+    value_files: str = "",
 ) -> None:
     """Write values to GITHUB_ENV and GITHUB_OUTPUT files.
 
+    Both files are open at once and each value is written to both as it is
+    produced, so a chunked value is formatted only once and never held in
+    memory as a whole.
+
     GITHUB_ENV receives an env var named after the user-chosen key (e.g. DEPLOY_ENV),
     consumable by subsequent steps via ${{ env.DEPLOY_ENV }}.
-    GITHUB_OUTPUT receives the three action.yml-declared outputs
-    (key_variable, value_variable, match_count).
+    GITHUB_OUTPUT receives the action.yml-declared outputs
+    (key_variable, value_variable, match_count, match_commits and, in
+    commit_ranges mode, range_results; value_file and value_sha256 when the
+    value was written to a file, value_files when other outputs were).
+    Each named output is written to both files under its own name.
 
     Args:
         environment: The value to write.
@@ -55,22 +146,137 @@ def _write_github_outputs(
         match_count: Number of extracted matches.
         github_env: Path to GITHUB_ENV file.
         github_output: Path to GITHUB_OUTPUT file.
+        match_commits: JSON map of matched value to commit SHAs.
+        named_outputs: Extra name -> value outputs.
+        range_results: JSON map of per-range results, if any.
+        value_file: File the value was written to instead, if any.
+        value_files: JSON map of the files other outputs were written to.
     """
+    import uuid
+
     delimiter = f"EOF_{uuid.uuid4().hex}"
 
     try:
-        with open(github_env, "a", encoding="utf-8") as f:
-            f.write(f"{output_var}<<{delimiter}\n")
-            f.write(f"{environment}\n")
-            f.write(f"{delimiter}\n")
+        with open(github_env, "a", encoding="utf-8") as env, open(
+            github_output, "a", encoding="utf-8"
+        ) as output:
+            env.write(f"{output_var}<<{delimiter}\n")
+            output.write(f"value_variable<<{delimiter}\n")
+            _write_both(environment, env, output)
+            env.write(f"\n{delimiter}\n")
+            output.write(f"\n{delimiter}\n")
 
-        with open(github_output, "a", encoding="utf-8") as f:
-            f.write(f"value_variable<<{delimiter}\n")
-            f.write(f"{environment}\n")
-            f.write(f"{delimiter}\n")
-            f.write(f"key_variable={output_var}\n")
-            f.write(f"match_count={match_count}\n")
+            output.write(f"key_variable={output_var}\n")
+            output.write(f"match_count={match_count}\n")
+            output.write(f"match_commits={match_commits}\n")
+            if range_results:
+                output.write(f"range_results={range_results}\n")
+            if value_file:
+                output.write(f"value_file={value_file.path}\n")
+                output.write(f"value_sha256={value_file.sha256}\n")
+            if value_files:
+                output.write(f"value_files={value_files}\n")
+
+            for name, value in (named_outputs or {}).items():
+                for f in (env, output):
+                    f.write(f"{name}<<{delimiter}\n")
+                _write_both(value, env, output)
+                for f in (env, output):
+                    f.write(f"\n{delimiter}\n")
 
         print_success("Variables set in GitHub Actions environment")
     except IOError as e:
         fail(f"Failed to write output files: {e}")
+
+
+def _write_both(value: "Formatted", env, output) -> None:
+    """Write a string or each chunk of a chunked value to both files."""
+    chunks = (value,) if isinstance(value, str) else value
+    for chunk in chunks:
+        env.write(chunk)
+        output.write(chunk)
+
+
+def write_artifact(
+    chunks: Iterable[bytes], suffix: str, compress: bool = False
+) -> ValueFile:
+    """Write a value to a new file, optionally gzip-compressed.
+
+    The file is created under ``RUNNER_TEMP`` (the system temp directory
+    outside Actions), which the runner empties after the job.
+    """
+    import hashlib
+    import tempfile
+    import uuid
+
+    if compress:
+        suffix += ".gz"
+    directory = os.getenv("RUNNER_TEMP") or tempfile.gettempdir()
+    path = os.path.join(directory, f"commit-info-extractor-{uuid.uuid4().hex}{suffix}")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as raw:
+            f = raw
+            if compress:
+                import gzip
+
+                f = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            if f is not raw:
+                f.close()
+    except OSError as e:
+        fail(f"Failed to write output artifact: {e}")
+    print(f"  - Artifact: {path} ({size} bytes)")
+    return ValueFile(path, digest.hexdigest(), size)
+
+
+def spill_value(
+    value: "Formatted", threshold: int, suffix: str, compress: bool = False
+) -> tuple["Formatted", ValueFile | None]:
+    """Move ``value`` to a file when it is larger than ``threshold`` bytes.
+
+    Returns the value to output (unchanged, or the file's path) and the
+    file, if one was written. Chunks are buffered only up to ``threshold``
+    bytes; past it, they go straight to the file. A threshold of 0 keeps
+    every value inline.
+    """
+    if threshold <= 0:
+        return value, None
+    chunks = iter((value,) if isinstance(value, str) else value)
+    head: list[bytes] = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk.encode("utf-8"))
+        size += len(head[-1])
+        if size > threshold:
+            rest = (chunk.encode("utf-8") for chunk in chunks)
+            value_file = write_artifact(chain(head, rest), suffix, compress)
+            return value_file.path, value_file
+    return b"".join(head).decode("utf-8"), None
+
+
+def write_timings(timings: dict) -> None:
+    """Write stage timings as the ``timings`` JSON step output.
+
+    Called after :func:`set_output_variables` so the output stage itself is
+    included in the timings.
+
+    Args:
+        timings: Summary from :meth:`app.logger.Timings.as_dict`.
+    """
+    import json
+
+    value = json.dumps(timings)
+    github_output = os.getenv("GITHUB_OUTPUT")
+    if not github_output:
+        print(f"  - timings={value}")
+        return
+    try:
+        with open(github_output, "a", encoding="utf-8") as f:
+            f.write(f"timings={value}\n")
+    except IOError as e:
+        fail(f"Failed to write output files: {e}")
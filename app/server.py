@@ -0,0 +1,183 @@
+"""Resident extraction server on a Unix socket, and its client.
+
+Every action run normally pays for interpreter startup and imports before
+doing any work. ``python3 entrypoint.py --serve SOCKET`` keeps one process
+resident instead: each request carries the client's working directory and
+its ``INPUT_*``/``GITHUB_*``/``RUNNER_*``/``GIT_*`` environment, and the
+server runs :func:`app.main.run` exactly as the client would have, writing
+``GITHUB_OUTPUT``/``GITHUB_ENV`` itself and sending back the exit code and
+console output. Anything a process keeps between runs is reused: compiled
+regexes (``re``'s own cache), parsed ``extract_command`` pipelines and, for
+``native_reader``, the commit objects already read.
+
+Requests are served one at a time, since a run changes the process-wide
+working directory and environment.
+
+Protocol: the client sends one JSON object and shuts down its side of the
+connection; the server answers with one JSON object and closes.
+"""
+
+import json
+import os
+import socket
+import sys
+
+# Environment variables forwarded from the client to the server.
+FORWARDED_PREFIXES = ("INPUT_", "GITHUB_", "RUNNER_", "GIT_")
+
+# Commit objects the server keeps in memory across requests.
+DEFAULT_MAX_OBJECTS = 100_000
+
+
+def request(socket_path: str) -> int | None:
+    """Run this process's extraction on the server at ``socket_path``.
+
+    Prints the server's console output and returns the exit code, or None
+    if nothing accepts connections there, so the caller can run the
+    extraction itself. Once connected the run may already have written
+    outputs, so a lost connection is an error rather than a retry.
+    """
+    payload = {
+        "cwd": os.getcwd(),
+        "env": {
+            key: value
+            for key, value in os.environ.items()
+            if key.startswith(FORWARDED_PREFIXES)
+        },
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return None
+        try:
+            client.sendall(json.dumps(payload).encode("utf-8"))
+            client.shutdown(socket.SHUT_WR)
+            response = json.loads(_read_all(client))
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Extraction server at {socket_path} failed: {e}",
+                  file=sys.stderr)
+            return 1
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit_code"]
+
+
+def _read_all(connection: socket.socket) -> bytes:
+    chunks = []
+    while chunk := connection.recv(64 * 1024):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def handle(payload: dict) -> dict:
+    """Run one extraction with the client's directory and environment.
+
+    A ``trace_memory`` run starts tracemalloc; it is stopped again afterwards
+    so later requests do not pay for tracing they did not ask for.
+    """
+    import contextlib
+    import io
+    import tracemalloc
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        for key in list(os.environ):
+            if key.startswith(FORWARDED_PREFIXES):
+                del os.environ[key]
+        os.environ.update(payload["env"])
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exit_code = _run(payload["cwd"])
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+        if not was_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return {
+        "exit_code": exit_code,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+    }
+
+
+def _run(cwd: str) -> int:
+    """app.main.run() with entrypoint.py's exit codes."""
+    from app.logger import ActionError
+    from app.main import run
+
+    try:
+        os.chdir(cwd)
+        run()
+    except ActionError:
+        return 1
+    except Exception:
+        import traceback
+
+        print("[ERROR] Unexpected error:", file=sys.stderr)
+        traceback.print_exc(file=sys.stderr)
+        return 1
+    return 0
+
+
+def make_server(socket_path: str, max_objects: int = DEFAULT_MAX_OBJECTS):
+    """Bind the server to ``socket_path`` (owner-only) without serving yet."""
+    import socketserver
+
+    from app.git_objects import cache_objects
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self) -> None:
+            try:
+                payload = json.loads(_read_all(self.request))
+                response = handle(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"exit_code": 1, "stdout": "", "stderr": f"[ERROR] {e}\n"}
+            try:
+                self.request.sendall(json.dumps(response).encode("utf-8"))
+            except OSError:
+                pass  # The client is gone (or only probed the socket).
+
+    _remove_stale_socket(socket_path)
+    cache_objects(max_objects)
+    old_umask = os.umask(0o177)
+    try:
+        return socketserver.UnixStreamServer(socket_path, Handler)
+    finally:
+        os.umask(old_umask)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove a socket file left by a server that is gone; refuse a live one."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise OSError(f"A server is already listening on {socket_path}")
+
+
+def serve(socket_path: str, max_objects: int = DEFAULT_MAX_OBJECTS) -> None:
+    """Serve extraction requests on ``socket_path`` until SIGTERM or SIGINT."""
+    import signal
+
+    def _stop(signum, frame) -> None:
+        raise KeyboardInterrupt
+
+    server = make_server(socket_path, max_objects)
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"Serving extraction requests on {socket_path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,97 @@
+"""Persisted extraction state for incremental runs."""
+
+import hashlib
+import json
+import os
+from typing import NamedTuple
+
+from app.logger import print_debug
+
+# 2: sources are keyed by output name with extract_patterns.
+STATE_VERSION = 2
+
+
+class ExtractionState(NamedTuple):
+    """What a previous run extracted, and up to which commit.
+
+    ``head`` is the watermark: the HEAD commit the run processed up to.
+    ``values`` holds the raw (unformatted) deduplicated results by output
+    name, and ``sources`` the value -> commit SHAs map for ``match_commits``
+    (output name -> value -> SHAs with ``extract_patterns``).
+    """
+
+    head: str
+    spec: str
+    values: dict[str, str]
+    sources: dict
+
+
+def extraction_spec(
+    extract_command: str,
+    extract_pattern: str,
+    extract_patterns: dict[str, str],
+    pretty: bool,
+) -> str:
+    """Hash the settings that determine extraction results.
+
+    State written under a different spec cannot be merged with new results.
+    """
+    raw = json.dumps(
+        [extract_command, extract_pattern, extract_patterns, pretty], sort_keys=True
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def load_state(path: str, spec: str) -> ExtractionState | None:
+    """Load state saved for ``spec``, or None if missing, unreadable or stale.
+
+    Incremental mode is an optimization, so any problem with the state file
+    is logged and the run falls back to a full extraction.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print("  - No previous state; extracting the full window")
+        return None
+    except (OSError, ValueError) as e:
+        print_debug(f"Ignoring unreadable state file {path}: {e}")
+        return None
+
+    try:
+        if data["version"] != STATE_VERSION:
+            print_debug(f"Ignoring state file version {data['version']}")
+            return None
+        state = ExtractionState(
+            data["head"], data["spec"], data["values"], data["sources"]
+        )
+    except (KeyError, TypeError) as e:
+        print_debug(f"Ignoring malformed state file {path}: {e}")
+        return None
+
+    if state.spec != spec:
+        print("  - Extraction settings changed since the last run; starting over")
+        return None
+    return state
+
+
+def save_state(path: str, state: ExtractionState) -> None:
+    """Atomically write ``state`` to ``path``."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": STATE_VERSION, **state._asdict()}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def merge_sources(
+    previous: dict[str, list[str]], current: dict[str, list[str]]
+) -> dict[str, list[str]]:
+    """Merge value -> SHAs maps; newer SHAs (from ``current``) come first."""
+    merged = {value: list(shas) for value, shas in current.items()}
+    for value, shas in previous.items():
+        known = merged.setdefault(value, [])
+        known.extend(sha for sha in shas if sha not in known)
+    return merged
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Benchmark walking a long commit range with and without a commit-graph.
+
+For each repository size, a tag is placed a tenth of the way into history
+and the range ``start..main`` is walked by git (``rev-list --count``,
+``merge-base --is-ancestor`` and the action's streaming ``git log``) and by
+the in-process reader (range membership, ancestry and full records). Every
+walk is timed first without ``objects/info/commit-graph`` and then with it.
+Repositories are generated with bench_pipeline.generate_repo and shared
+with that benchmark's --repo-dir; the graph is removed again afterwards.
+
+Usage:
+    python3 benchmarks/bench_commit_graph.py --commits 10000,100000
+    python3 benchmarks/bench_commit_graph.py --commits 50000 --runs 5 --json graph.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import generate_repo  # noqa: E402
+
+RANGE = "start..main"
+
+WALKS = (
+    "git_rev_list_count",
+    "git_merge_base_is_ancestor",
+    "git_log_records",
+    "native_revisions",
+    "native_is_ancestor",
+    "native_log_records",
+)
+
+
+def _git(repo: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", "-C", repo, *args], capture_output=True, text=True, check=True
+    )
+
+
+def _walks(repo: str, timeout: int) -> dict:
+    """Map each walk name to a function returning the number of commits seen."""
+    from app.git_client import _read_log
+    from app.git_objects import open_repository
+
+    def native(method, *args):
+        with open_repository(os.path.join(repo, ".git")) as repository:
+            return method(repository, *args)
+
+    def in_repo(func):
+        def run():
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                return func()
+            finally:
+                os.chdir(cwd)
+
+        return run
+
+    return {
+        "git_rev_list_count": lambda: int(
+            _git(repo, "rev-list", "--count", RANGE).stdout
+        ),
+        "git_merge_base_is_ancestor": lambda: int(
+            subprocess.run(
+                ["git", "-C", repo, "merge-base", "--is-ancestor", "start", "main"]
+            ).returncode
+            == 0
+        ),
+        "git_log_records": in_repo(
+            lambda: sum(1 for _ in _read_log(1, True, timeout, RANGE, None))
+        ),
+        "native_revisions": lambda: native(
+            lambda r: sum(1 for _ in r.revisions(1, RANGE))
+        ),
+        "native_is_ancestor": lambda: native(
+            lambda r: int(r.is_ancestor("start", "main"))
+        ),
+        "native_log_records": lambda: native(
+            lambda r: sum(1 for _ in r.log(1, RANGE))
+        ),
+    }
+
+
+def _time(func, runs: int) -> tuple[float, int]:
+    """Median wall time in seconds of ``runs`` calls, and the last result."""
+    samples = []
+    result = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def bench_repo(repo: str, commits: int, runs: int, timeout: int) -> dict:
+    """Time every walk over ``repo`` without, then with, a commit-graph."""
+    graph = os.path.join(repo, ".git", "objects", "info", "commit-graph")
+    _git(repo, "tag", "-f", "start", f"main~{commits - commits // 10}")
+    walks = _walks(repo, timeout)
+    result = {"commits": commits, "range": RANGE, "walks": {}}
+    if os.path.exists(graph):
+        os.remove(graph)
+    try:
+        for name in WALKS:
+            seconds, count = _time(walks[name], runs)
+            result["walks"][name] = {"without_graph": round(seconds, 4), "result": count}
+
+        start = time.perf_counter()
+        _git(repo, "commit-graph", "write", "--reachable")
+        result["graph_write_seconds"] = round(time.perf_counter() - start, 4)
+
+        for name in WALKS:
+            seconds, count = _time(walks[name], runs)
+            walk = result["walks"][name]
+            if count != walk["result"]:
+                raise RuntimeError(f"{name} disagrees with the graph: {count}")
+            walk["with_graph"] = round(seconds, 4)
+            walk["speedup"] = round(walk["without_graph"] / max(seconds, 1e-9), 2)
+    finally:
+        if os.path.exists(graph):
+            os.remove(graph)
+    return result
+
+
+def main(argv: list[str] | None = None) -> dict:
+    """Generate repositories as needed, benchmark each size, and report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--commits",
+        type=lambda v: [int(n) for n in v.split(",")],
+        default=[10000, 100000],
+        help="comma-separated repository sizes (default: 10000,100000)",
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=int, default=600)
+    parser.add_argument(
+        "--repo-dir",
+        default=os.path.join(tempfile.gettempdir(), "commit-info-extractor-bench"),
+        help="where generated repositories are cached",
+    )
+    parser.add_argument("--json", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for commits in args.commits:
+        # Same defaults and naming as bench_pipeline, so repositories are shared.
+        repo = os.path.join(args.repo_dir, f"repo-{commits}-120-0.05")
+        if not os.path.isdir(os.path.join(repo, ".git")):
+            print(f"Generating {commits} commits in {repo} ...", file=sys.stderr)
+            generate_repo(repo, commits, 120, 0.05)
+        print(f"Benchmarking {commits} commits ...", file=sys.stderr)
+        results.append(bench_repo(repo, commits, args.runs, args.timeout))
+
+    report = {
+        "python": platform.python_version(),
+        "git": subprocess.run(
+            ["git", "--version"], capture_output=True, text=True
+        ).stdout.strip(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "results": results,
+    }
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nJSON report written to {args.json}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+def _print_table(results: list[dict]) -> None:
+    """Print a walk-by-walk summary table to stderr."""
+    header = f"{'commits':>9}  {'walk':<28} {'no graph s':>11} {'graph s':>9} {'speedup':>8}"
+    print("\n" + header, file=sys.stderr)
+    print("-" * len(header), file=sys.stderr)
+    for result in results:
+        for name, walk in result["walks"].items():
+            print(
+                f"{result['commits']:>9}  {name:<28} {walk['without_graph']:>11.4f} "
+                f"{walk['with_graph']:>9.4f} {walk['speedup']:>7.2f}x",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Benchmark the app.main.run pipeline stage by stage over synthetic repositories.
+
+Each repository size is benchmarked in a fresh worker process so peak RSS is
+not polluted by earlier runs. Repositories are generated once with
+`git fast-import` and reused from --repo-dir on later invocations.
+
+Usage:
+    python3 benchmarks/bench_pipeline.py --commits 1000,10000,100000
+    python3 benchmarks/bench_pipeline.py --commits 500000 --message-length 400 \
+        --extract-pattern 'env:(\\w+)' --json bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+STAGES = (
+    "configure_git",
+    "fetch_commit_messages",
+    "extract_info",
+    "format_output",
+    "set_output_variables",
+    "run",
+)
+
+_WORDS = (
+    "add fix update remove refactor handle bump support improve cleanup "
+    "login signup cache timeout retry config deploy service api client "
+    "docs test build release parser output format range commit message"
+).split()
+_MARKERS = ("env:prod", "env:staging", "env:dev", "OPS-101", "OPS-202", "v1.2.3")
+_TYPES = ("feat", "fix", "chore", "docs", "refactor", "test", "ci")
+
+
+def _message(rng: random.Random, length: int, marker_rate: float) -> str:
+    """Build a conventional-commit style message of roughly ``length`` chars."""
+    subject = f"{rng.choice(_TYPES)}: {' '.join(rng.choices(_WORDS, k=4))}"
+    words = []
+    size = len(subject)
+    while size < length:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    if rng.random() < marker_rate:
+        words.append(rng.choice(_MARKERS))
+    body = " ".join(words)
+    return f"{subject}\n\n{body}\n" if body else f"{subject}\n"
+
+
+def generate_repo(path: str, commits: int, message_length: int, marker_rate: float) -> None:
+    """Create a git repository with ``commits`` empty commits via fast-import."""
+    subprocess.run(["git", "init", "-q", path], check=True)
+    rng = random.Random(commits)
+    process = subprocess.Popen(
+        ["git", "-C", path, "fast-import", "--quiet"], stdin=subprocess.PIPE
+    )
+    out = process.stdin
+    timestamp = 1_700_000_000
+    for n in range(commits):
+        data = _message(rng, message_length, marker_rate).encode("utf-8")
+        out.write(b"commit refs/heads/main\n")
+        out.write(f"mark :{n + 1}\n".encode())
+        out.write(f"committer Bench <bench@example.com> {timestamp + n} +0000\n".encode())
+        out.write(f"data {len(data)}\n".encode() + data + b"\n")
+        if n:
+            out.write(f"from :{n}\n".encode())
+    out.close()
+    if process.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "-C", path, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+
+
+def _peak_rss_kb() -> int:
+    """Peak resident set size of this process so far, in KiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _timed(results: dict, stage: str, commits: int, func, *args):
+    """Run ``func`` with stdout silenced and record wall time and peak RSS."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        value = func(*args)
+        elapsed = time.perf_counter() - start
+    results[stage] = {
+        "seconds": round(elapsed, 6),
+        "commits_per_second": round(commits / elapsed, 1) if elapsed else None,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+    return value
+
+
+def run_worker(args: argparse.Namespace) -> dict:
+    """Benchmark every stage against the repository in the current directory."""
+    from app.extractor import extract_info
+    from app.formatter import format_output
+    from app.git_client import configure_git, stream_commits
+    from app.main import run
+    from app.output_writer import set_output_variables
+
+    commits = args.commits[0]
+    limit = commits
+    stages: dict[str, dict] = {}
+
+    _timed(stages, "configure_git", commits, configure_git)
+    records = _timed(
+        stages,
+        "fetch_commit_messages",
+        commits,
+        lambda: list(
+            stream_commits(limit, args.pretty, args.timeout, native=args.native_reader)
+        ),
+    )
+    matches = _timed(
+        stages,
+        "extract_info",
+        commits,
+        extract_info,
+        records,
+        args.extract_command,
+        args.extract_pattern,
+        False,
+        args.timeout,
+    )
+    del records
+    formatted = _timed(
+        stages, "format_output", commits, format_output, matches, args.output_format
+    )
+    _timed(
+        stages,
+        "set_output_variables",
+        commits,
+        set_output_variables,
+        formatted,
+        "BENCH",
+        matches.count,
+    )
+
+    os.environ.update(
+        {
+            "INPUT_COMMIT_LIMIT": str(limit),
+            "INPUT_PRETTY": str(args.pretty).lower(),
+            "INPUT_NATIVE_READER": str(args.native_reader).lower(),
+            "INPUT_EXTRACT_COMMAND": args.extract_command,
+            "INPUT_EXTRACT_PATTERN": args.extract_pattern,
+            "INPUT_OUTPUT_FORMAT": args.output_format,
+            "INPUT_TIMEOUT": str(args.timeout),
+        }
+    )
+    _timed(stages, "run", commits, run)
+
+    return {"commits": commits, "match_count": matches.count, "stages": stages}
+
+
+def _worker_command(args: argparse.Namespace, commits: int) -> list[str]:
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--worker",
+        "--commits",
+        str(commits),
+        "--output-format",
+        args.output_format,
+        "--timeout",
+        str(args.timeout),
+        "--extract-pattern",
+        args.extract_pattern,
+        "--extract-command",
+        args.extract_command,
+    ]
+    if args.pretty:
+        command.append("--pretty")
+    if args.native_reader:
+        command.append("--native-reader")
+    return command
+
+
+def main(argv: list[str] | None = None) -> dict:
+    """Generate repositories as needed, benchmark each size, and report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--commits",
+        type=lambda v: [int(n) for n in v.split(",")],
+        default=[1000, 10000],
+        help="comma-separated repository sizes (default: 1000,10000)",
+    )
+    parser.add_argument("--message-length", type=int, default=120)
+    parser.add_argument(
+        "--marker-rate",
+        type=float,
+        default=0.05,
+        help="fraction of commits carrying an env:/ticket/version marker",
+    )
+    parser.add_argument("--extract-pattern", default=r"env:(\w+)")
+    parser.add_argument("--extract-command", default="")
+    parser.add_argument("--output-format", default="json")
+    parser.add_argument("--pretty", action="store_true")
+    parser.add_argument(
+        "--native-reader",
+        action="store_true",
+        help="read commits from the object database instead of git log",
+    )
+    parser.add_argument("--timeout", type=int, default=600)
+    parser.add_argument(
+        "--repo-dir",
+        default=os.path.join(tempfile.gettempdir(), "commit-info-extractor-bench"),
+        help="where generated repositories are cached",
+    )
+    parser.add_argument("--json", help="write the JSON report to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.extract_command:
+        args.extract_pattern = ""
+
+    if args.worker:
+        report = run_worker(args)
+        print(json.dumps(report))
+        return report
+
+    results = []
+    for commits in args.commits:
+        repo = os.path.join(
+            args.repo_dir, f"repo-{commits}-{args.message_length}-{args.marker_rate}"
+        )
+        if not os.path.isdir(os.path.join(repo, ".git")):
+            print(f"Generating {commits} commits in {repo} ...", file=sys.stderr)
+            generate_repo(repo, commits, args.message_length, args.marker_rate)
+
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ)
+            for key in list(env):
+                if key.startswith("INPUT_"):
+                    del env[key]
+            env.update(
+                {
+                    "GIT_CONFIG_GLOBAL": os.path.join(scratch, "gitconfig"),
+                    "GITHUB_ENV": os.path.join(scratch, "github_env"),
+                    "GITHUB_OUTPUT": os.path.join(scratch, "github_output"),
+                    "PYTHONPATH": PROJECT_ROOT,
+                }
+            )
+            print(f"Benchmarking {commits} commits ...", file=sys.stderr)
+            completed = subprocess.run(
+                _worker_command(args, commits),
+                cwd=repo,
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "python": platform.python_version(),
+        "git": subprocess.run(
+            ["git", "--version"], capture_output=True, text=True
+        ).stdout.strip(),
+        "platform": platform.platform(),
+        "settings": {
+            "message_length": args.message_length,
+            "marker_rate": args.marker_rate,
+            "extract_pattern": args.extract_pattern,
+            "extract_command": args.extract_command,
+            "output_format": args.output_format,
+            "pretty": args.pretty,
+            "native_reader": args.native_reader,
+        },
+        "results": results,
+    }
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nJSON report written to {args.json}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+def _print_table(results: list[dict]) -> None:
+    """Print a per-stage summary table to stderr."""
+    header = f"{'commits':>9}  {'stage':<22} {'seconds':>10} {'commits/s':>12} {'peak RSS MiB':>13}"
+    print("\n" + header, file=sys.stderr)
+    print("-" * len(header), file=sys.stderr)
+    for result in results:
+        for stage in STAGES:
+            data = result["stages"][stage]
+            rate = data["commits_per_second"]
+            print(
+                f"{result['commits']:>9}  {stage:<22} {data['seconds']:>10.4f} "
+                f"{rate if rate is not None else '-':>12} "
+                f"{data['peak_rss_kb'] / 1024:>13.1f}",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    main()
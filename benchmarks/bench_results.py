@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark turning extracted values into a match count and formatted output.
+
+A synthetic log of the requested size is generated in memory with a distinct
+ticket reference (``OPS-<n>``) in every commit, so the unique values found by
+``OPS-\\d+`` run to megabytes. From that set of values, two paths produce
+``match_count`` and stream the formatted value into a byte-counting sink, as
+the output writer does:
+
+- ``joined``: what the action did before app.formatter.Matches: sort and
+  join the values into one string, split it again to count the non-blank
+  lines, then walk it line by line while formatting.
+- ``fused``: sort the values into a Matches, which counts them as it is
+  built; formats iterate its values directly.
+
+Each path is timed (median of --runs) and then run once under tracemalloc
+for the peak memory it allocated on top of the value set.
+
+Usage:
+    python3 benchmarks/bench_results.py --megabytes 4,16
+    python3 benchmarks/bench_results.py --output-format text --json results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from itertools import chain, repeat
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import _message  # noqa: E402
+
+PATTERN = r"OPS-\d+"
+PATHS = ("joined", "fused")
+
+
+def generate_log(megabytes: int, seed: int = 0) -> str:
+    """Build a newline-separated log of roughly ``megabytes`` MiB."""
+    rng = random.Random(seed)
+    target = megabytes * 1024 * 1024
+    parts = []
+    size = n = 0
+    while size < target:
+        message = _message(rng, 120, 0.0) + f"Refs: OPS-{n}\n"
+        parts.append(message)
+        size += len(message)
+        n += 1
+    return "\n".join(parts)
+
+
+def _written(formatted) -> int:
+    """Characters the output writer would write for a formatted value."""
+    if isinstance(formatted, str):
+        return len(formatted)
+    return sum(len(chunk) for chunk in formatted)
+
+
+def joined_path(values: set[str], output_format: str) -> tuple[int, int]:
+    """Count and format the values through one joined string (the old path)."""
+    from app.formatter import _iter_lines
+
+    value = "\n".join(sorted(values))
+    count = len([line for line in value.split("\n") if line.strip()])
+    if output_format == "text":
+        return count, _written(value)
+    separators = chain([""], repeat(", "))
+    chunks = (
+        separator + json.dumps(line, ensure_ascii=False)
+        for separator, line in zip(separators, _iter_lines(value))
+    )
+    return count, _written(chain(["["], chunks, ["]"]))
+
+
+def fused_path(values: set[str], output_format: str) -> tuple[int, int]:
+    """Count and format the values through a Matches."""
+    from app.formatter import Matches, stream_output
+
+    matches = Matches(sorted(values))
+    return matches.count, _written(stream_output(matches, output_format))
+
+
+def _measure(func, values: set[str], output_format: str, runs: int) -> dict:
+    """Median wall time over ``runs`` and traced peak memory of one run."""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            start = time.perf_counter()
+            count, written = func(values, output_format)
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func(values, output_format)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "seconds": round(statistics.median(timings), 6),
+        "peak_kb": peak // 1024,
+        "result": [count, written],
+    }
+
+
+def bench_size(megabytes: int, output_format: str, runs: int) -> dict:
+    """Benchmark both paths over one generated log."""
+    log = generate_log(megabytes)
+    values = set(re.findall(PATTERN, log))
+    del log
+    paths = {
+        "joined": _measure(joined_path, values, output_format, runs),
+        "fused": _measure(fused_path, values, output_format, runs),
+    }
+    if paths["joined"]["result"] != paths["fused"]["result"]:
+        raise RuntimeError("joined and fused paths disagree")
+    joined, fused = paths["joined"], paths["fused"]
+    return {
+        "megabytes": megabytes,
+        "values": len(values),
+        "paths": paths,
+        "peak_reduction": round(1 - fused["peak_kb"] / joined["peak_kb"], 3)
+        if joined["peak_kb"]
+        else None,
+        "speedup": round(joined["seconds"] / fused["seconds"], 2)
+        if fused["seconds"]
+        else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> dict:
+    """Benchmark each log size and report."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--megabytes",
+        type=lambda v: [int(n) for n in v.split(",")],
+        default=[4, 16],
+        help="comma-separated log sizes in MiB (default: 4,16)",
+    )
+    parser.add_argument("--output-format", choices=("json", "text"), default="json")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for megabytes in args.megabytes:
+        print(f"Benchmarking a {megabytes} MiB log ...", file=sys.stderr)
+        results.append(bench_size(megabytes, args.output_format, args.runs))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "output_format": args.output_format,
+        "runs": args.runs,
+        "results": results,
+    }
+
+    _print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nJSON report written to {args.json}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+def _print_table(results: list[dict]) -> None:
+    """Print a size-by-size summary table to stderr."""
+    header = f"{'MiB':>5} {'values':>9}  {'path':<7} {'seconds':>9} {'peak KiB':>10}"
+    print("\n" + header, file=sys.stderr)
+    print("-" * len(header), file=sys.stderr)
+    for result in results:
+        for name in PATHS:
+            path = result["paths"][name]
+            print(
+                f"{result['megabytes']:>5} {result['values']:>9}  {name:<7} "
+                f"{path['seconds']:>9.4f} {path['peak_kb']:>10}",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    main()
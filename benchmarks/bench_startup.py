@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark interpreter startup and imports of the action entrypoint.
+
+Runs ``python -X importtime`` on ``import app.main`` to attribute import cost
+per module, and times complete ``entrypoint.py`` runs (with and without ``-S``,
+as in the Docker image) against a small throwaway repository.
+
+Usage:
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --runs 50 --top 15 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRYPOINT = os.path.join(PROJECT_ROOT, "entrypoint.py")
+
+
+def import_times(python: str = sys.executable) -> dict[str, tuple[int, int]]:
+    """Return ``{module: (self_us, cumulative_us)}`` for ``import app.main``."""
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", "import app.main"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def _make_repo(path: str) -> None:
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "Bench",
+        "GIT_AUTHOR_EMAIL": "bench@example.com",
+        "GIT_COMMITTER_NAME": "Bench",
+        "GIT_COMMITTER_EMAIL": "bench@example.com",
+    }
+    subprocess.run(["git", "init", "-q", path], check=True)
+    for message in ("feat: add login\n\nenv:staging", "fix: timeout\n\nenv:prod"):
+        subprocess.run(
+            ["git", "-C", path, "commit", "-q", "--allow-empty", "-m", message],
+            check=True,
+            env=env,
+        )
+
+
+def time_runs(args: list[str], cwd: str, env: dict, runs: int) -> list[float]:
+    """Wall time in milliseconds of ``runs`` invocations of ``args``."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "median_ms": round(statistics.median(samples), 2),
+        "min_ms": round(min(samples), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--json", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    # Warm the bytecode cache so compilation is not measured.
+    subprocess.run(
+        [sys.executable, "-m", "compileall", "-q", os.path.join(PROJECT_ROOT, "app")],
+        check=True,
+    )
+
+    samples = [import_times() for _ in range(args.runs)]
+    modules = {
+        name: statistics.median(sample[name][1] for sample in samples if name in sample)
+        for name in samples[-1]
+    }
+    slowest = sorted(
+        ((name, modules[name]) for name in modules if name != "app.main"),
+        key=lambda item: item[1],
+        reverse=True,
+    )[: args.top]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        repo = os.path.join(scratch, "repo")
+        _make_repo(repo)
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if not key.startswith(("INPUT_", "GITHUB_"))
+        }
+        env["GIT_CONFIG_GLOBAL"] = os.path.join(scratch, "gitconfig")
+        baseline = time_runs([sys.executable, "-S", "-c", "pass"], repo, env, args.runs)
+        plain = time_runs([sys.executable, ENTRYPOINT], repo, env, args.runs)
+        no_site = time_runs([sys.executable, "-S", ENTRYPOINT], repo, env, args.runs)
+
+    report = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_app_main_us": modules.get("app.main"),
+        "slowest_imports_us": dict(slowest),
+        "interpreter_only": _summary(baseline),
+        "entrypoint": _summary(plain),
+        "entrypoint_no_site": _summary(no_site),
+    }
+
+    print(f"import app.main: {report['import_app_main_us'] / 1000:.1f} ms", file=sys.stderr)
+    for name, us in slowest:
+        print(f"  {name:<30} {us / 1000:>8.2f} ms", file=sys.stderr)
+    for label in ("interpreter_only", "entrypoint", "entrypoint_no_site"):
+        print(f"{label:<20} {report[label]['median_ms']:>8.1f} ms (median)", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,47 @@
 #!/usr/bin/env python3
-"""Entrypoint for commit-info-extractor GitHub Action."""
+"""Entrypoint for commit-info-extractor GitHub Action.
 
+``entrypoint.py --serve SOCKET`` starts a resident server instead (see
+app/server.py). When ``INPUT_DAEMON_SOCKET`` names a socket that exists, the
+run is handed to that server, falling back to running here if it is gone.
+"""
+
+import os
 import sys
-import traceback
 
-from app.logger import ActionError
-from app.main import run
 
-if __name__ == "__main__":
+def _main() -> int:
+    from app.logger import ActionError
+    from app.main import run
+
     try:
         run()
     except ActionError:
-        sys.exit(1)
+        return 1
     except KeyboardInterrupt:
         print("[ERROR] Process interrupted by user", file=sys.stderr)
-        sys.exit(1)
+        return 1
     except Exception:
+        import traceback
+
         print("[ERROR] Unexpected error:", file=sys.stderr)
         traceback.print_exc(file=sys.stderr)
-        sys.exit(1)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"] and len(sys.argv) == 3:
+        from app.server import serve
+
+        serve(sys.argv[2])
+        sys.exit(0)
+
+    socket_path = os.environ.get("INPUT_DAEMON_SOCKET", "").strip()
+    if socket_path and os.path.exists(socket_path):
+        from app.server import request
+
+        exit_code = request(socket_path)
+        if exit_code is not None:
+            sys.exit(exit_code)
+    sys.exit(_main())
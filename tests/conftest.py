@@ -1,4 +1,5 @@
 import os
+import subprocess
 import sys
 
 import pytest
@@ -40,3 +41,27 @@ def github_output_files(tmp_path):
     env_file.touch()
     output_file.touch()
     return str(env_file), str(output_file)
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """Create a throwaway git repository with a few commits and chdir into it."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    monkeypatch.setenv("GIT_AUTHOR_NAME", "Test Author")
+    monkeypatch.setenv("GIT_AUTHOR_EMAIL", "author@example.com")
+    monkeypatch.setenv("GIT_COMMITTER_NAME", "Test Author")
+    monkeypatch.setenv("GIT_COMMITTER_EMAIL", "author@example.com")
+    _git(repo, "init", "-q")
+    for message in (
+        "feat: add login\n\nenv:staging",
+        "fix: handle timeout\n\nenv:prod",
+        "chore: bump deps",
+    ):
+        _git(repo, "commit", "-q", "--allow-empty", "-m", message)
+    monkeypatch.chdir(repo)
+    return repo
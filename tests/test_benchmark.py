@@ -0,0 +1,97 @@
+"""Smoke tests for benchmarks/bench_pipeline.py."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import bench_commit_graph  # noqa: E402
+import bench_pipeline  # noqa: E402
+import bench_results  # noqa: E402
+
+
+class TestGenerateRepo:
+    def test_creates_requested_commit_count(self, tmp_path):
+        repo = str(tmp_path / "repo")
+        bench_pipeline.generate_repo(repo, 25, 80, 1.0)
+        count = subprocess.run(
+            ["git", "-C", repo, "rev-list", "--count", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        assert count == "25"
+
+
+class TestMain:
+    @pytest.fixture
+    def report(self, tmp_path, capsys):
+        output = tmp_path / "bench.json"
+        bench_pipeline.main(
+            [
+                "--commits",
+                "30",
+                "--marker-rate",
+                "1.0",
+                "--repo-dir",
+                str(tmp_path / "repos"),
+                "--json",
+                str(output),
+            ]
+        )
+        return json.loads(output.read_text())
+
+    def test_reports_every_stage(self, report):
+        (result,) = report["results"]
+        assert result["commits"] == 30
+        assert result["match_count"] > 0
+        assert set(result["stages"]) == set(bench_pipeline.STAGES)
+        for data in result["stages"].values():
+            assert data["seconds"] >= 0
+            assert data["peak_rss_kb"] > 0
+
+    def test_records_settings(self, report):
+        assert report["settings"]["extract_pattern"] == r"env:(\w+)"
+        assert "python" in report and "git" in report
+
+
+class TestCommitGraphBenchmark:
+    def test_reports_every_walk(self, tmp_path):
+        output = tmp_path / "graph.json"
+        repos = tmp_path / "repos"
+        bench_commit_graph.main(
+            [
+                "--commits",
+                "30",
+                "--runs",
+                "1",
+                "--repo-dir",
+                str(repos),
+                "--json",
+                str(output),
+            ]
+        )
+        (result,) = json.loads(output.read_text())["results"]
+        assert set(result["walks"]) == set(bench_commit_graph.WALKS)
+        assert result["walks"]["git_rev_list_count"]["result"] == 27
+        assert result["walks"]["native_revisions"]["result"] == 27
+        for walk in result["walks"].values():
+            assert walk["without_graph"] >= 0 and walk["with_graph"] >= 0
+        info = repos / "repo-30-120-0.05" / ".git" / "objects" / "info"
+        assert not (info / "commit-graph").exists()
+
+
+class TestBenchResults:
+    def test_paths_agree(self, tmp_path):
+        output = tmp_path / "results.json"
+        bench_results.main(["--megabytes", "1", "--runs", "1", "--json", str(output)])
+        (result,) = json.loads(output.read_text())["results"]
+        joined, fused = result["paths"]["joined"], result["paths"]["fused"]
+        assert result["values"] > 1000
+        assert joined["result"] == fused["result"]
+        assert joined["result"][0] == result["values"]
+        assert fused["peak_kb"] < joined["peak_kb"]
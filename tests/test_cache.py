@@ -0,0 +1,104 @@
+import sqlite3
+import time
+
+from app.cache import CACHE_FILENAME, ExtractionCache, open_cache, pattern_key
+from app.extractor import _run_extract_pattern
+from app.git_client import CommitRecord
+
+
+def _count_rows(directory):
+    conn = sqlite3.connect(str(directory / CACHE_FILENAME))
+    try:
+        return conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestPatternKey:
+    def test_stable_and_distinct(self):
+        assert pattern_key("env:(\\w+)") == pattern_key("env:(\\w+)")
+        assert pattern_key("a") != pattern_key("b")
+        assert pattern_key("a", pretty=True) != pattern_key("a", pretty=False)
+
+
+class TestExtractionCache:
+    def test_round_trip(self, tmp_path):
+        cache = ExtractionCache(str(tmp_path))
+        assert cache.get("abc", "k") is None
+        cache.put("abc", "k", ["prod", "staging"])
+        cache.close()
+
+        cache = ExtractionCache(str(tmp_path))
+        assert cache.get("abc", "k") == ["prod", "staging"]
+        assert cache.get("abc", "other") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.close()
+
+    def test_evicts_by_age(self, tmp_path, monkeypatch):
+        cache = ExtractionCache(str(tmp_path), max_age_days=1)
+        cache.put("old", "k", [])
+        cache.close()
+
+        real_time = time.time
+        monkeypatch.setattr("app.cache.time.time", lambda: real_time() + 2 * 86400)
+        cache = ExtractionCache(str(tmp_path), max_age_days=1)
+        cache.put("new", "k", [])
+        cache.close()
+
+        assert _count_rows(tmp_path) == 1
+
+    def test_evicts_least_recently_used_past_max_entries(self, tmp_path):
+        cache = ExtractionCache(str(tmp_path), max_entries=2)
+        for sha in ("a", "b", "c"):
+            cache.put(sha, "k", [sha])
+        cache.close()
+        assert _count_rows(tmp_path) == 2
+
+    def test_open_cache_disabled_without_directory(self):
+        assert open_cache("", 30, 100) is None
+
+    def test_open_cache_unusable_directory(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("not a directory")
+        assert open_cache(str(blocker), 30, 100) is None
+
+    def test_open_cache_corrupt_database(self, tmp_path):
+        (tmp_path / CACHE_FILENAME).write_text("not a database" * 100)
+        assert open_cache(str(tmp_path), 30, 100) is None
+
+    def test_database_error_disables_cache(self, tmp_path):
+        cache = ExtractionCache(str(tmp_path))
+        cache.put("abc", "k", ["prod"])
+        cache._conn.execute("DROP TABLE extractions")
+
+        assert cache.get("abc", "k") is None
+        assert cache.disabled
+        cache.put("def", "k", ["staging"])
+        assert cache.get("def", "k") is None
+        assert (cache.hits, cache.misses) == (0, 2)
+        cache.close()
+
+
+class TestCachedExtraction:
+    COMMITS = [
+        CommitRecord("c2", "Dev", 2, "deploy\n\nenv:prod"),
+        CommitRecord("c1", "Dev", 1, "deploy\n\nenv:staging"),
+    ]
+
+    def test_second_run_served_from_cache(self, tmp_path, monkeypatch):
+        cache = ExtractionCache(str(tmp_path))
+        first = _run_extract_pattern(self.COMMITS, r"env:(\w+)", cache=cache)
+        cache.close()
+
+        # Cached commits must not be rendered or scanned again.
+        monkeypatch.setattr(CommitRecord, "text", property(lambda self: 1 / 0))
+        cache = ExtractionCache(str(tmp_path))
+        sources = {}
+        second = _run_extract_pattern(
+            self.COMMITS, r"env:(\w+)", sources=sources, cache=cache
+        )
+        cache.close()
+
+        assert first.values == second.values == ["prod", "staging"]
+        assert cache.hits == 2
+        assert sources == {"prod": ["c2"], "staging": ["c1"]}
@@ -1,6 +1,10 @@
+import os
+
 import pytest
 
-from app.config import AppConfig, VALID_OUTPUT_FORMATS
+from app.config import AppConfig
+from app import formatter
+from app.formatter import output_formats
 
 
 class TestAppConfig:
@@ -87,7 +91,13 @@ class TestAppConfig:
         assert config.commit_range == "HEAD~5..HEAD"
 
     def test_valid_output_formats(self):
-        assert VALID_OUTPUT_FORMATS == ("text", "json", "csv")
+        assert output_formats() == ("text", "json", "csv", "ndjson", "binary")
+
+    def test_validate_registered_output_format(self, clean_env, monkeypatch):
+        tsv = formatter.OutputFormat(lambda value: value.replace("\n", "\t"))
+        monkeypatch.setitem(formatter._FORMATS, "tsv", tsv)
+        monkeypatch.setenv("INPUT_OUTPUT_FORMAT", "TSV")
+        AppConfig.from_env().validate()
 
     def test_validate_dangerous_extract_command(self, clean_env, monkeypatch):
         dangerous_commands = [
@@ -119,3 +129,182 @@ class TestAppConfig:
             monkeypatch.setenv("INPUT_EXTRACT_COMMAND", cmd)
             config = AppConfig.from_env()
             config.validate()  # should not raise
+
+    def test_from_env_cache_settings(self, clean_env, monkeypatch):
+        monkeypatch.setenv("INPUT_CACHE_DIR", "/tmp/extract-cache")
+        monkeypatch.setenv("INPUT_CACHE_MAX_AGE_DAYS", "7")
+        monkeypatch.setenv("INPUT_CACHE_MAX_ENTRIES", "500")
+        config = AppConfig.from_env()
+        assert config.cache_dir == "/tmp/extract-cache"
+        assert config.cache_max_age_days == 7
+        assert config.cache_max_entries == 500
+
+    def test_from_env_trace_memory(self, clean_env, monkeypatch):
+        assert AppConfig.from_env().trace_memory is False
+        monkeypatch.setenv("INPUT_TRACE_MEMORY", "true")
+        assert AppConfig.from_env().trace_memory is True
+
+    def test_from_env_workers(self, clean_env, monkeypatch):
+        assert AppConfig.from_env().workers == 1
+        monkeypatch.setenv("INPUT_WORKERS", "4")
+        assert AppConfig.from_env().workers == 4
+        monkeypatch.setenv("INPUT_WORKERS", "0")
+        assert AppConfig.from_env().workers == (os.cpu_count() or 1)
+        monkeypatch.setenv("INPUT_WORKERS", "-1")
+        with pytest.raises(ValueError, match="workers must be"):
+            AppConfig.from_env().validate()
+
+    def test_from_env_native_reader(self, clean_env, monkeypatch):
+        assert AppConfig.from_env().native_reader is False
+        monkeypatch.setenv("INPUT_NATIVE_READER", "true")
+        assert AppConfig.from_env().native_reader is True
+
+    def test_from_env_commit_graph(self, clean_env, monkeypatch):
+        assert AppConfig.from_env().commit_graph is False
+        monkeypatch.setenv("INPUT_COMMIT_GRAPH", "true")
+        assert AppConfig.from_env().commit_graph is True
+
+    def test_from_env_output_file(self, clean_env, monkeypatch):
+        config = AppConfig.from_env()
+        assert (config.output_file_threshold, config.output_file_compress) == (0, False)
+        monkeypatch.setenv("INPUT_OUTPUT_FILE_THRESHOLD", "1048576")
+        monkeypatch.setenv("INPUT_OUTPUT_FILE_COMPRESS", "true")
+        config = AppConfig.from_env()
+        assert (config.output_file_threshold, config.output_file_compress) == (
+            1048576,
+            True,
+        )
+        monkeypatch.setenv("INPUT_OUTPUT_FILE_THRESHOLD", "-1")
+        with pytest.raises(ValueError, match="output_file_threshold must be"):
+            AppConfig.from_env().validate()
+
+    def test_from_env_deepen_shallow(self, clean_env, monkeypatch):
+        assert AppConfig.from_env().deepen_shallow is False
+        monkeypatch.setenv("INPUT_DEEPEN_SHALLOW", "true")
+        assert AppConfig.from_env().deepen_shallow is True
+
+    def test_from_env_dedup(self, clean_env, monkeypatch):
+        config = AppConfig.from_env()
+        assert (config.dedup, config.top_n) == ("sorted", 0)
+        monkeypatch.setenv("INPUT_DEDUP", "First-Seen")
+        monkeypatch.setenv("INPUT_TOP_N", "5")
+        config = AppConfig.from_env()
+        assert (config.dedup, config.top_n) == ("first-seen", 5)
+        config.validate()
+
+    @pytest.mark.parametrize(
+        "env, message",
+        [
+            ({"INPUT_DEDUP": "random"}, "Invalid dedup"),
+            ({"INPUT_TOP_N": "-1"}, "top_n must be"),
+            ({"INPUT_DEDUP": "none", "INPUT_TOP_N": "3"}, "top_n requires"),
+            ({"INPUT_STATE_FILE": "s.json", "INPUT_DEDUP": "counts"}, "state_file"),
+            ({"INPUT_STATE_FILE": "s.json", "INPUT_TOP_N": "3"}, "state_file"),
+        ],
+    )
+    def test_validate_dedup(self, clean_env, monkeypatch, env, message):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        with pytest.raises(ValueError, match=message):
+            AppConfig.from_env().validate()
+
+    def test_validate_max_matches(self, clean_env, monkeypatch):
+        monkeypatch.setenv("INPUT_MAX_MATCHES", "1")
+        with pytest.raises(ValueError, match="max_matches requires"):
+            AppConfig.from_env().validate()
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        config = AppConfig.from_env()
+        assert config.max_matches == 1
+        config.validate()
+        monkeypatch.setenv("INPUT_DEDUP", "counts")
+        with pytest.raises(ValueError, match="Cannot combine max_matches"):
+            AppConfig.from_env().validate()
+        monkeypatch.setenv("INPUT_MAX_MATCHES", "-1")
+        with pytest.raises(ValueError, match="max_matches must be"):
+            AppConfig.from_env().validate()
+
+    def test_from_env_commit_ranges(self, clean_env, monkeypatch):
+        assert AppConfig.from_env().commit_ranges == ()
+        monkeypatch.setenv(
+            "INPUT_COMMIT_RANGES", "svcA-v1..svcA-v2\n\n# comment\n  v3..  \nmain\n"
+        )
+        ranges = AppConfig.from_env().commit_ranges
+        assert ranges == ("svcA-v1..svcA-v2", "v3..", "main")
+
+    @pytest.mark.parametrize(
+        "ranges, message",
+        [
+            ("v1...v2", "Symmetric difference"),
+            ("v1..--output=x", "Invalid commit_ranges"),
+            ("v1..v2\nv1..v2", "Duplicate commit_ranges"),
+        ],
+    )
+    def test_from_env_invalid_commit_ranges(
+        self, clean_env, monkeypatch, ranges, message
+    ):
+        monkeypatch.setenv("INPUT_COMMIT_RANGES", ranges)
+        with pytest.raises(ValueError, match=message):
+            AppConfig.from_env()
+
+    def test_validate_commit_ranges(self, clean_env, monkeypatch):
+        monkeypatch.setenv("INPUT_COMMIT_RANGES", "v1..v2")
+        with pytest.raises(ValueError, match="commit_ranges requires"):
+            AppConfig.from_env().validate()
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        AppConfig.from_env().validate()
+        monkeypatch.setenv("INPUT_COMMIT_RANGE", "v1..v2")
+        with pytest.raises(ValueError, match="Cannot combine commit_ranges"):
+            AppConfig.from_env().validate()
+
+    def test_validate_state_file_requires_extraction(self, clean_env, monkeypatch):
+        monkeypatch.setenv("INPUT_STATE_FILE", "state.json")
+        with pytest.raises(ValueError, match="state_file requires"):
+            AppConfig.from_env().validate()
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        AppConfig.from_env().validate()
+        monkeypatch.setenv("INPUT_COMMIT_RANGE", "v1..v2")
+        with pytest.raises(ValueError, match="Cannot combine state_file"):
+            AppConfig.from_env().validate()
+
+    def test_validate_cache_limits(self, clean_env, monkeypatch):
+        monkeypatch.setenv("INPUT_CACHE_MAX_ENTRIES", "0")
+        config = AppConfig.from_env()
+        with pytest.raises(ValueError, match="cache_max_entries must be greater than 0"):
+            config.validate()
+
+    def test_from_env_extract_patterns(self, clean_env, monkeypatch):
+        monkeypatch.setenv(
+            "INPUT_EXTRACT_PATTERNS",
+            "# deploy markers\nENV=env:(\\w+)\n\nTICKET = [A-Z]+-\\d+\nEQ=a=b\n",
+        )
+        config = AppConfig.from_env()
+        assert config.extract_patterns == {
+            "ENV": r"env:(\w+)",
+            "TICKET": r"[A-Z]+-\d+",
+            "EQ": "a=b",
+        }
+
+    def test_from_env_extract_patterns_invalid(self, clean_env, monkeypatch):
+        for value, message in [
+            ("no separator", "Expected NAME=regex"),
+            ("1BAD=x", "Invalid extract_patterns output name"),
+            ("match_count=x", "reserved"),
+            ("timings=x", "reserved"),
+            ("A=x\nA=y", "Duplicate"),
+        ]:
+            monkeypatch.setenv("INPUT_EXTRACT_PATTERNS", value)
+            with pytest.raises(ValueError, match=message):
+                AppConfig.from_env()
+
+    def test_validate_extract_patterns_exclusive(self, clean_env, monkeypatch):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERNS", "ENV=env:(\\w+)")
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", "feat")
+        config = AppConfig.from_env()
+        with pytest.raises(ValueError, match="Cannot combine extract_patterns"):
+            config.validate()
+
+    def test_validate_builtin_command_skips_blocklist(self, clean_env, monkeypatch):
+        # Runs in-process, so the words that would be blocked for bash are data.
+        monkeypatch.setenv("INPUT_EXTRACT_COMMAND", "grep -oE 'rm|curl'")
+        AppConfig.from_env().validate()  # should not raise
@@ -1,86 +1,692 @@
+import re
+import signal
+import subprocess
+import time
+
 import pytest
 
-from app.extractor import extract_info, _run_extract_command, _run_extract_pattern
-from app.logger import ActionError
+from app import extractor
+from app.cache import ExtractionCache
+from app.extractor import (
+    Dedup,
+    NamedPatterns,
+    RangeResults,
+    backtracking_risks,
+    compile_pattern,
+    extract_info,
+    extract_named_info,
+    git_log_filter,
+    merge_results,
+    pattern_cache_info,
+    _run_extract_command,
+    _run_extract_pattern,
+)
+from app.formatter import Matches
+from app.git_client import CommitRecord, LogFilter, stream_commits
+from app.logger import ActionError, set_debug
 
 
 class TestRunExtractCommand:
     def test_basic_grep(self):
         result = _run_extract_command("feat: login\nfix: bug\nfeat: signup", "grep -oE 'feat'", 10)
-        assert "feat" in result
+        assert "feat" in result.values
 
     def test_no_match_returns_empty(self):
         result = _run_extract_command("hello world", "grep -oE 'nonexistent'", 10)
-        assert result == ""
+        assert (result.values, result.count) == ([], 0)
 
     def test_deduplicates_results(self):
         result = _run_extract_command("feat\nfeat\nfeat", "grep -oE 'feat'", 10)
-        assert result == "feat"
+        assert result.values == ["feat"]
 
     def test_sorts_results(self):
         result = _run_extract_command("cherry\napple\nbanana", "cat", 10)
-        assert result == "apple\nbanana\ncherry"
+        assert result.values == ["apple", "banana", "cherry"]
 
     def test_timeout(self):
         with pytest.raises(ActionError):
             _run_extract_command("test", "sleep 10", 1)
 
+    def test_builtin_command_does_not_spawn(self, monkeypatch):
+        def no_popen(*args, **kwargs):
+            raise AssertionError("spawned a subprocess")
+
+        monkeypatch.setattr("app.extractor.subprocess.Popen", no_popen)
+        result = _run_extract_command("env:prod\nenv:dev", "grep -oE 'env:[a-z]+'", 10)
+        assert result.values == ["env:dev", "env:prod"]
+
+    def test_unsupported_command_falls_back_to_bash(self):
+        assert _run_extract_command("a\nb", "echo $((1 + 2))", 10).values == ["3"]
+
+    @pytest.mark.parametrize(
+        "command",
+        [
+            "cut -c1-5",
+            "cut -c1-5 | sort",
+            "grep -o '[[:alpha:]]*'",
+            "sed 's/[[:alpha:]]*://'",
+            "tr -d 'é'",
+            "tr 'a-z' 'A-Z'",
+        ],
+    )
+    def test_utf8_subject_matches_bash(self, command):
+        commits = [
+            CommitRecord("c2", "Dev", 2, "café: déploiement\n\nenv:prod"),
+            CommitRecord("c1", "Dev", 1, "fix: timeout"),
+        ]
+        expected = extractor._run_shell_command(commits, command, 10)
+        assert _run_extract_command(commits, command, 10) == expected
+
+    def test_builtin_command_timeout(self):
+        def endless():
+            while True:
+                yield "line"
+
+        with pytest.raises(ActionError, match="timed out"):
+            _run_extract_command(endless(), "grep -c line", 0)
+
+
+class TestCommandInput:
+    """extract_command reads exactly what `git log` printed."""
+
+    @staticmethod
+    def _git_log(command, pretty):
+        log = "git log -n 10" + (" --pretty=%B" if pretty else "")
+        stdout = subprocess.run(
+            f"{log} | {command}", shell=True, capture_output=True, text=True, check=True
+        ).stdout
+        return sorted({line for line in stdout.split("\n") if line.strip()})
+
+    @pytest.mark.parametrize("pretty", [False, True])
+    @pytest.mark.parametrize("command", ["tail -1", "wc -l", "tail -1 | rev"])
+    def test_matches_git_log(self, git_repo, pretty, command):
+        # --pretty=%B output ends in a blank line, so tail -1 finds nothing there.
+        expected = self._git_log(command, pretty)
+        commits = stream_commits(10, pretty, 10)
+        assert _run_extract_command(commits, command, 10).values == expected
+        commits = stream_commits(10, pretty, 10)
+        assert extractor._run_shell_command(commits, command, 10).values == expected
+
+    def test_parallel_batches_keep_separators(self, git_repo, monkeypatch):
+        monkeypatch.setattr(extractor, "PARALLEL_MIN_COMMITS", 1)
+        monkeypatch.setattr(extractor, "PARALLEL_BATCH_COMMITS", 1)
+        command = "sed 's/^$/blank/'"
+        result = _run_extract_command(stream_commits(10, False, 10), command, 10, 2)
+        assert result.values == self._git_log(command, False)
+
 
 class TestRunExtractPattern:
     def test_basic_pattern(self):
         result = _run_extract_pattern("feat: login\nfix: bug\nfeat: signup", r"feat")
-        assert result == "feat"
+        assert result.values == ["feat"]
 
     def test_no_match_returns_empty(self):
         result = _run_extract_pattern("hello world", r"nonexistent")
-        assert result == ""
+        assert (result.values, result.count) == ([], 0)
 
     def test_captures_groups(self):
         result = _run_extract_pattern("env:prod\nenv:staging\nenv:prod", r"env:(\w+)")
-        assert "prod" in result
-        assert "staging" in result
+        assert "prod" in result.values
+        assert "staging" in result.values
 
     def test_deduplicates_and_sorts(self):
         result = _run_extract_pattern("apple cherry apple banana cherry", r"\b(apple|banana|cherry)\b")
-        assert result == "apple\nbanana\ncherry"
+        assert result.values == ["apple", "banana", "cherry"]
 
     def test_invalid_regex(self):
         with pytest.raises(ActionError):
             _run_extract_pattern("test", r"[invalid")
 
 
+class TestDedup:
+    # Newest commit first, as git log yields them.
+    COMMITS = ["env:dev", "env:prod env:dev", "env:qa", "env:prod", "env:dev"]
+    PATTERN = r"env:(\w+)"
+
+    def extract(self, mode, top_n=0):
+        dedup = Dedup(mode, top_n)
+        return _run_extract_pattern(self.COMMITS, self.PATTERN, dedup=dedup).values
+
+    @pytest.mark.parametrize(
+        "mode, expected",
+        [
+            ("sorted", ["dev", "prod", "qa"]),
+            ("first-seen", ["dev", "prod", "qa"]),
+            ("last-seen", ["qa", "prod", "dev"]),
+            ("counts", ["3 dev", "2 prod", "1 qa"]),
+            ("none", ["dev", "prod", "dev", "qa", "prod", "dev"]),
+        ],
+    )
+    def test_modes(self, mode, expected):
+        assert self.extract(mode) == expected
+
+    def test_first_seen_keeps_commit_order(self):
+        result = _run_extract_pattern(
+            ["env:qa", "env:dev", "env:qa"], self.PATTERN, dedup=Dedup("first-seen")
+        )
+        assert result.values == ["qa", "dev"]
+
+    @pytest.mark.parametrize(
+        "mode, expected",
+        [
+            ("sorted", ["dev", "prod"]),
+            ("first-seen", ["dev", "prod"]),
+            ("last-seen", ["prod", "dev"]),
+            ("counts", ["3 dev", "2 prod"]),
+        ],
+    )
+    def test_top_n(self, mode, expected):
+        assert self.extract(mode, top_n=2) == expected
+
+    def test_top_n_ties_keep_first_seen_order(self):
+        commits = ["env:b", "env:a", "env:c", "env:a"]
+        result = _run_extract_pattern(commits, self.PATTERN, dedup=Dedup("counts", 2))
+        assert result.values == ["2 a", "1 b"]
+
+    def test_command_counts_are_not_sharded(self, monkeypatch):
+        monkeypatch.setattr(extractor, "PARALLEL_MIN_COMMITS", 1)
+        monkeypatch.setattr(extractor, "_parallel_map", None)
+        result = _run_extract_command(
+            iter(["a", "b", "a"]), "grep -oE '[a-z]'", 10, 4, Dedup("counts")
+        )
+        assert result.values == ["2 a", "1 b"]
+
+    def test_shell_command_modes(self):
+        result = _run_extract_command("b\na\nb", "rev | rev", 10, dedup=Dedup("last-seen"))
+        assert result.values == ["a", "b"]
+
+    def test_merge_puts_new_values_first(self):
+        current = Matches(["qa", "dev"])
+        assert merge_results("dev\nprod", current, Dedup("first-seen")).values == [
+            "qa", "dev", "prod"
+        ]
+        assert merge_results("dev\nprod", current, Dedup("last-seen")).values == [
+            "qa", "dev", "prod"
+        ]
+        assert merge_results("dev\nprod", current).values == ["dev", "prod", "qa"]
+
+    def test_range_results(self):
+        commits = iter(TestCommitRecordInput.COMMITS)
+        ranges = RangeResults(TestRangeResults.MEMBERS, Dedup("counts"))
+        result = extract_info(
+            commits, None, self.PATTERN, False, 10, ranges=ranges, dedup=Dedup("counts")
+        )
+        assert result.values == ["3 prod", "1 staging"]
+        assert ranges.results()["v0..v1"] == {"": Matches(["2 prod"])}
+        assert ranges.results()["v1..v3"] == {"": Matches(["1 prod", "1 staging"])}
+
+
+class TestMaxMatches:
+    COMMITS = TestDedup.COMMITS
+    PATTERN = TestDedup.PATTERN
+
+    def stream(self, commits, consumed):
+        """Yield commits while recording how many were read and whether closed."""
+        try:
+            for commit in commits:
+                consumed.append(commit)
+                yield commit
+        finally:
+            consumed.append("closed")
+
+    @pytest.mark.parametrize(
+        "mode, expected",
+        [
+            ("sorted", ["dev", "prod"]),
+            ("first-seen", ["dev", "prod"]),
+            ("last-seen", ["prod", "dev"]),
+            ("none", ["dev", "prod"]),
+        ],
+    )
+    def test_stops_after_max_matches(self, mode, expected):
+        consumed = []
+        result = _run_extract_pattern(
+            self.stream(self.COMMITS, consumed),
+            self.PATTERN,
+            dedup=Dedup(mode, max_matches=2),
+        )
+        assert result.values == expected
+        assert consumed == self.COMMITS[:2] + ["closed"]
+
+    def test_values_past_the_limit_are_dropped(self):
+        commits = [CommitRecord("c1", "", 0, "m\n\nenv:qa env:dev env:prod")]
+        sources = {}
+        result = _run_extract_pattern(
+            commits, self.PATTERN, sources, dedup=Dedup("sorted", max_matches=2)
+        )
+        assert result.values == ["dev", "qa"]
+        assert sources == {"qa": ["c1"], "dev": ["c1"]}
+
+    def test_window_shorter_than_limit(self):
+        consumed = []
+        dedup = Dedup(max_matches=10)
+        result = _run_extract_pattern(
+            self.stream(self.COMMITS, consumed), self.PATTERN, dedup=dedup
+        )
+        assert result.values == ["dev", "prod", "qa"]
+        assert consumed[-1] == "closed"
+        assert len(consumed) == len(self.COMMITS) + 1
+
+    def test_named_patterns_stop_when_every_name_is_full(self):
+        consumed = []
+        commits = ["env:dev", "env:prod OPS-1", "OPS-2", "env:qa"]
+        results = extract_named_info(
+            self.stream(commits, consumed),
+            {"ENV": self.PATTERN, "TICKET": r"OPS-\d+"},
+            False,
+            dedup=Dedup("first-seen", max_matches=1),
+        )
+        assert results == {"ENV": Matches(["dev"]), "TICKET": Matches(["OPS-1"])}
+        assert consumed == commits[:2] + ["closed"]
+
+
+class TestPatternCache:
+    @pytest.fixture(autouse=True)
+    def empty_cache(self, monkeypatch):
+        monkeypatch.setattr(extractor, "_patterns", extractor.OrderedDict())
+        monkeypatch.setattr(extractor, "_pattern_stats", {"hits": 0, "misses": 0})
+
+    def test_hits_and_misses(self):
+        assert compile_pattern(r"env:(\w+)") is compile_pattern(r"env:(\w+)")
+        compile_pattern(r"OPS-\d+")
+        assert pattern_cache_info() == (1, 2, 2)
+
+    def test_least_recently_used_is_evicted(self, monkeypatch):
+        monkeypatch.setattr(extractor, "PATTERN_CACHE_SIZE", 2)
+        for pattern in ("a", "b", "a", "c"):
+            compile_pattern(pattern)
+        assert list(extractor._patterns) == ["a", "c"]
+
+    def test_invalid_pattern_is_not_cached(self):
+        with pytest.raises(re.error):
+            compile_pattern(r"[invalid")
+        assert pattern_cache_info() == (0, 0, 0)
+
+    def test_counters_in_debug_output(self, capsys):
+        set_debug(True)
+        try:
+            _run_extract_pattern("env:prod", r"env:(\w+)")
+            _run_extract_pattern("env:qa", r"env:(\w+)")
+        finally:
+            set_debug(False)
+        out = capsys.readouterr().out
+        assert "Pattern cache: 0 hits, 1 misses, 1 cached" in out
+        assert "Pattern cache: 1 hits, 1 misses, 1 cached" in out
+
+    def test_risky_pattern_warns_once(self, capsys):
+        compile_pattern(r"(\w+\s?)*$")
+        compile_pattern(r"(\w+\s?)*$")
+        assert capsys.readouterr().out.count("Warning: pattern") == 1
+
+
+class TestBacktrackingRisks:
+    @pytest.mark.parametrize(
+        "pattern",
+        [r"(a+)+$", r"(\w+\s?)*$", r"^(\s*\w+)+$", r"(a*)*", r"(x+x+)+y", r"(a|aa)*b"],
+    )
+    def test_flagged(self, pattern):
+        assert backtracking_risks(pattern)
+
+    @pytest.mark.parametrize(
+        "pattern",
+        [
+            r"env:(\w+)",
+            r"[A-Z]+-\d+",
+            r"(feat|fix)*",  # alternatives diverge after the first character
+            r"(?:ab+c)*",  # no iteration starts with what the inner repeat eats
+            r"(?>a+)+",  # atomic groups never backtrack
+            r"(a++)+",
+            r"(",  # invalid patterns are reported by compilation instead
+        ],
+    )
+    def test_not_flagged(self, pattern):
+        assert backtracking_risks(pattern) == []
+
+
+class TestPatternTimeout:
+    # Backtracks for hours on a run of word characters that never matches.
+    RUNAWAY = r"(\w+\s?)*$"
+    TEXT = "a" * 40 + "!"
+
+    def test_runaway_pattern_fails_at_the_timeout(self):
+        start = time.monotonic()
+        with pytest.raises(ActionError, match="timed out after 1 seconds"):
+            _run_extract_pattern(self.TEXT, self.RUNAWAY, timeout=1)
+        assert time.monotonic() - start < 5
+        assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+    def test_named_patterns(self):
+        with pytest.raises(ActionError, match="timed out"):
+            extract_named_info(
+                self.TEXT, {"ENV": r"env:(\w+)", "BAD": self.RUNAWAY}, False, timeout=1
+            )
+
+    def test_parallel_workers_are_stopped(self, monkeypatch):
+        monkeypatch.setattr(extractor, "PARALLEL_MIN_COMMITS", 2)
+        start = time.monotonic()
+        with pytest.raises(ActionError, match="timed out"):
+            _run_extract_pattern([self.TEXT] * 4, self.RUNAWAY, workers=2, timeout=2)
+        assert time.monotonic() - start < 15
+
+    def test_reading_commits_does_not_count(self):
+        def slow_log():
+            for n in range(3):
+                time.sleep(0.6)
+                yield f"env:e{n}"
+
+        result = _run_extract_pattern(slow_log(), r"env:(\w+)", timeout=1)
+        assert result.values == ["e0", "e1", "e2"]
+        assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+    def test_fast_pattern_within_timeout(self):
+        assert _run_extract_pattern("env:prod", r"env:(\w+)", timeout=1).values == ["prod"]
+
+
 class TestExtractInfo:
     def test_no_command_returns_messages(self):
-        result, count = extract_info("commit messages", None, None, False, 10)
-        assert result == "commit messages"
-        assert count == 1
+        result = extract_info("commit messages", None, None, False, 10)
+        assert str(result) == "commit messages"
+        assert result.count == 1
 
     def test_empty_command_returns_messages(self):
-        result, count = extract_info("line1\nline2", None, None, False, 10)
-        assert result == "line1\nline2"
-        assert count == 2
+        result = extract_info("line1\nline2", None, None, False, 10)
+        assert str(result) == "line1\nline2"
+        assert result.count == 2
 
     def test_with_extract_command(self):
-        result, count = extract_info("feat: login\nfix: bug", "grep -oE 'feat|fix'", None, False, 10)
-        assert "feat" in result
-        assert "fix" in result
-        assert count == 2
+        result = extract_info("feat: login\nfix: bug", "grep -oE 'feat|fix'", None, False, 10)
+        assert "feat" in result.values
+        assert "fix" in result.values
+        assert result.count == 2
 
     def test_with_extract_pattern(self):
-        result, count = extract_info("feat: login\nfix: bug", None, r"(feat|fix)", False, 10)
-        assert "feat" in result
-        assert "fix" in result
-        assert count == 2
+        result = extract_info("feat: login\nfix: bug", None, r"(feat|fix)", False, 10)
+        assert "feat" in result.values
+        assert "fix" in result.values
+        assert result.count == 2
 
     def test_fail_on_empty_true_with_pattern(self):
         with pytest.raises(ActionError):
             extract_info("hello", None, r"nonexistent", True, 10)
 
     def test_fail_on_empty_false_returns_empty(self):
-        result, count = extract_info("hello", "grep -oE 'nonexistent'", None, False, 10)
-        assert result == ""
-        assert count == 0
+        result = extract_info("hello", "grep -oE 'nonexistent'", None, False, 10)
+        assert str(result) == ""
+        assert result.count == 0
 
     def test_match_count_multiple(self):
-        result, count = extract_info("feat: a\nfeat: b\nfix: c", None, r"(feat|fix)", False, 10)
-        assert count == 2
+        result = extract_info("feat: a\nfeat: b\nfix: c", None, r"(feat|fix)", False, 10)
+        assert result.count == 2
+
+
+class TestStreamingInput:
+    def test_pattern_over_commit_iterable(self):
+        commits = iter(["env:prod\n", "env:staging\n", "env:prod\n"])
+        assert _run_extract_pattern(commits, r"env:(\w+)").values == ["prod", "staging"]
+
+    def test_command_over_commit_iterable(self):
+        commits = iter(["feat: a\n", "fix: b\n"])
+        assert _run_extract_command(commits, "grep -oE 'feat|fix'", 10).values == [
+            "feat",
+            "fix",
+        ]
+
+    def test_command_exiting_early_closes_producer(self):
+        closed = []
+
+        def produce():
+            try:
+                for i in range(100000):
+                    yield f"line {i}\n"
+            finally:
+                closed.append(True)
+
+        assert _run_extract_command(produce(), "head -1", 10).values == ["line 0"]
+        assert closed == [True]
+
+    def test_producer_error_is_raised(self):
+        def produce():
+            yield "feat\n"
+            raise ActionError("git failed")
+
+        with pytest.raises(ActionError, match="git failed"):
+            _run_extract_command(produce(), "cat", 10)
+
+    def test_no_extract_joins_commits(self):
+        result = extract_info(iter(["a\n", "b\n"]), None, None, False, 10)
+        assert str(result) == "a\n\nb\n"
+        assert result.count == 2
+
+
+class TestCommitRecordInput:
+    COMMITS = [
+        CommitRecord("c3", "Dev", 3, "deploy\n\nenv:prod"),
+        CommitRecord("c2", "Dev", 2, "deploy\n\nenv:staging"),
+        CommitRecord("c1", "Dev", 1, "deploy\n\nenv:prod env:prod"),
+    ]
+
+    def test_sources_map_values_to_shas(self):
+        sources = {}
+        result = extract_info(
+            iter(self.COMMITS), None, r"env:(\w+)", False, 10, sources
+        )
+        assert str(result) == "prod\nstaging"
+        assert result.count == 2
+        assert sources == {"prod": ["c3", "c1"], "staging": ["c2"]}
+
+    def test_command_receives_record_text(self):
+        result = extract_info(iter(self.COMMITS), "grep -oE 'env:\\w+'", None, False, 10)
+        assert str(result) == "env:prod\nenv:staging"
+
+    def test_no_extract_renders_messages(self):
+        result = extract_info(self.COMMITS[:1], None, None, False, 10)
+        assert str(result) == "deploy\n\nenv:prod"
+        assert result.count == 2
+
+
+class TestRangeResults:
+    COMMITS = TestCommitRecordInput.COMMITS
+    MEMBERS = {"v2..v3": {"c3"}, "v1..v3": {"c3", "c2"}, "v0..v1": {"c1"}}
+
+    def test_pattern_results_per_range(self):
+        ranges = RangeResults(self.MEMBERS)
+        result = extract_info(
+            iter(self.COMMITS), None, r"env:(\w+)", False, 10, ranges=ranges
+        )
+        assert result.values == ["prod", "staging"]
+        assert ranges.results() == {
+            "v2..v3": {"": Matches(["prod"])},
+            "v1..v3": {"": Matches(["prod", "staging"])},
+            "v0..v1": {"": Matches(["prod"])},
+        }
+
+    def test_named_results_per_range(self):
+        ranges = RangeResults({"new": {"c2"}, "empty": set()})
+        patterns = {"ENV": r"env:(\w+)", "TICKET": r"OPS-\d+"}
+        extract_named_info(TestExtractNamedInfo.COMMITS, patterns, False, ranges=ranges)
+        assert ranges.results(patterns) == {
+            "new": {"ENV": Matches(["prod"]), "TICKET": Matches(["OPS-1"])},
+            "empty": {"ENV": Matches([]), "TICKET": Matches([])},
+        }
+
+
+class TestNamedPatterns:
+    def test_single_combined_scan(self):
+        named = NamedPatterns({"ENV": r"env:(\w+)", "TICKET": r"[A-Z]+-\d+"})
+        assert named._combined is not None
+        found = named.findall("env:prod fixes OPS-12 and env:dev, OPS-7")
+        assert found == {"ENV": ["prod", "dev"], "TICKET": ["OPS-12", "OPS-7"]}
+
+    def test_missing_pattern_yields_empty_list(self):
+        named = NamedPatterns({"ENV": r"env:(\w+)", "BUMP": r"bump:(major|minor)"})
+        assert named.findall("env:prod") == {"ENV": ["prod"], "BUMP": []}
+
+    def test_backreference_falls_back_to_separate_scans(self):
+        named = NamedPatterns({"DOUBLED": r"(\w)\1", "ENV": r"env:(\w+)"})
+        assert named._combined is None
+        assert named.findall("env:prod aa") == {"DOUBLED": ["a"], "ENV": ["prod"]}
+
+    def test_global_flag_falls_back_to_separate_scans(self):
+        named = NamedPatterns({"ENV": r"env:(\w+)", "FIX": r"(?i)fix"})
+        assert named._combined is None
+        assert named.findall("FIX env:prod") == {"ENV": ["prod"], "FIX": ["FIX"]}
+
+    def test_invalid_pattern_fails(self):
+        with pytest.raises(ActionError):
+            NamedPatterns({"BAD": r"[invalid"})
+
+
+class TestExtractNamedInfo:
+    COMMITS = [
+        CommitRecord("c2", "Dev", 2, "deploy env:prod\n\nRefs: OPS-1"),
+        CommitRecord("c1", "Dev", 1, "deploy env:dev\n\nRefs: OPS-2, OPS-1"),
+    ]
+
+    def test_results_per_name(self):
+        sources = {}
+        results = extract_named_info(
+            self.COMMITS,
+            {"ENV": r"env:(\w+)", "TICKET": r"OPS-\d+"},
+            False,
+            sources,
+        )
+        assert results == {
+            "ENV": Matches(["dev", "prod"]),
+            "TICKET": Matches(["OPS-1", "OPS-2"]),
+        }
+        assert [matches.count for matches in results.values()] == [2, 2]
+        assert sources["TICKET"]["OPS-1"] == ["c2", "c1"]
+
+    def test_sources_per_name(self):
+        # Both names match "prod"; each keeps only its own commits.
+        commits = [
+            CommitRecord("c2", "Dev", 2, "deploy\n\nenv:prod"),
+            CommitRecord("c1", "Dev", 1, "release\n\nrelease:prod"),
+        ]
+        sources = {}
+        extract_named_info(
+            commits, {"ENV": r"env:(\w+)", "RELEASE": r"release:(\w+)"}, False, sources
+        )
+        assert sources == {"ENV": {"prod": ["c2"]}, "RELEASE": {"prod": ["c1"]}}
+
+    def test_fail_on_empty_when_nothing_matched(self):
+        with pytest.raises(ActionError):
+            extract_named_info(self.COMMITS, {"X": r"nomatch"}, True)
+
+
+class TestParallelExtraction:
+    COMMITS = [
+        CommitRecord(f"c{n}", "Dev", n, f"deploy {n}\n\nenv:e{n % 7} OPS-{n % 5}")
+        for n in range(40)
+    ]
+
+    @pytest.fixture(autouse=True)
+    def small_batches(self, monkeypatch):
+        monkeypatch.setattr(extractor, "PARALLEL_MIN_COMMITS", 10)
+        monkeypatch.setattr(extractor, "PARALLEL_BATCH_COMMITS", 4)
+
+    def test_pattern_matches_serial_run(self, tmp_path):
+        serial_sources, parallel_sources = {}, {}
+        serial = extract_info(self.COMMITS, None, r"env:(\w+)", False, 10, serial_sources)
+        cache = ExtractionCache(str(tmp_path))
+        parallel = extract_info(
+            iter(self.COMMITS), None, r"env:(\w+)", False, 10, parallel_sources, cache, 2
+        )
+        assert parallel == serial
+        assert parallel_sources == serial_sources
+        assert len(cache._pending) == len(self.COMMITS)
+
+    def test_cache_hits_keep_commit_order(self, tmp_path):
+        cache = ExtractionCache(str(tmp_path))
+        extract_info(self.COMMITS[::2], None, r"env:(\w+)", False, 10, {}, cache)
+        cache.close()
+        cache = ExtractionCache(str(tmp_path))
+        sources = {}
+        extract_info(self.COMMITS, None, r"env:(\w+)", False, 10, sources, cache, 2)
+        assert cache.hits == len(self.COMMITS) // 2
+        assert sources["e0"] == ["c0", "c7", "c14", "c21", "c28", "c35"]
+
+    def test_named_patterns_match_serial_run(self):
+        patterns = {"ENV": r"env:(\w+)", "TICKET": r"OPS-\d+"}
+        serial = extract_named_info(self.COMMITS, patterns, False)
+        assert extract_named_info(self.COMMITS, patterns, False, workers=2) == serial
+
+    def test_shardable_command_matches_serial_run(self):
+        command = "grep -oE 'env:[a-z0-9]+' | sort -u"
+        serial = _run_extract_command(self.COMMITS, command, 10)
+        assert _run_extract_command(iter(self.COMMITS), command, 10, workers=2) == serial
+
+    def test_short_stream_stays_serial(self, monkeypatch):
+        monkeypatch.setattr(extractor, "_parallel_map", None)
+        result = extract_info(self.COMMITS[:9], None, r"env:(\w+)", False, 10, workers=2)
+        assert result.values == [f"e{n}" for n in range(7)]
+
+    def test_whole_input_command_stays_serial(self, monkeypatch):
+        monkeypatch.setattr(extractor, "_parallel_map", None)
+        result = _run_extract_command(self.COMMITS, "grep -c env", 10, workers=2)
+        assert result.values == ["40"]
+
+
+class TestGitLogFilter:
+    @pytest.mark.parametrize(
+        ("pattern", "literals"),
+        [
+            (r"env:(\w+)", ("env:",)),
+            (r"Release (v[0-9.]+)", ("Release",)),
+            (r"(?:deploy|release)+ now", ("deploy", "release")),
+            (r"(?:build)?-(\d+)-done", ("-done",)),
+            (r"(?i:Ticket)-\d+ marker", ("marker",)),
+        ],
+    )
+    def test_required_literals(self, pattern, literals):
+        assert git_log_filter([pattern]) == LogFilter(literals)
+
+    @pytest.mark.parametrize(
+        "pattern",
+        [
+            r"[A-Z]+-\d+",  # no literal at all
+            r"v\d+",  # literal too short to be selective
+            r"(deploy)?env:x|ab",  # one branch has no long literal
+            r"(?:release)* (\w+)",  # repeat may match zero times
+            r"(",  # invalid
+        ],
+    )
+    def test_no_filter(self, pattern):
+        assert git_log_filter([pattern]) is None
+
+    def test_ignore_case_avoids_unicode_folds(self):
+        # "k" also matches KELVIN SIGN under re.IGNORECASE; git would not.
+        assert git_log_filter([r"(?i)deploy-ok"]) == LogFilter(("deploy-o",), True)
+        assert git_log_filter([r"(?ia)deploy-ok"]) == LogFilter(("deploy-ok",), True)
+
+    def test_no_whitespace_in_literals(self):
+        assert git_log_filter([r"Merge pull request #(\d+)"]) == LogFilter(("request",))
+
+    def test_several_patterns_combine(self):
+        assert git_log_filter([r"env:(\w+)", r"OPS-\d+"]) == LogFilter(("env:", "OPS-"))
+        assert git_log_filter([r"env:(\w+)", r"\d+"]) is None
+
+    @pytest.mark.parametrize("error", [AttributeError, TypeError, ValueError])
+    def test_parser_walk_failure_skips_filter(self, monkeypatch, error):
+        # re._parser is private; a node layout from another CPython release
+        # must disable the prefilter rather than abort the extraction.
+        def broken(*args):
+            raise error("unexpected node")
+
+        monkeypatch.setattr(extractor, "_required_literals", broken)
+        assert git_log_filter([r"env:(\w+)"]) is None
+
+    def test_filter_never_drops_a_match(self):
+        texts = [
+            "deploy env:prod", "Release v1.2", "release now", "x-12-done",
+            "TICKET-4 marker", "Deploy-OK", "deploy-\u212a", "nothing here",
+        ]
+        for pattern in [
+            r"env:(\w+)", r"Release (v[0-9.]+)", r"(?:deploy|release)+ now",
+            r"(?:build)?-(\d+)-done", r"(?i:Ticket)-\d+ marker", r"(?i)deploy-ok",
+        ]:
+            log_filter = git_log_filter([pattern])
+            for text in texts:
+                if re.search(pattern, text):
+                    fold = str.lower if log_filter.ignore_case else str
+                    assert any(fold(lit) in fold(text) for lit in log_filter.literals)
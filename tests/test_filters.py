@@ -0,0 +1,162 @@
+import pytest
+
+from app.filters import UnsupportedCommand, is_builtin_command, parse_pipeline
+
+LINES = [
+    "feat: add login env:prod",
+    "fix: handle timeout OPS-12",
+    "chore: bump deps env:staging",
+    "",
+    "feat: signup env:prod",
+]
+
+
+def run(command, lines=LINES):
+    return list(parse_pipeline(command).run(lines))
+
+
+class TestGrep:
+    def test_only_matching_alternation(self):
+        assert run("grep -oE 'feat|fix'") == ["feat", "fix", "feat"]
+
+    def test_basic_regex_escapes(self):
+        assert run(r"grep -o 'env:[a-z]\+'") == ["env:prod", "env:staging", "env:prod"]
+
+    def test_perl_regex(self):
+        assert run(r"grep -oP 'OPS-\d+'") == ["OPS-12"]
+
+    def test_invert_ignore_case_count(self):
+        assert run("grep -vi FEAT") == LINES[1:4]
+        assert run("grep -c env") == ["3"]
+
+    def test_word_and_line_match(self):
+        assert run("grep -w feat", ["feat x", "feature"]) == ["feat x"]
+        assert run("grep -x feat", ["feat", "feat x"]) == ["feat"]
+
+    def test_max_count(self):
+        assert run("grep -m 1 feat") == [LINES[0]]
+
+    def test_trailing_or_true_is_ignored(self):
+        assert run("grep -oE 'chore' || true") == ["chore"]
+
+
+class TestSedAwkCut:
+    def test_sed_substitute_and_print(self):
+        assert run("sed -n 's/.*env://p'") == ["prod", "staging", "prod"]
+
+    def test_sed_groups_and_delete(self):
+        assert run(r"sed -E 's/^(\w+): .*/<\1>/' | sed '/fix/d'") == [
+            "<feat>",
+            "<chore>",
+            "",
+            "<feat>",
+        ]
+
+    def test_awk_fields_and_address(self):
+        assert run("awk '/env/ {print $1, $NF}'") == [
+            "feat: env:prod",
+            "chore: env:staging",
+            "feat: env:prod",
+        ]
+
+    def test_awk_field_separator(self):
+        assert run("awk -F: '{print $2}'", ["a:b:c", "x"]) == ["b", ""]
+
+    def test_cut_fields(self):
+        assert run("cut -d: -f1", ["a:b", "c"]) == ["a", "c"]
+        assert run("cut -s -d: -f2-", ["a:b:c", "c"]) == ["b:c"]
+
+
+class TestSortUniqHeadTail:
+    def test_sort_uniq_count(self):
+        assert run("grep -oE 'env:[a-z]+' | sort | uniq -c") == [
+            "      2 env:prod",
+            "      1 env:staging",
+        ]
+
+    def test_numeric_reverse_sort(self):
+        assert run("sort -rn", ["9", "100", "-3"]) == ["100", "9", "-3"]
+
+    def test_head_tail(self):
+        assert run("head -2") == LINES[:2]
+        assert run("tail -n 1") == LINES[-1:]
+        assert run("tail -n +4") == LINES[3:]
+
+    def test_head_stops_reading_input(self):
+        def lines():
+            yield "first"
+            raise AssertionError("read past head")
+
+        assert run("head -1", lines()) == ["first"]
+
+    def test_tr(self):
+        assert run("tr '[:lower:]' '[:upper:]'", ["env:prod"]) == ["ENV:PROD"]
+        assert run("tr -d '0-9'", ["OPS-12"]) == ["OPS-"]
+
+
+class TestShardable:
+    @pytest.mark.parametrize(
+        "command",
+        [
+            "grep -oE 'env:[a-z]+' | sort -u",
+            "sed -n 's/^env://p' | cut -d: -f1",
+            "awk '/env:/ { print $2 }' | tr a-z A-Z",
+            "grep -v fix | uniq",
+        ],
+    )
+    def test_line_by_line_pipelines(self, command):
+        assert parse_pipeline(command).shardable
+
+    @pytest.mark.parametrize(
+        "command",
+        [
+            "grep -c env",
+            "grep -m1 env",
+            "grep env | head -1",
+            "sort | uniq -c",
+            "grep env | wc -l",
+            "tail -n 2",
+        ],
+    )
+    def test_whole_input_pipelines(self, command):
+        assert not parse_pipeline(command).shardable
+
+
+class TestUnsupported:
+    @pytest.mark.parametrize(
+        "command",
+        [
+            "grep foo; rm -rf /",
+            "grep foo && echo hi",
+            "cat $(whoami)",
+            "grep $HOME",
+            'grep "$HOME"',
+            "grep foo file.txt",
+            "grep foo > out.txt",
+            "python -c 'print(1)'",
+            "grep -oE 'feat|feature'",  # leftmost-longest vs first-match
+            "grep -oE '(ab)?b'",  # quantified group
+            r"grep -o '\d'",  # \d means 'd' to GNU grep
+            "sed 's/a/b/2'",
+            "awk '{x = $1; print x}'",
+            "sort -k2",
+            "grep --color foo",
+            "tr 'é' 'e'",  # tr maps bytes
+            "cut -d 'é' -f1",
+        ],
+    )
+    def test_falls_back_to_bash(self, command):
+        with pytest.raises(UnsupportedCommand):
+            parse_pipeline(command)
+        assert not is_builtin_command(command)
+
+    def test_ascii_only_pipeline_rejects_non_ascii_input(self):
+        pipeline = parse_pipeline("grep -o '[[:alpha:]]*' | cut -c1-3")
+        assert pipeline.ascii_only
+        assert list(pipeline.run(["abcd"])) == ["abc"]
+        with pytest.raises(UnsupportedCommand):
+            list(pipeline.run(["abcd", "café"]))
+        assert not parse_pipeline("cut -f1 | tr a-z A-Z").ascii_only
+
+    def test_builtin_detection(self):
+        assert is_builtin_command("grep -oE 'env:[a-z]+' | sort -u")
@@ -1,6 +1,16 @@
 import json
 
-from app.formatter import format_output
+from app import formatter
+from app.formatter import (
+    Matches,
+    format_named_output,
+    format_output,
+    format_range_output,
+    output_formats,
+    register_format,
+    stream_named_output,
+    stream_output,
+)
 
 
 class TestFormatOutput:
@@ -43,3 +53,90 @@ class TestFormatOutput:
         result = format_output("hello\nworld", "json")
         parsed = json.loads(result)
         assert parsed == ["hello", "world"]
+
+
+class TestMatches:
+    def test_count_ignores_blank_values(self):
+        matches = Matches(["", "  ", "dev", "prod"])
+        assert matches.count == 2
+        assert str(matches) == "\n  \ndev\nprod"
+
+    def test_multiline_values_count_per_line(self):
+        matches = Matches(["a\nb", "c"])
+        assert matches.count == 3
+        assert list(matches.lines()) == ["a", "b", "c"]
+
+    def test_from_text_round_trips(self):
+        text = "deploy\n\nenv:prod\n"
+        matches = Matches.from_text(text)
+        assert str(matches) == text
+        assert matches.count == 2
+        assert list(matches.lines()) == ["deploy", "env:prod"]
+
+    def test_formats_without_joining(self):
+        matches = Matches(["dev", "prod"])
+        assert format_output(matches, "json") == '["dev", "prod"]'
+        assert format_output(matches, "text") == "dev\nprod"
+        assert format_output(Matches([" "]), "json") == " "
+
+
+class TestStreamOutput:
+    VALUE = 'prod\n\nval,ue\nq"uote\n  \nstaging\n'
+
+    def test_chunks_join_to_formatted_value(self):
+        for output_format in ("json", "csv"):
+            chunks = stream_output(self.VALUE, output_format)
+            assert not isinstance(chunks, str)
+            assert "".join(chunks) == format_output(self.VALUE, output_format)
+
+    def test_json_element_per_chunk(self):
+        assert list(stream_output("a\nb", "json")) == ["[", '"a"', ', "b"', "]"]
+
+    def test_text_and_blank_values_are_returned_as_is(self):
+        assert stream_output(self.VALUE, "text") == self.VALUE
+        assert stream_output(" ", "json") == " "
+
+    def test_named_chunks(self):
+        values = {"ENV": "dev\nprod", "TICKET": ""}
+        assert "".join(stream_named_output(values)) == json.dumps(
+            {"ENV": ["dev", "prod"], "TICKET": []}
+        )
+
+
+class TestCompactFormats:
+    def test_ndjson_one_value_per_line(self):
+        result = format_output('prod\n\nq"a\n\u00e9t\u00e9', "ndjson")
+        assert result == '"prod"\n"q\\"a"\n"\u00e9t\u00e9"'
+        assert [json.loads(line) for line in result.splitlines()] == [
+            "prod", 'q"a', "\u00e9t\u00e9"
+        ]
+
+    def test_binary_length_prefixed(self):
+        result = format_output("prod\n\u00e9t\u00e9", "binary")
+        assert result == b"\x00\x00\x00\x04prod\x00\x00\x00\x05\xc3\xa9t\xc3\xa9"
+
+    def test_binary_blank_value_has_no_records(self):
+        assert format_output("", "binary") == b""
+
+    def test_registered_format(self, monkeypatch):
+        monkeypatch.setattr("app.formatter._FORMATS", dict(formatter._FORMATS))
+        register_format("tsv", lambda matches: iter(["\t".join(matches.lines())]))
+        assert "tsv" in output_formats()
+        assert format_output("a\nb", "tsv") == "a\tb"
+
+
+class TestFormatNamedOutput:
+    def test_json_object_of_arrays(self):
+        result = format_named_output({"ENV": "dev\nprod", "TICKET": ""})
+        assert json.loads(result) == {"ENV": ["dev", "prod"], "TICKET": []}
+
+
+class TestFormatRangeOutput:
+    def test_arrays_per_range(self):
+        values = {"v1..v2": {"": "dev\nprod"}, "v2": {"": ""}}
+        result = format_range_output(values, False)
+        assert json.loads(result) == {"v1..v2": ["dev", "prod"], "v2": []}
+
+    def test_named_arrays_per_range(self):
+        result = format_range_output({"v1..v2": {"ENV": "prod", "TICKET": ""}}, True)
+        assert json.loads(result) == {"v1..v2": {"ENV": ["prod"], "TICKET": []}}
@@ -1,22 +1,108 @@
+import io
 import os
 import subprocess
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
-from app.git_client import fetch_commit_messages, configure_git
+from app.git_client import (
+    GIT_SAFE_DIRECTORIES,
+    RECORD_FORMAT,
+    CommitRecord,
+    LogFilter,
+    _build_log_command,
+    _read_safe_directories,
+    _split_records,
+    configure_git,
+    deepen_history,
+    ensure_commit_graph,
+    fetch_commit_messages,
+    is_ancestor,
+    is_shallow,
+    parse_commit_record,
+    resolve_ranges,
+    resolve_revision,
+    stream_commit_messages,
+    stream_commits,
+)
+from app.logger import ActionError
+
+_RECORD = (
+    b"abc123\x1fdef456\x1fDev <dev@example.com>\x1f0\x1f"
+    b"Thu Jan 1 00:00:00 1970 +0000\x1ffeat: add login\n\nenv:prod\n"
+)
+
+
+@pytest.fixture
+def git_config_env(tmp_path, monkeypatch):
+    """An empty global gitconfig and no GIT_CONFIG_* entries, restored afterwards."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    for key in ("GIT_CONFIG_GLOBAL", "XDG_CONFIG_HOME", "SUDO_UID", "GIT_CONFIG_COUNT"):
+        monkeypatch.delenv(key, raising=False)
+    for i in range(4):
+        monkeypatch.delenv(f"GIT_CONFIG_KEY_{i}", raising=False)
+        monkeypatch.delenv(f"GIT_CONFIG_VALUE_{i}", raising=False)
+    return tmp_path
 
 
 class TestConfigureGit:
     @patch("app.git_client.subprocess.run")
-    def test_configures_safe_directories(self, mock_run):
+    def test_owned_repository_needs_nothing(self, mock_run, git_config_env):
+        configure_git()
+        mock_run.assert_not_called()
+        assert "GIT_CONFIG_COUNT" not in os.environ
+
+    def test_adds_safe_directories_to_the_environment(
+        self, git_config_env, monkeypatch
+    ):
+        monkeypatch.setattr(os, "geteuid", lambda: os.getuid() + 1)
+        with patch("app.git_client.subprocess.run") as mock_run:
+            configure_git()
+        mock_run.assert_not_called()
+        result = subprocess.run(
+            ["git", "config", "--get-all", "safe.directory"],
+            capture_output=True,
+            text=True,
+        )
+        assert result.stdout.split() == GIT_SAFE_DIRECTORIES
+
+    def test_skips_configured_directories(self, git_config_env, monkeypatch):
+        monkeypatch.setattr(os, "geteuid", lambda: os.getuid() + 1)
+        (git_config_env / ".gitconfig").write_text(
+            '[safe]\n\tdirectory = "/usr/src"\n'
+        )
         configure_git()
-        assert mock_run.call_count == 2
+        configure_git()
+        assert os.environ["GIT_CONFIG_COUNT"] == "1"
+        assert os.environ["GIT_CONFIG_VALUE_0"] == "/github/workspace"
 
-    @patch("app.git_client.subprocess.run", side_effect=subprocess.CalledProcessError(1, "git"))
-    def test_continues_on_error(self, mock_run):
-        # Should not raise even if subprocess fails
+    def test_wildcard_trusts_everything(self, git_config_env, monkeypatch):
+        monkeypatch.setattr(os, "geteuid", lambda: os.getuid() + 1)
+        (git_config_env / ".gitconfig").write_text("[safe]\ndirectory = *\n")
         configure_git()
+        assert "GIT_CONFIG_COUNT" not in os.environ
+
+    def test_read_safe_directories(self):
+        lines = [
+            "[core]",
+            "directory = /not/safe",
+            "[Safe]",
+            "# directory = /commented",
+            "Directory = /a ; trailing comment",
+            '  directory = "/b;c"',
+            "[safe] directory = /d",
+        ]
+        assert _read_safe_directories(lines) == ["/a", "/b;c", "/d"]
+
+
+def _fake_popen(stdout: bytes, returncode: int = 0):
+    """Build a Popen mock that streams ``stdout`` from a byte buffer."""
+    process = MagicMock()
+    process.stdout = io.BytesIO(stdout)
+    process.stderr = io.BytesIO(b"")
+    process.wait.return_value = returncode
+    return process
 
 
 class TestFetchCommitMessages:
@@ -25,35 +111,326 @@ class TestFetchCommitMessages:
         result = fetch_commit_messages(10, True, 5)
         assert result == "No commit messages available."
 
-    @patch("app.git_client.subprocess.run")
+    @patch("app.git_client.subprocess.Popen")
     @patch("app.git_client.os.path.isdir", return_value=True)
-    def test_pretty_format(self, mock_isdir, mock_run):
-        mock_run.return_value.stdout = "feat: add login\n"
-        fetch_commit_messages(5, True, 10)
-        cmd = mock_run.call_args[0][0]
-        assert "--pretty=%B" in cmd
+    def test_pretty_format(self, mock_isdir, mock_popen):
+        mock_popen.return_value = _fake_popen(_RECORD + b"\0")
+        result = fetch_commit_messages(5, True, 10)
+        cmd = mock_popen.call_args[0][0]
+        assert f"--format={RECORD_FORMAT}" in cmd
+        assert result == "feat: add login\n\nenv:prod\n"
 
-    @patch("app.git_client.subprocess.run")
+    @patch("app.git_client.subprocess.Popen")
     @patch("app.git_client.os.path.isdir", return_value=True)
-    def test_no_pretty_format(self, mock_isdir, mock_run):
-        mock_run.return_value.stdout = "commit abc\n"
-        fetch_commit_messages(5, False, 10)
-        cmd = mock_run.call_args[0][0]
+    def test_no_pretty_format(self, mock_isdir, mock_popen):
+        mock_popen.return_value = _fake_popen(_RECORD + b"\0")
+        result = fetch_commit_messages(5, False, 10)
+        cmd = mock_popen.call_args[0][0]
         assert "--pretty=%B" not in cmd
+        assert result.startswith("commit abc123\nAuthor: Dev <dev@example.com>\n")
+        assert "Date:   Thu Jan 1 00:00:00 1970 +0000" in result
+        assert "    feat: add login\n    \n    env:prod\n" in result
 
-    @patch("app.git_client.subprocess.run")
+    @patch("app.git_client.subprocess.Popen")
     @patch("app.git_client.os.path.isdir", return_value=True)
-    def test_commit_range(self, mock_isdir, mock_run):
-        mock_run.return_value.stdout = "feat: login\n"
+    def test_commit_range(self, mock_isdir, mock_popen):
+        mock_popen.return_value = _fake_popen(b"feat: login\n\0")
         fetch_commit_messages(5, True, 10, commit_range="HEAD~3..HEAD")
-        cmd = mock_run.call_args[0][0]
+        cmd = mock_popen.call_args[0][0]
         assert "HEAD~3..HEAD" in cmd
         assert "-5" not in cmd
 
-    @patch("app.git_client.subprocess.run")
+    @patch("app.git_client.subprocess.Popen")
     @patch("app.git_client.os.path.isdir", return_value=True)
-    def test_no_commit_range_uses_limit(self, mock_isdir, mock_run):
-        mock_run.return_value.stdout = "feat: login\n"
+    def test_no_commit_range_uses_limit(self, mock_isdir, mock_popen):
+        mock_popen.return_value = _fake_popen(b"feat: login\n\0")
         fetch_commit_messages(5, True, 10)
-        cmd = mock_run.call_args[0][0]
+        cmd = mock_popen.call_args[0][0]
         assert "-5" in cmd
+
+    @patch("app.git_client.subprocess.Popen")
+    @patch("app.git_client.os.path.isdir", return_value=True)
+    def test_git_failure(self, mock_isdir, mock_popen):
+        mock_popen.return_value = _fake_popen(b"", returncode=128)
+        with pytest.raises(ActionError):
+            fetch_commit_messages(5, True, 10, commit_range="nope..HEAD")
+
+
+class TestStreamCommitMessages:
+    def test_yields_one_message_per_commit(self, git_repo):
+        messages = list(stream_commit_messages(10, True, 10))
+        assert len(messages) == 3
+        assert messages[0].startswith("chore: bump deps")
+        assert "env:staging" in messages[2]
+
+    def test_respects_limit(self, git_repo):
+        assert len(list(stream_commit_messages(2, True, 10))) == 2
+
+    def test_commit_range(self, git_repo):
+        messages = list(stream_commit_messages(10, True, 10, "HEAD~1..HEAD"))
+        assert len(messages) == 1
+
+    def test_invalid_range_fails(self, git_repo):
+        with pytest.raises(ActionError):
+            list(stream_commit_messages(10, True, 10, "missing..HEAD"))
+
+    def test_early_close_stops_git(self, git_repo):
+        stream = stream_commit_messages(10, True, 10)
+        assert next(stream)
+        stream.close()  # must not raise or hang
+
+    def test_split_records_across_chunks(self):
+        chunks = iter([b"one\0tw", b"o\0", b"three"])
+        assert list(_split_records(chunks)) == [b"one", b"two", b"three"]
+
+
+class TestLogFilter:
+    def test_args(self):
+        assert LogFilter(("env:", "OPS-"), ignore_case=True).args() == [
+            "--fixed-strings",
+            "--regexp-ignore-case",
+            "--grep=env:",
+            "--grep=OPS-",
+        ]
+
+    def test_range_filters_in_place(self):
+        cmd, stdin_cmd = _build_log_command(10, "v1..v2", LogFilter(("env:",)))
+        assert cmd[-2:] == ["--grep=env:", "v1..v2"]
+        assert stdin_cmd is None
+
+    def test_limit_pipes_revisions(self):
+        cmd, stdin_cmd = _build_log_command(5, "", LogFilter(("env:",)))
+        assert cmd[-2:] == ["--no-walk=unsorted", "--stdin"]
+        assert stdin_cmd == ["git", "rev-list", "-5", "HEAD"]
+
+    def test_filters_within_last_commits(self, git_repo):
+        subprocess.run(["git", "commit-graph", "write", "--reachable"], check=True)
+        # git log -2 --grep would return the two newest *matching* commits;
+        # only one of the two newest commits matches.
+        commits = list(stream_commits(2, True, 10, log_filter=LogFilter(("env:",))))
+        assert [c.subject for c in commits] == ["fix: handle timeout"]
+
+    def test_filters_range(self, git_repo):
+        commits = list(
+            stream_commits(10, True, 10, "HEAD~2..HEAD", LogFilter(("ENV:",), True))
+        )
+        assert [c.body for c in commits] == ["env:prod"]
+
+    def test_last_commits_unfiltered_without_commit_graph(self, git_repo):
+        commits = list(stream_commits(2, True, 10, log_filter=LogFilter(("env:",))))
+        assert len(commits) == 2
+
+    def test_early_close_with_pipe(self, git_repo):
+        subprocess.run(["git", "commit-graph", "write", "--reachable"], check=True)
+        stream = stream_commits(10, True, 10, log_filter=LogFilter(("env:",)))
+        assert next(stream)
+        stream.close()  # must not raise or hang
+
+
+class TestCommitGraph:
+    def test_writes_missing_graph(self, git_repo):
+        graph = git_repo / ".git" / "objects" / "info" / "commit-graph"
+        assert not graph.exists()
+        assert ensure_commit_graph(10) is True
+        assert graph.exists()
+        assert ensure_commit_graph(10) is True
+
+    def test_write_failure_is_not_fatal(self, git_repo):
+        failed = subprocess.CompletedProcess([], 128, "", "fatal: oops")
+        with patch("app.git_client.subprocess.run", return_value=failed):
+            assert ensure_commit_graph(10) is False
+
+    @pytest.mark.parametrize("native", [False, True])
+    def test_is_ancestor(self, git_repo, native):
+        ensure_commit_graph(10)
+        first, second = (resolve_revision(f"HEAD~{n}", 10) for n in (2, 1))
+        assert is_ancestor(first, "HEAD", 10, native) is True
+        assert is_ancestor("HEAD", second, 10, native) is False
+
+
+@pytest.fixture
+def shallow_clone(tmp_path, monkeypatch):
+    """A depth-1 clone of a 30-commit history (tag v1 at the 10th commit,
+    branch feature at the 27th)."""
+    def run(*args, cwd=tmp_path):
+        subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+    for key in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{key}_NAME", "Test Author")
+        monkeypatch.setenv(f"GIT_{key}_EMAIL", "author@example.com")
+    run("init", "-q", "source")
+    for n in range(1, 31):
+        run("commit", "-q", "--allow-empty", "-m", f"c{n}", cwd=tmp_path / "source")
+    run("tag", "v1", "HEAD~20", cwd=tmp_path / "source")
+    run("branch", "feature", "HEAD~3", cwd=tmp_path / "source")
+    run("clone", "-q", "--bare", "source", "remote.git")
+    run("clone", "-q", "--depth=1", f"file://{tmp_path}/remote.git", "work")
+    monkeypatch.chdir(tmp_path / "work")
+    monkeypatch.setattr("app.git_client.DEEPEN_STEP", 4)
+    return tmp_path / "work"
+
+
+def _count(revision):
+    return int(
+        subprocess.run(
+            ["git", "rev-list", "--count", revision], capture_output=True, text=True
+        ).stdout
+    )
+
+
+class TestDeepenHistory:
+    def test_detects_shallow_clone(self, shallow_clone, git_repo):
+        assert is_shallow() is False
+        os.chdir(shallow_clone)
+        assert is_shallow() is True
+
+    def test_fetches_exactly_the_commit_limit(self, shallow_clone):
+        deepen_history(10, (), 10)
+        assert _count("HEAD") == 10
+        assert is_shallow() is True
+
+    @pytest.mark.parametrize(
+        "commit_range, commits",
+        [
+            ("v1..HEAD", 20),
+            ("HEAD~5..HEAD~1", 4),
+            ("feature..HEAD", 3),
+            ("HEAD~12..feature", 9),
+        ],
+    )
+    def test_fetches_the_range(self, shallow_clone, commit_range, commits):
+        deepen_history(10, (commit_range,), 10)
+        assert _count(commit_range) == commits
+        # Doubling steps stop short of the whole history.
+        assert is_shallow() is True
+        assert _count("HEAD") < 30
+
+    def test_single_revision_fetches_all_history(self, shallow_clone):
+        deepen_history(10, ("v1",), 10)
+        assert is_shallow() is False
+        assert _count("v1") == 10
+
+    def test_fetch_failure_is_not_fatal(self, shallow_clone, capsys):
+        subprocess.run(["git", "remote", "remove", "origin"], check=True)
+        deepen_history(10, ("v1..HEAD",), 10)
+        deepen_history(10, (), 10)
+        out = capsys.readouterr().out
+        assert "v1..HEAD: history incomplete" in out
+        assert "1 of the last 10 commits available" in out
+
+
+class TestResolveRanges:
+    @pytest.fixture
+    def tagged(self, git_repo):
+        # main: c1 c2 c3 <- v1 ... ; side branches off c2.
+        def run(*args):
+            subprocess.run(["git", *args], check=True, capture_output=True)
+
+        run("tag", "v1", "HEAD~1")
+        run("tag", "v0", "HEAD~2")
+        run("checkout", "-q", "-b", "side", "HEAD~1")
+        run("commit", "-q", "--allow-empty", "-m", "side\n\nenv:side")
+        run("checkout", "-q", "-")
+        run("commit", "-q", "--allow-empty", "-m", "feat: qa\n\nenv:qa")
+        return git_repo
+
+    @staticmethod
+    def _rev_list(commit_range):
+        return subprocess.run(
+            ["git", "rev-list", commit_range], capture_output=True, text=True
+        ).stdout.split()
+
+    @pytest.mark.parametrize(
+        "ranges",
+        [
+            ["v0..v1", "v1..HEAD"],
+            ["v0..HEAD", "v1..HEAD", "v1..side"],
+            ["side..HEAD", "HEAD..side"],
+            ["v1", "side..HEAD"],
+        ],
+    )
+    def test_matches_rev_list(self, tagged, ranges):
+        order, members = resolve_ranges(ranges, 10)
+        assert members == {r: set(self._rev_list(r)) for r in ranges}
+        # Each commit once; the fixture's commits share a timestamp, so the
+        # newest-first order is not checked against rev-list here.
+        assert sorted(order) == sorted(set().union(*members.values()))
+
+    def test_unknown_revision_fails(self, tagged):
+        with pytest.raises(ActionError):
+            resolve_ranges(["v1..nope"], 10)
+
+    def test_stream_exact_revisions(self, tagged):
+        order, _ = resolve_ranges(["v0..v1", "side..HEAD"], 10)
+        commits = list(stream_commits(10, True, 10, revisions=order))
+        assert [c.sha for c in commits] == order
+        assert sorted(c.body for c in commits) == ["", "env:prod", "env:qa"]
+        assert list(stream_commits(10, True, 10, revisions=[])) == []
+
+
+class TestCommitRecords:
+    def test_parse_record(self):
+        commit = parse_commit_record(_RECORD.decode())
+        assert commit == CommitRecord(
+            "abc123", "Dev <dev@example.com>", 0, "feat: add login\n\nenv:prod\n"
+        )
+        assert (commit.subject, commit.body) == ("feat: add login", "env:prod")
+
+    def test_parse_header_fields(self):
+        record = "a\x1fb1 b2\x1fDev\x1f1\x1fWed Nov 15 03:43:20 2023 +0530\x1fm"
+        commit = parse_commit_record(record, pretty=False)
+        assert commit.merge == "b1 b2"
+        assert commit.date == "Wed Nov 15 03:43:20 2023 +0530"
+        assert parse_commit_record(record.replace("b1 b2", "b1"), False).merge == ""
+        assert parse_commit_record(record).date == ""
+
+    def test_parse_malformed_record(self):
+        assert parse_commit_record("abc123\x1fonly two") is None
+        assert parse_commit_record("a\x1fp\x1fb\x1fnot-a-number\x1fd\x1fm") is None
+
+    def test_message_may_contain_separator(self):
+        commit = parse_commit_record("a\x1fp\x1fb\x1f1\x1fd\x1fsubject\n\nbody\x1fmore")
+        assert commit.body == "body\x1fmore"
+
+    @pytest.mark.parametrize("pretty", [True, False])
+    def test_text_matches_git_log(self, git_repo, pretty):
+        def git(*args, **kwargs):
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True, **kwargs
+            ).stdout
+
+        env = {**os.environ, "GIT_AUTHOR_DATE": "1700000000 +0530"}
+        message = "first line of subject\ncontinues here env:prod\n\n\tx\t y  \n \n"
+        git(
+            "commit", "--allow-empty", "--cleanup=verbatim", "-F", "-",
+            input=message, env=env,
+        )
+        git("checkout", "-q", "-b", "side", "HEAD~2")
+        git("commit", "--allow-empty", "-m", "side")
+        git("checkout", "-q", "-")
+        git("merge", "--no-ff", "-m", "Merge side", "side")
+        expected = git("log", "--pretty=%B") if pretty else git("log")
+        texts = [commit.text for commit in stream_commits(10, pretty, 10)]
+        assert "\n".join(texts) + ("\n" if pretty else "") == expected
+        assert "continues here env:prod" in texts[1]
+        if not pretty:
+            assert texts[0].split("\n")[1].startswith("Merge: ")
+            assert "Date:   Wed Nov 15 03:43:20 2023 +0530" in texts[1]
+
+    def test_stream_commits_from_repo(self, git_repo):
+        commits = list(stream_commits(10, True, 10))
+        assert [c.subject for c in commits] == [
+            "chore: bump deps",
+            "fix: handle timeout",
+            "feat: add login",
+        ]
+        assert all(len(c.sha) == 40 for c in commits)
+        assert commits[1].body == "env:prod"
+        assert commits[1].author == "Test Author <author@example.com>"
+        assert commits[1].timestamp > 0
+
+    def test_no_git_dir_yields_placeholder(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (commit,) = stream_commits(10, False, 5)
+        assert commit.sha == ""
+        assert commit.text == "No commit messages available."
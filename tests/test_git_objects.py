@@ -0,0 +1,241 @@
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from app.git_client import LogFilter, _read_log, split_message, stream_commits
+from app.git_objects import (
+    ObjectStore,
+    UnsupportedRepository,
+    apply_delta,
+    open_repository,
+)
+
+RANGES = ["", "v1..HEAD", "v1..", "light..main", "HEAD", "v1", "main..v1"]
+FILTERS = [None, LogFilter(("env:e1", "OPS-3")), LogFilter(("ENV:MERGE",), True)]
+
+
+def _git(*args, env=None, input=None):
+    subprocess.run(
+        ["git", *args], check=True, capture_output=True, env=env, input=input
+    )
+
+
+def _commit(message, date, committer_date=None, encoding=None):
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_DATE": f"{date} +0000",
+        "GIT_COMMITTER_DATE": f"{committer_date or date} +0000",
+    }
+    args = ["commit", "-q", "--allow-empty", "-F", "-"]
+    if encoding:
+        args = ["-c", f"i18n.commitEncoding={encoding}", *args]
+    _git(*args, env=env, input=message.encode(encoding or "utf-8"))
+
+
+@pytest.fixture
+def history(git_repo):
+    """Extend git_repo with merges, date ties and skew, tags and odd messages."""
+    date = 1_700_000_000
+    for n in range(40):
+        if n % 9 == 5:
+            _git("checkout", "-q", "-b", f"topic{n}", "HEAD~2")
+            _commit(f"topic work {n}\n\nenv:t{n}", date, date + 3)
+            _git("checkout", "-q", "-")
+            env = {
+                **os.environ,
+                "GIT_AUTHOR_DATE": f"{date} +0000",
+                "GIT_COMMITTER_DATE": f"{date} +0000",
+            }
+            message = f"Merge topic{n}\n\nenv:merge"
+            _git("merge", "-q", "--no-ff", "-m", message, f"topic{n}", env=env)
+        elif n == 7:
+            _commit("caf\xe9 env:e1\n\nna\xefve", date, encoding="latin-1")
+        elif n == 11:
+            _commit("  \n\nwrapped\nsubject  \n\n\nbody OPS-3\n\n", date)
+        else:
+            message = f"feat: change {n}\n\nenv:e{n % 4} OPS-{n % 5}\n"
+            _commit(message, date, date - n % 3)
+        if n == 20:
+            _git("tag", "-a", "-m", "release", "v1")
+            _git("tag", "light")
+        date += n % 2
+    _git("branch", "-M", "main")
+    return git_repo
+
+
+def _native(limit, commit_range="", log_filter=None):
+    with open_repository() as repository:
+        return list(repository.log(limit, commit_range, log_filter))
+
+
+def _assert_matches_git_log():
+    for commit_range in RANGES:
+        for log_filter in FILTERS:
+            expected = list(_read_log(100, True, 10, commit_range, log_filter))
+            assert _native(100, commit_range, log_filter) == expected, (
+                commit_range,
+                log_filter,
+            )
+    assert _native(7) == list(_read_log(7, True, 10, "", None))
+
+
+class TestMatchesGitLog:
+    def test_loose_objects(self, history):
+        _assert_matches_git_log()
+
+    def test_packed_objects(self, history):
+        _git("gc", "-q")
+        _commit("after the pack\n\nenv:e1", 1_800_000_000)
+        _assert_matches_git_log()
+
+    def test_deltified_commits(self, history):
+        _git("repack", "-adfq", "--window=250", "--depth=250")
+        _assert_matches_git_log()
+
+    def test_shallow_clone(self, history, tmp_path, monkeypatch):
+        clone = tmp_path / "shallow"
+        _git("clone", "-q", "--depth", "8", f"file://{history}", str(clone))
+        monkeypatch.chdir(clone)
+        assert _native(100) == list(_read_log(100, True, 10, "", None))
+        assert len(_native(100)) == 8
+
+    def test_log_header(self, history):
+        env = {**os.environ, "GIT_AUTHOR_DATE": "1800000000 -0730"}
+        _git("commit", "-q", "--allow-empty", "-m", "late\tnight env:e1", env=env)
+        expected = list(_read_log(100, False, 10, "", None))
+        with open_repository() as repository:
+            commits = repository.log(100, pretty=False)
+            # Up to the first merge, whose abbreviated parents need git.
+            assert next(commits) == expected[0]
+            assert expected[0].date == "Fri Jan 15 00:30:00 2027 -0730"
+            with pytest.raises(UnsupportedRepository, match="merge"):
+                list(commits)
+        assert list(stream_commits(100, False, 10, native=True)) == expected
+
+
+class TestCommitGraph:
+    @pytest.fixture
+    def graph(self, history):
+        # An octopus merge puts its third parent in the EDGE chunk.
+        for branch in ("o1", "o2"):
+            _git("checkout", "-q", "-b", branch, "main~3")
+            _commit(f"octopus {branch}", 1_700_000_030)
+        _git("checkout", "-q", "main")
+        _git("merge", "-q", "-m", "octopus\n\nenv:oct", "o1", "o2")
+        _git("commit-graph", "write", "--reachable")
+        # Commits after the graph was written are read from their objects.
+        _commit("after the graph\n\nenv:e1", 1_800_000_000)
+        return history
+
+    def test_matches_git_log(self, graph):
+        with open_repository() as repository:
+            assert repository.graph is not None
+        _assert_matches_git_log()
+
+    @pytest.mark.parametrize("commit_range", [*RANGES[1:], "o1..main"])
+    def test_revisions_match_rev_list(self, graph, commit_range):
+        expected = subprocess.run(
+            ["git", "rev-list", commit_range], capture_output=True, text=True
+        ).stdout.split()
+        with open_repository() as repository:
+            assert list(repository.revisions(1, commit_range)) == expected
+
+    def test_is_ancestor(self, graph):
+        with open_repository() as repository:
+            assert repository.is_ancestor("v1", "main")
+            assert repository.is_ancestor("o2", "main")
+            assert not repository.is_ancestor("main", "v1")
+            assert not repository.is_ancestor("o1", "o2")
+            assert repository.is_ancestor("topic14", "main")
+            assert not repository.is_ancestor("topic32", "v1")
+
+    def test_disabled_by_config(self, graph):
+        _git("config", "core.commitGraph", "false")
+        with open_repository() as repository:
+            assert repository.graph is None
+            assert repository.is_ancestor("v1", "main")
+
+
+class TestFallback:
+    @pytest.mark.parametrize("commit_range", ["HEAD~2..HEAD", "v1...main", "@{u}"])
+    def test_revision_syntax(self, history, commit_range):
+        with open_repository() as repository:
+            with pytest.raises(UnsupportedRepository):
+                repository.log(10, commit_range)
+
+    def test_repository_features(self, history):
+        alternates = history / ".git" / "objects" / "info" / "alternates"
+        alternates.write_text("/elsewhere/objects\n")
+        with pytest.raises(UnsupportedRepository, match="alternates"):
+            open_repository()
+        alternates.unlink()
+        _git("config", "extensions.objectFormat", "sha256")
+        with pytest.raises(UnsupportedRepository, match="objectformat"):
+            open_repository()
+
+    @pytest.mark.parametrize("setting", ["mailmap", "log.date"])
+    def test_log_header_settings(self, history, setting):
+        if setting == "mailmap":
+            mailmap = "Other <other@example.com> <author@example.com>\n"
+            (history / ".mailmap").write_text(mailmap)
+        else:
+            _git("config", "log.date", "iso")
+        with open_repository() as repository:
+            with pytest.raises(UnsupportedRepository):
+                repository.log(10, pretty=False)
+            repository.log(10)
+        expected = list(_read_log(10, False, 10, "", None))
+        assert list(stream_commits(10, False, 10, native=True)) == expected
+
+    def test_stream_commits_uses_git_log_when_unsupported(self, history):
+        expected = list(stream_commits(10, True, 10, "HEAD~2..HEAD"))
+        native = stream_commits(10, True, 10, "HEAD~2..HEAD", native=True)
+        assert list(native) == expected
+
+    def test_git_log_resumes_after_a_missing_object(self, history):
+        expected = list(stream_commits(10, True, 10))
+        with open_repository() as repository:
+            fourth = [c.sha for c in repository.log(10)][3]
+        read = ObjectStore.read
+
+        def read_or_fail(store, sha):
+            if sha == fourth:
+                raise UnsupportedRepository(f"object {sha} is missing")
+            return read(store, sha)
+
+        with patch("app.git_objects.ObjectStore.read", read_or_fail):
+            assert list(stream_commits(10, True, 10, native=True)) == expected
+
+
+class TestPrimitives:
+    def test_packed_refs_skip_blank_lines(self, history):
+        _git("pack-refs", "--all")
+        packed = history / ".git" / "packed-refs"
+        packed.write_text(packed.read_text().replace("\n", "\n\n"))
+        with open_repository() as repository:
+            assert "refs/tags/v1" in repository._packed_refs
+            assert "" not in repository._packed_refs
+
+    def test_apply_delta(self):
+        base = b"feat: add login\n\nenv:staging\n"
+        # Sizes 29 -> 26, copy 17 bytes from offset 0, insert "env:prod\n".
+        delta = bytes([29, 26, 0x90, 17, 9]) + b"env:prod\n"
+        assert apply_delta(base, delta) == b"feat: add login\n\nenv:prod\n"
+
+    def test_apply_delta_rejects_wrong_base(self):
+        with pytest.raises(UnsupportedRepository):
+            apply_delta(b"short", bytes([29, 1, 1]) + b"x")
+
+    @pytest.mark.parametrize(
+        "message, subject, body",
+        [
+            ("feat: login\n\nenv:prod\n", "feat: login", "env:prod\n"),
+            ("one line", "one line", ""),
+            ("\n  \nwrapped\nsubject \r\n \n\nbody\n", "wrapped subject", "body\n"),
+            ("subject\nno blank line", "subject no blank line", ""),
+        ],
+    )
+    def test_split_message(self, message, subject, body):
+        assert split_message(message) == (subject, body)
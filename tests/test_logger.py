@@ -0,0 +1,83 @@
+import tracemalloc
+
+import pytest
+
+from app.logger import ActionError, Timings, fail
+
+
+class TestFail:
+    def test_raises_action_error(self, capsys):
+        with pytest.raises(ActionError, match="boom"):
+            fail("boom")
+        assert "[ERROR] boom" in capsys.readouterr().err
+
+
+class TestTimings:
+    def test_stage_records_time_and_counters(self):
+        timings = Timings()
+        with timings.stage("output") as stage:
+            stage.count(bytes=10)
+            stage.count(bytes=5)
+        data = timings.as_dict()["stages"]["output"]
+        assert data["bytes"] == 15
+        assert data["seconds"] >= 0
+        assert "peak_memory_bytes" not in data
+
+    def test_iterate_counts_items_lines_and_bytes(self):
+        timings = Timings()
+        items = list(timings.iterate("fetch", ["a\nb", "é"], unit="commits", text=str))
+        assert items == ["a\nb", "é"]
+        data = timings.as_dict()["stages"]["fetch"]
+        assert data["commits"] == 2
+        assert data["lines"] == 3
+        assert data["bytes"] == 5
+
+    def test_iterate_time_not_charged_to_consumer(self):
+        clock = iter(range(100))
+        timings = Timings()
+
+        def slow():
+            yield "x"
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("app.logger.time.perf_counter", lambda: next(clock))
+            with timings.stage("extract"):
+                list(timings.iterate("fetch", slow()))
+        stages = timings.as_dict()["stages"]
+        # extract spans 0..5; its two next() calls (1..2, 3..4) belong to fetch
+        assert stages["fetch"]["seconds"] == 2
+        assert stages["extract"]["seconds"] == 3
+
+    def test_iterate_closes_source_early(self):
+        closed = []
+
+        def source():
+            try:
+                yield from range(10)
+            finally:
+                closed.append(True)
+
+        iterator = Timings().iterate("fetch", source())
+        next(iterator)
+        iterator.close()
+        assert closed == [True]
+
+    def test_trace_memory(self):
+        timings = Timings(trace_memory=True)
+        try:
+            with timings.stage("extract"):
+                data = [bytes(1000) for _ in range(100)]
+            del data
+        finally:
+            tracemalloc.stop()
+        assert timings.as_dict()["stages"]["extract"]["peak_memory_bytes"] >= 100_000
+
+    def test_print_summary(self, capsys):
+        timings = Timings()
+        with timings.stage("fetch") as stage:
+            stage.count(commits=3)
+        timings.print_summary()
+        out = capsys.readouterr().out
+        assert "Stage Timings:" in out
+        assert "commits=3" in out
+        assert "total" in out
@@ -1,11 +1,27 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
 from unittest.mock import patch
 
 import pytest
 
+from app.git_client import CommitRecord, LogFilter, stream_commits
 from app.logger import ActionError
 from app.main import run
 
 
+def _commits(*subjects: str) -> list[CommitRecord]:
+    return [CommitRecord(f"{n:040x}", "", 0, subject) for n, subject in enumerate(subjects)]
+
+
+def _joined(value) -> str:
+    """A formatted output value: a string or streamed chunks of one."""
+    return value if isinstance(value, str) else "".join(value)
+
+
 class TestRun:
     def test_invalid_config_exits(self, clean_env, monkeypatch):
         monkeypatch.setenv("INPUT_COMMIT_LIMIT", "abc")
@@ -18,7 +34,7 @@ class TestRun:
             run()
 
     @patch("app.main.configure_git")
-    @patch("app.main.fetch_commit_messages", return_value="feat: login\nfix: bug")
+    @patch("app.main.stream_commits", return_value=_commits("feat: login", "fix: bug"))
     @patch("app.main.set_output_variables")
     def test_full_flow_no_extract(
         self, mock_output, mock_fetch, mock_git, default_env
@@ -32,7 +48,7 @@ class TestRun:
         assert "feat: login" in call_args[0]
 
     @patch("app.main.configure_git")
-    @patch("app.main.fetch_commit_messages", return_value="feat: login\nfix: bug")
+    @patch("app.main.stream_commits", return_value=_commits("feat: login", "fix: bug"))
     @patch("app.main.set_output_variables")
     def test_full_flow_with_extract(
         self, mock_output, mock_fetch, mock_git, default_env, monkeypatch
@@ -43,7 +59,7 @@ class TestRun:
         assert "feat" in call_args[0]
 
     @patch("app.main.configure_git")
-    @patch("app.main.fetch_commit_messages", return_value="feat: login")
+    @patch("app.main.stream_commits", return_value=_commits("feat: login"))
     @patch("app.main.set_output_variables")
     def test_json_format(
         self, mock_output, mock_fetch, mock_git, default_env, monkeypatch
@@ -52,10 +68,10 @@ class TestRun:
         monkeypatch.setenv("INPUT_EXTRACT_COMMAND", "grep -oE 'feat'")
         run()
         call_args = mock_output.call_args[0]
-        assert "[" in call_args[0]  # JSON array
+        assert json.loads(_joined(call_args[0])) == ["feat"]
 
     @patch("app.main.configure_git")
-    @patch("app.main.fetch_commit_messages", return_value="feat: login\nfix: bug")
+    @patch("app.main.stream_commits", return_value=_commits("feat: login", "fix: bug"))
     @patch("app.main.set_output_variables")
     def test_full_flow_with_pattern(
         self, mock_output, mock_fetch, mock_git, default_env, monkeypatch
@@ -69,7 +85,18 @@ class TestRun:
         assert call_args[2] == 2
 
     @patch("app.main.configure_git")
-    @patch("app.main.fetch_commit_messages", return_value="feat: login")
+    @patch("app.main.stream_commits")
+    def test_invalid_pattern_fails_before_git(
+        self, mock_fetch, mock_git, default_env, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:([a-z]+")
+        with pytest.raises(ActionError):
+            run()
+        mock_git.assert_not_called()
+        mock_fetch.assert_not_called()
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits", return_value=_commits("feat: login"))
     @patch("app.main.set_output_variables")
     def test_commit_range_passed(
         self, mock_output, mock_fetch, mock_git, default_env, monkeypatch
@@ -77,5 +104,370 @@ class TestRun:
         monkeypatch.setenv("INPUT_COMMIT_RANGE", "HEAD~3..HEAD")
         run()
         fetch_kwargs = mock_fetch.call_args
-        # commit_range should be passed to fetch_commit_messages
+        # commit_range should be passed to stream_commits
         assert "HEAD~3..HEAD" in str(fetch_kwargs)
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits", return_value=_commits("env:prod OPS-1", "env:dev"))
+    @patch("app.main.set_output_variables")
+    def test_full_flow_with_named_patterns(
+        self, mock_output, mock_fetch, mock_git, default_env, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERNS", "ENV=env:(\\w+)\nTICKET=OPS-\\d+")
+        monkeypatch.setenv("INPUT_OUTPUT_FORMAT", "csv")
+        run()
+        call_args = mock_output.call_args[0]
+        assert json.loads(_joined(call_args[0])) == {
+            "ENV": ["dev", "prod"],
+            "TICKET": ["OPS-1"],
+        }
+        assert call_args[2] == 3
+        named = {name: _joined(value) for name, value in call_args[4].items()}
+        assert named == {"ENV": "dev,prod", "TICKET": "OPS-1"}
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits", return_value=_commits("env:prod"))
+    @patch("app.main.set_output_variables")
+    def test_pattern_pushed_down_to_git(
+        self, mock_output, mock_fetch, mock_git, default_env, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        run()
+        assert mock_fetch.call_args[0][4] == LogFilter(("env:",))
+
+        # Non-pretty records include a header the pattern could match.
+        monkeypatch.setenv("INPUT_PRETTY", "false")
+        run()
+        assert mock_fetch.call_args[0][4] is None
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits", return_value=_commits("env:prod", "env:dev"))
+    def test_timings_output(
+        self, mock_fetch, mock_git, default_env, github_output_files, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_TRACE_MEMORY", "true")
+        github_env, github_output = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", github_env)
+        monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+        try:
+            run()
+        finally:
+            tracemalloc.stop()
+        with open(github_output, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        line = next(
+            line
+            for line in lines
+            if line.startswith("timings=")
+        )
+        timings = json.loads(line.removeprefix("timings="))
+        stages = timings["stages"]
+        assert list(stages) == ["configure_git", "fetch", "extract", "format", "output"]
+        assert stages["fetch"]["commits"] == 2
+        assert stages["fetch"]["lines"] == 2
+        assert "chunks" not in stages["format"]  # text output is not streamed
+        assert "peak_memory_bytes" in stages["extract"]
+        assert timings["total_seconds"] >= 0
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits", return_value=_commits("env:prod", "env:dev"))
+    def test_json_output_is_streamed(
+        self, mock_fetch, mock_git, default_env, github_output_files, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_OUTPUT_FORMAT", "json")
+        github_env, github_output = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", github_env)
+        monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+        run()
+        with open(github_output, encoding="utf-8") as f:
+            content = f.read()
+        assert '\n["dev", "prod"]\nEOF_' in content
+        assert '\n["dev", "prod"]\nEOF_' in open(github_env, encoding="utf-8").read()
+        timings = json.loads(content.split("timings=")[1])
+        assert timings["stages"]["format"]["chunks"] == 4
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits", return_value=_commits("env:prod", "env:dev"))
+    @patch("app.main.set_output_variables")
+    def test_binary_output_is_an_artifact(
+        self, mock_output, mock_fetch, mock_git, default_env, monkeypatch, tmp_path
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_OUTPUT_FORMAT", "binary")
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        run()
+        path = mock_output.call_args[0][0]
+        assert os.path.dirname(path) == str(tmp_path)
+        with open(path, "rb") as f:
+            assert f.read() == b"\x00\x00\x00\x03dev\x00\x00\x00\x04prod"
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits")
+    def test_large_value_written_to_a_file(
+        self,
+        mock_fetch,
+        mock_git,
+        default_env,
+        github_output_files,
+        monkeypatch,
+        tmp_path,
+    ):
+        mock_fetch.return_value = _commits(*(f"env:e{n:03}" for n in range(200)))
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_OUTPUT_FORMAT", "json")
+        monkeypatch.setenv("INPUT_OUTPUT_FILE_THRESHOLD", "1000")
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        github_env, github_output = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", github_env)
+        monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+        run()
+        with open(github_output, encoding="utf-8") as f:
+            outputs = f.read()
+        path = outputs.split("value_file=")[1].split("\n")[0]
+        assert path.startswith(str(tmp_path)) and path.endswith(".json")
+        with open(path, "rb") as f:
+            data = f.read()
+        assert json.loads(data) == [f"e{n:03}" for n in range(200)]
+        assert f"value_sha256={hashlib.sha256(data).hexdigest()}" in outputs
+        assert "match_count=200" in outputs
+        with open(github_env, encoding="utf-8") as f:
+            assert f"\n{path}\nEOF_" in f.read()
+
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits")
+    def test_large_named_outputs_and_match_commits_written_to_files(
+        self,
+        mock_fetch,
+        mock_git,
+        default_env,
+        github_output_files,
+        monkeypatch,
+        tmp_path,
+    ):
+        mock_fetch.return_value = _commits(
+            *(f"env:e{n:03} OPS-1" for n in range(200))
+        )
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERNS", "ENV=env:(\\w+)\nTICKET=OPS-\\d+")
+        monkeypatch.setenv("INPUT_OUTPUT_FILE_THRESHOLD", "500")
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        github_env, github_output = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", github_env)
+        monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+        run()
+        with open(github_output, encoding="utf-8") as f:
+            outputs = f.read()
+        files = json.loads(outputs.split("value_files=")[1].split("\n")[0])
+        assert sorted(files) == ["ENV", "match_commits"]
+        for name, value_file in files.items():
+            with open(value_file["path"], "rb") as f:
+                data = f.read()
+            assert hashlib.sha256(data).hexdigest() == value_file["sha256"]
+            assert len(data) == value_file["size"]
+        assert f"match_commits={files['match_commits']['path']}\n" in outputs
+        with open(files["match_commits"]["path"], encoding="utf-8") as f:
+            assert len(json.load(f)["ENV"]["e000"]) == 1
+        assert "\nOPS-1\nEOF_" in outputs
+
+    @patch("app.main.ensure_commit_graph")
+    @patch("app.main.configure_git")
+    @patch("app.main.stream_commits", return_value=_commits("env:prod"))
+    def test_commit_graph(
+        self,
+        mock_fetch,
+        mock_git,
+        mock_graph,
+        default_env,
+        github_output_files,
+        monkeypatch,
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        github_env, github_output = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", github_env)
+        monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+        run()
+        mock_graph.assert_not_called()
+        monkeypatch.setenv("INPUT_COMMIT_GRAPH", "true")
+        mock_fetch.return_value = _commits("env:prod")
+        run()
+        mock_graph.assert_called_once_with(30)
+
+
+class TestLazyImports:
+    """Startup cost is paid on every action run; keep optional modules lazy."""
+
+    LAZY = (
+        "app.cache",
+        "app.filters",
+        "app.git_objects",
+        "dataclasses",
+        "inspect",
+        "json",
+        "sqlite3",
+        "uuid",
+    )
+
+    def _loaded(self, code: str) -> list[str]:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        completed = subprocess.run(
+            [sys.executable, "-S", "-c", f"{code}\nimport sys\n"
+             f"print(','.join(m for m in {self.LAZY!r} if m in sys.modules))"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return [m for m in completed.stdout.strip().split(",") if m]
+
+    def test_import_main(self):
+        assert self._loaded("import app.main") == []
+
+    def test_validate_without_extract_command(self):
+        code = (
+            "import os\n"
+            "os.environ['INPUT_EXTRACT_PATTERN'] = 'env:'\n"
+            "from app.config import AppConfig\n"
+            "AppConfig.from_env().validate()"
+        )
+        assert self._loaded(code) == []
+
+
+class TestCommitRanges:
+    def test_results_per_range(self, git_repo, default_env, monkeypatch):
+        subprocess.run(["git", "tag", "v1", "HEAD~1"], check=True)
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_COMMIT_RANGES", "v1..HEAD\nv1\nHEAD~2..HEAD")
+        with patch("app.main.configure_git"), patch(
+            "app.main.set_output_variables"
+        ) as mock_output, patch(
+            "app.main.stream_commits", wraps=stream_commits
+        ) as mock_fetch:
+            run()
+        # One git log over the union of the ranges.
+        mock_fetch.assert_called_once()
+        assert len(mock_fetch.call_args[0][6]) == 3
+        args = mock_output.call_args[0]
+        assert (args[0], args[2]) == ("prod\nstaging", 2)
+        assert json.loads(args[5]) == {
+            "v1..HEAD": [],
+            "v1": ["prod", "staging"],
+            "HEAD~2..HEAD": ["prod"],
+        }
+
+    def test_large_results_written_to_a_file(
+        self, git_repo, default_env, monkeypatch, tmp_path
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_COMMIT_RANGES", "HEAD\nHEAD~1")
+        monkeypatch.setenv("INPUT_OUTPUT_FILE_THRESHOLD", "20")
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        with patch("app.main.configure_git"), patch(
+            "app.main.set_output_variables"
+        ) as mock_output:
+            run()
+        args = mock_output.call_args[0]
+        value_files = args[7]
+        assert args[5] == value_files["range_results"].path
+        with open(args[5], encoding="utf-8") as f:
+            assert json.load(f)["HEAD"] == ["prod", "staging"]
+
+
+class TestMaxMatches:
+    def test_stops_reading_commits(
+        self, git_repo, default_env, github_output_files, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_MAX_MATCHES", "1")
+        github_env, github_output = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", github_env)
+        monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+        with patch("app.main.configure_git"):
+            run()
+        with open(github_output, encoding="utf-8") as f:
+            outputs = dict(
+                line.split("=", 1) for line in f.read().splitlines() if "=" in line
+            )
+        assert outputs["match_count"] == "1"
+        # The newest commit has no match; the second one is enough.
+        stages = json.loads(outputs["timings"])["stages"]
+        assert stages["fetch"]["commits"] == 2
+
+
+class TestIncremental:
+    def _run(self, monkeypatch, **env):
+        for name, value in env.items():
+            monkeypatch.setenv(f"INPUT_{name.upper()}", value)
+        with patch("app.main.configure_git"), patch(
+            "app.main.set_output_variables"
+        ) as mock_output, patch(
+            "app.main.stream_commits", wraps=stream_commits
+        ) as mock_fetch:
+            run()
+        args = mock_output.call_args[0]
+        return args[0], args[2], json.loads(args[3]), mock_fetch.call_args[0][3]
+
+    def test_second_run_processes_only_new_commits(
+        self, git_repo, default_env, monkeypatch, tmp_path
+    ):
+        state_file = str(tmp_path / "state.json")
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_STATE_FILE", state_file)
+
+        value, count, _, commit_range = self._run(monkeypatch, commit_limit="2")
+        assert (value, count, commit_range) == ("prod", 1, "")
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+        assert json.load(open(state_file))["head"] == head
+
+        subprocess.run(
+            ["git", "commit", "-q", "--allow-empty", "-m", "feat: qa\n\nenv:qa"],
+            check=True,
+        )
+        value, count, sources, commit_range = self._run(monkeypatch)
+        assert commit_range == f"{head}..{json.load(open(state_file))['head']}"
+        assert (value, count) == ("prod\nqa", 2)
+        assert set(sources) == {"prod", "qa"}
+
+        # Nothing new: the persisted result is reported as is.
+        value, count, _, _ = self._run(monkeypatch, fail_on_empty="true")
+        assert (value, count) == ("prod\nqa", 2)
+
+    def test_named_sources_merge_per_name(
+        self, git_repo, default_env, monkeypatch, tmp_path
+    ):
+        monkeypatch.setenv("INPUT_STATE_FILE", str(tmp_path / "state.json"))
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERNS", "ENV=env:(\\w+)\nKIND=^(\\w+):")
+        self._run(monkeypatch)
+        subprocess.run(
+            ["git", "commit", "-q", "--allow-empty", "-m", "fix: qa\n\nenv:qa"],
+            check=True,
+        )
+        _, _, sources, _ = self._run(monkeypatch)
+        assert set(sources) == {"ENV", "KIND"}
+        assert set(sources["ENV"]) == {"prod", "qa", "staging"}
+        assert len(sources["KIND"]["fix"]) == 2
+
+    def test_settings_change_starts_over(
+        self, git_repo, default_env, monkeypatch, tmp_path
+    ):
+        monkeypatch.setenv("INPUT_STATE_FILE", str(tmp_path / "state.json"))
+        self._run(monkeypatch, extract_pattern=r"env:(\w+)")
+        value, _, _, commit_range = self._run(monkeypatch, extract_pattern=r"(feat|fix)")
+        assert commit_range == ""
+        assert value == "feat\nfix"
+
+    def test_rewritten_history_starts_over(
+        self, git_repo, default_env, monkeypatch, tmp_path
+    ):
+        monkeypatch.setenv("INPUT_STATE_FILE", str(tmp_path / "state.json"))
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        self._run(monkeypatch)
+        subprocess.run(
+            ["git", "commit", "-q", "--amend", "--allow-empty", "-m", "chore: redo"],
+            check=True,
+        )
+        value, _, _, commit_range = self._run(monkeypatch)
+        assert commit_range == ""
+        assert value == "prod\nstaging"
@@ -1,6 +1,15 @@
+import gzip
+import hashlib
 import os
 
-from app.output_writer import set_output_variables
+from app.output_writer import (
+    ValueFile,
+    match_commits_json,
+    set_output_variables,
+    spill_value,
+    write_artifact,
+    write_timings,
+)
 
 
 class TestSetOutputVariables:
@@ -10,6 +19,10 @@ class TestSetOutputVariables:
         assert "DEPLOY_ENV=production" in captured.out
         assert "match_count=1" in captured.out
 
+    def test_local_execution_chunked(self, clean_env, capsys):
+        set_output_variables(iter(["[", '"prod"', "]"]), "DEPLOY_ENV", 1)
+        assert 'DEPLOY_ENV=["prod"]' in capsys.readouterr().out
+
     def test_default_key_variable(self, clean_env, capsys):
         set_output_variables("value", "", 0)
         captured = capsys.readouterr()
@@ -44,6 +57,71 @@ class TestSetOutputVariables:
         assert "production" in output_content
         assert "key_variable=DEPLOY_ENV" in output_content
         assert "match_count=3" in output_content
+        assert "match_commits={}" in output_content
+
+    def test_match_commits_output(self, monkeypatch, github_output_files):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+
+        sources = {"prod": ["abc", "def"]}
+        set_output_variables("prod", "DEPLOY_ENV", 1, match_commits_json(sources))
+
+        output_content = open(output_file).read()
+        assert 'match_commits={"prod": ["abc", "def"]}' in output_content
+        assert "match_commits" not in open(env_file).read()
+
+    def test_range_results_output(self, monkeypatch, github_output_files):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+
+        set_output_variables("prod", "RESULT", 1, range_results='{"v1..v2": ["prod"]}')
+
+        assert 'range_results={"v1..v2": ["prod"]}' in open(output_file).read()
+        assert "range_results" not in open(env_file).read()
+
+    def test_named_outputs(self, monkeypatch, github_output_files):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+
+        set_output_variables(
+            '{"ENV": ["prod"]}', "RESULT", 1, named_outputs={"ENV": "prod"}
+        )
+
+        for content in (open(env_file).read(), open(output_file).read()):
+            assert "ENV<<EOF_" in content
+            assert "\nprod\nEOF_" in content
+
+    def test_chunked_values_written_once_to_both_files(
+        self, monkeypatch, github_output_files
+    ):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+        produced = []
+
+        def chunks(*parts):
+            for part in parts:
+                produced.append(part)
+                yield part
+
+        set_output_variables(
+            chunks("[", '"prod"', ', "qa"', "]"),
+            "RESULT",
+            2,
+            named_outputs={"ENV": chunks("prod", ",qa")},
+        )
+
+        assert produced == ["[", '"prod"', ', "qa"', "]", "prod", ",qa"]
+        env_content = open(env_file).read()
+        output_content = open(output_file).read()
+        assert '\n["prod", "qa"]\nEOF_' in env_content
+        assert '\n["prod", "qa"]\nEOF_' in output_content
+        for content in (env_content, output_content):
+            assert "ENV<<EOF_" in content
+            assert "\nprod,qa\nEOF_" in content
 
     def test_multiline_value(self, monkeypatch, github_output_files):
         env_file, output_file = github_output_files
@@ -61,3 +139,103 @@ class TestSetOutputVariables:
         assert "line1\nline2\nline3" in output_content
         assert "key_variable=RESULT" in output_content
         assert "match_count=3" in output_content
+
+
+class TestWriteTimings:
+    def test_local_execution(self, clean_env, capsys):
+        write_timings({"total_seconds": 0.5, "stages": {}})
+        assert 'timings={"total_seconds": 0.5, "stages": {}}' in capsys.readouterr().out
+
+    def test_github_output_only(self, monkeypatch, github_output_files):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+
+        write_timings({"total_seconds": 0.5, "stages": {"fetch": {"seconds": 0.25}}})
+
+        assert open(output_file).read() == (
+            'timings={"total_seconds": 0.5, "stages": {"fetch": {"seconds": 0.25}}}\n'
+        )
+        assert open(env_file).read() == ""
+
+
+class TestWriteArtifact:
+    CHUNKS = [b"\x00\x00\x00\x01a", b"\x00\x00\x00\x01b"]
+
+    def test_written_under_runner_temp(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        value_file = write_artifact(iter(self.CHUNKS), ".bin")
+        assert os.path.dirname(value_file.path) == str(tmp_path)
+        assert value_file.path.endswith(".bin")
+        data = b"".join(self.CHUNKS)
+        assert open(value_file.path, "rb").read() == data
+        assert value_file.sha256 == hashlib.sha256(data).hexdigest()
+        assert value_file.size == 10
+
+    def test_compressed(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        value_file = write_artifact(iter(self.CHUNKS), ".bin", compress=True)
+        assert value_file.path.endswith(".bin.gz")
+        data = b"".join(self.CHUNKS)
+        assert gzip.decompress(open(value_file.path, "rb").read()) == data
+        assert value_file.sha256 == hashlib.sha256(data).hexdigest()
+
+
+class TestSpillValue:
+    def test_small_values_stay_inline(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        assert spill_value("prod", 4, ".text") == ("prod", None)
+        assert spill_value(iter(["[", '"prod"', "]"]), 8, ".json") == ('["prod"]', None)
+        assert spill_value("x" * 100, 0, ".text") == ("x" * 100, None)
+        assert os.listdir(tmp_path) == []
+
+    def test_large_value_goes_to_a_file(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("RUNNER_TEMP", str(tmp_path))
+        produced = []
+
+        def chunks():
+            for n in range(100):
+                produced.append(n)
+                yield f"value-{n}\n"
+
+        value, value_file = spill_value(chunks(), 50, ".text")
+        assert value == value_file.path
+        assert value_file.path.endswith(".text")
+        expected = "".join(f"value-{n}\n" for n in range(100)).encode()
+        assert open(value_file.path, "rb").read() == expected
+        assert value_file.size == len(expected)
+        assert len(produced) == 100
+
+    def test_file_outputs(self, monkeypatch, github_output_files):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+
+        value_file = ValueFile("/tmp/value.json", "ab" * 32, 10)
+        set_output_variables(value_file.path, "RESULT", 2, value_file=value_file)
+
+        output_content = open(output_file).read()
+        assert "value_file=/tmp/value.json\n" in output_content
+        assert f"value_sha256={'ab' * 32}\n" in output_content
+        assert "\n/tmp/value.json\nEOF_" in open(env_file).read()
+        assert "value_file" not in open(env_file).read()
+        assert "value_files" not in output_content
+
+    def test_value_files_output(self, monkeypatch, github_output_files):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+
+        value_file = ValueFile("/tmp/commits.json", "cd" * 32, 5000)
+        set_output_variables(
+            "prod", "RESULT", 1, value_file.path,
+            value_files={"match_commits": value_file},
+        )
+
+        output_content = open(output_file).read()
+        assert "match_commits=/tmp/commits.json\n" in output_content
+        assert (
+            'value_files={"match_commits": {"path": "/tmp/commits.json", '
+            f'"sha256": "{"cd" * 32}", "size": 5000}}}}\n'
+        ) in output_content
+        assert "value_files" not in open(env_file).read()
@@ -0,0 +1,150 @@
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
+from app import git_objects
+from app.server import make_server, request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def socket_path():
+    # tmp_path can exceed the ~100 byte limit on Unix socket paths.
+    with tempfile.TemporaryDirectory(prefix="cie-") as directory:
+        yield os.path.join(directory, "server.sock")
+
+
+@pytest.fixture
+def server(socket_path):
+    server = make_server(socket_path, max_objects=1000)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+    git_objects.cache_objects(0)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class TestServer:
+    def test_runs_with_the_client_environment(
+        self, git_repo, default_env, github_output_files, server, monkeypatch, capsys
+    ):
+        env_file, output_file = github_output_files
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_NATIVE_READER", "true")
+        with patch("app.main.configure_git"):
+            assert request(server) == 0
+            # The second run reuses the server's per-process caches.
+            assert request(server) == 0
+        outputs = _read(output_file)
+        assert outputs.count("\nprod\nstaging\nEOF_") == 2
+        assert outputs.count("match_count=2") == 2
+        assert "ENVIRONMENT<<EOF_" in _read(env_file)
+        assert "Process Completed Successfully" in capsys.readouterr().out
+        assert git_objects._object_cache
+
+    def test_restores_environment_and_directory(
+        self, git_repo, default_env, server, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_ONLY_FOR_THIS_RUN", "1")
+        cwd = os.getcwd()
+        with patch("app.main.configure_git"):
+            os.chdir(PROJECT_ROOT)
+            try:
+                request(server)
+                assert os.getcwd() == PROJECT_ROOT
+            finally:
+                os.chdir(cwd)
+        # The client and the server share this process, so check the server
+        # put back what it found rather than what the client sent.
+        assert os.environ["INPUT_ONLY_FOR_THIS_RUN"] == "1"
+
+    def test_memory_tracing_ends_with_the_request(
+        self, git_repo, default_env, server, monkeypatch
+    ):
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_TRACE_MEMORY", "true")
+        started = []
+        real_start = tracemalloc.start
+
+        def start(*args):
+            started.append(True)
+            real_start(*args)
+
+        with patch("app.main.configure_git"), patch("tracemalloc.start", start):
+            assert request(server) == 0
+        assert started
+        assert not tracemalloc.is_tracing()
+
+    def test_failed_run_exit_code(self, clean_env, server, monkeypatch, capsys):
+        monkeypatch.setenv("INPUT_COMMIT_LIMIT", "abc")
+        assert request(server) == 1
+        assert "[ERROR]" in capsys.readouterr().err
+
+    def test_refuses_a_live_socket(self, server):
+        with pytest.raises(OSError, match="already listening"):
+            make_server(server)
+
+    def test_replaces_a_stale_socket(self, socket_path):
+        make_server(socket_path).server_close()
+        server = make_server(socket_path)
+        try:
+            assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        finally:
+            server.server_close()
+            git_objects.cache_objects(0)
+
+
+class TestClient:
+    def test_no_server(self, socket_path):
+        assert request(socket_path) is None
+
+    def test_entrypoint_runs_locally_without_a_server(
+        self, git_repo, default_env, github_output_files, socket_path, monkeypatch
+    ):
+        env_file, output_file = github_output_files
+        open(socket_path, "w").close()
+        monkeypatch.setenv("GITHUB_ENV", env_file)
+        monkeypatch.setenv("GITHUB_OUTPUT", output_file)
+        monkeypatch.setenv("INPUT_EXTRACT_PATTERN", r"env:(\w+)")
+        monkeypatch.setenv("INPUT_DAEMON_SOCKET", socket_path)
+        monkeypatch.setenv("HOME", str(git_repo.parent))
+        result = subprocess.run(
+            [sys.executable, os.path.join(PROJECT_ROOT, "entrypoint.py")],
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+        assert "match_count=2" in _read(output_file)
+
+
+class TestObjectCache:
+    def test_least_recently_used_object_is_evicted(self, git_repo):
+        shas = subprocess.run(
+            ["git", "rev-list", "HEAD"], capture_output=True, text=True
+        ).stdout.split()
+        git_objects.cache_objects(2)
+        try:
+            store = git_objects.ObjectStore(".git/objects")
+            for sha in shas:
+                store.read(sha)
+            store.read(shas[1])
+            assert list(git_objects._object_cache) == [shas[2], shas[1]]
+        finally:
+            git_objects.cache_objects(0)
@@ -0,0 +1,58 @@
+import json
+
+from app.state import (
+    STATE_VERSION,
+    ExtractionState,
+    extraction_spec,
+    load_state,
+    merge_sources,
+    save_state,
+)
+
+STATE = ExtractionState("a" * 40, "spec", {"value": "dev\nprod"}, {"prod": ["a" * 40]})
+
+
+class TestExtractionSpec:
+    def test_depends_on_settings(self):
+        base = extraction_spec("", r"env:(\w+)", {}, True)
+        assert base == extraction_spec("", r"env:(\w+)", {}, True)
+        assert base != extraction_spec("", r"env:(\w+)", {}, False)
+        assert base != extraction_spec("", r"env:(\S+)", {}, True)
+        assert base != extraction_spec("", "", {"ENV": r"env:(\w+)"}, True)
+
+
+class TestLoadSaveState:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "state" / "extract.json")
+        save_state(path, STATE)
+        assert load_state(path, "spec") == STATE
+        assert json.load(open(path))["version"] == STATE_VERSION
+
+    def test_missing_file(self, tmp_path):
+        assert load_state(str(tmp_path / "missing.json"), "spec") is None
+
+    def test_spec_mismatch(self, tmp_path, capsys):
+        path = str(tmp_path / "state.json")
+        save_state(path, STATE)
+        assert load_state(path, "other") is None
+        assert "starting over" in capsys.readouterr().out
+
+    def test_corrupt_or_foreign_file(self, tmp_path):
+        path = tmp_path / "state.json"
+        path.write_text("{not json")
+        assert load_state(str(path), "spec") is None
+        path.write_text(json.dumps({"version": STATE_VERSION, "head": "a"}))
+        assert load_state(str(path), "spec") is None
+        path.write_text(json.dumps({"version": 99, **STATE._asdict()}))
+        assert load_state(str(path), "spec") is None
+
+
+class TestMergeSources:
+    def test_newer_shas_first_without_duplicates(self):
+        previous = {"prod": ["old", "shared"], "dev": ["old"]}
+        current = {"prod": ["new", "shared"], "qa": ["new"]}
+        assert merge_sources(previous, current) == {
+            "prod": ["new", "shared", "old"],
+            "qa": ["new"],
+            "dev": ["old"],
+        }